@@ -3,7 +3,7 @@ Flask應用工廠模式實現
 包含應用創建、擴展初始化、藍圖註冊等核心功能
 """
 
-from flask import Flask, render_template
+from flask import Flask, render_template, request, url_for
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from config import Config
@@ -43,6 +43,10 @@ def create_app(config_class=Config):
     # 從配置類載入配置
     app.config.from_object(config_class)
 
+    # 按配置設定數據庫連線池，並記錄連線池統計（需在初始化數據庫擴展之前）
+    from app.models import pool_metrics
+    pool_metrics.init_app(app)
+
     # 初始化Flask擴展
     # 將擴展與應用實例綁定
     db.init_app(app)
@@ -58,6 +62,51 @@ def create_app(config_class=Config):
         from datetime import datetime
         return datetime.now()
 
+    @app.template_global()
+    def sort_url(column):
+        """
+        生成列表頁的排序連結，保留當前的搜尋和篩選參數
+        再次點擊當前排序欄位時切換排序方向，並回到第一頁
+        """
+        args = request.args.to_dict()
+        if args.get('sort') == column and args.get('dir', 'asc') == 'asc':
+            direction = 'desc'
+        else:
+            direction = 'asc'
+        args.update(sort=column, dir=direction)
+        args.pop('page', None)
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    @app.template_global()
+    def page_url(page):
+        """生成列表頁的分頁連結，保留當前的搜尋、篩選和排序參數"""
+        args = request.args.to_dict(flat=False)
+        args['page'] = page
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    @app.template_global()
+    def filter_url(**params):
+        """
+        生成列表頁的篩選連結，保留其他查詢參數並回到第一頁
+        參數值為None時移除該參數
+        """
+        args = request.args.to_dict(flat=False)
+        args.pop('page', None)
+        for key, value in params.items():
+            if value is None:
+                args.pop(key, None)
+            else:
+                args[key] = value
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    @app.template_global()
+    def export_url(endpoint, file_format):
+        """生成匯出連結，沿用列表頁當前的搜尋、篩選和排序參數"""
+        args = request.args.to_dict(flat=False)
+        args.pop('page', None)
+        args['format'] = file_format
+        return url_for(endpoint, **args)
+
     # 添加自定義模板過濾器
     @app.template_filter('nl2br')
     def nl2br_filter(text):
@@ -106,6 +155,13 @@ def create_app(config_class=Config):
         # 返回格式化的日期字符串
         return local_time.strftime('%Y-%m-%d')
 
+    # 載入參考資料快取模組，註冊事務提交時使快取失效的事件監聽器
+    from app.models import reference_data  # noqa: F401
+
+    # 登記最後登入時間的批量寫入
+    from app.models import activity
+    activity.init_app(app)
+
     # 註冊藍圖（Blueprint）
     # 藍圖是Flask中組織路由和視圖的方式，有助於模組化應用結構
 
@@ -133,6 +189,14 @@ def create_app(config_class=Config):
     from app.search import bp as search_bp
     app.register_blueprint(search_bp)
 
+    # 資料匯入藍圖（批量匯入學生、教師、班級）
+    from app.data_import import bp as data_import_bp
+    app.register_blueprint(data_import_bp)
+
+    # 批量操作API藍圖（外部系統以權杖驗證的JSON介面）
+    from app.api import bp as api_bp
+    app.register_blueprint(api_bp)
+
     # 建立首頁路由
     @app.route('/')
     def index():
@@ -0,0 +1,12 @@
+"""
+批量操作API藍圖初始化
+提供以API權杖驗證的JSON介面，供外部系統（報到機、學籍同步等）批量寫入資料
+"""
+
+from flask import Blueprint
+
+# 創建API藍圖
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+# 導入路由模塊（必須在藍圖創建後導入以避免循環導入）
+from app.api import routes
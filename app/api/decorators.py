@@ -0,0 +1,27 @@
+"""
+API權限裝飾器
+以Authorization: Bearer <權杖>驗證外部系統的請求
+"""
+
+import hmac
+from functools import wraps
+from flask import current_app, jsonify, request
+
+
+def token_required(f):
+    """
+    API權杖驗證裝飾器
+    權杖必須是API_TOKENS配置中的其中一個，比較時使用固定時間比較避免計時攻擊
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        token = token.strip().encode()
+        valid = scheme.lower() == 'bearer' and token and any(
+            hmac.compare_digest(token, allowed.encode())
+            for allowed in current_app.config.get('API_TOKENS') or ()
+        )
+        if not valid:
+            return jsonify({'error': '缺少或無效的API權杖'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,53 @@
+"""
+批量操作API路由
+接收JSON格式的操作列表，在一個事務中執行並返回每個操作的結果
+"""
+
+from flask import current_app, jsonify, request
+from app import db
+from app.api import bp
+from app.api.decorators import token_required
+from app.models.batch_ops import BatchError, run_batch
+
+# 默認每個請求最多的操作數量
+DEFAULT_MAX_OPERATIONS = 1000
+
+
+@bp.route('/batch', methods=['POST'])
+@token_required
+def batch():
+    """
+    批量操作API
+
+    請求內容:
+        {"operations": [{"op": "create|update|upsert|delete",
+                         "entity": "student|teacher|class",
+                         "data": {...}}, ...]}
+        欄位名稱與批量匯入相同；create/upsert需提供完整記錄，update只需提供主鍵及要修改的欄位
+        郵箱、班級名稱及班導師不能與現有記錄或同批次的其他操作重複，主鍵不能與現有主鍵僅大小寫不同
+
+    Returns:
+        200: {"committed": true, "results": [...]}，全部操作已在一個事務中寫入
+        422: {"committed": false, "results": [...]}，有無效的操作，整批未寫入
+        400/409/413: {"error": ...}
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': '請求內容必須是JSON物件'}), 400
+
+    operations = payload.get('operations')
+    max_operations = current_app.config.get('API_BATCH_MAX_OPERATIONS', DEFAULT_MAX_OPERATIONS)
+    if isinstance(operations, list) and len(operations) > max_operations:
+        return jsonify({'error': f'每個請求最多{max_operations}個操作'}), 413
+
+    try:
+        committed, results = run_batch(operations)
+    except BatchError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('批量操作失敗')
+        return jsonify({'error': f'寫入失敗，整批已回滾：{e.__class__.__name__}'}), 409
+
+    return jsonify({'committed': committed, 'results': results}), 200 if committed else 422
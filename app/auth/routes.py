@@ -3,13 +3,18 @@
 處理用戶登錄、註冊、登出等認證相關的路由和視圖函數
 """
 
-from flask import render_template, redirect, url_for, flash, request
-from flask_login import login_user, logout_user, current_user
+from flask import render_template, redirect, url_for, flash, request, jsonify
+from flask_login import login_user, logout_user, current_user, login_required
 from werkzeug.urls import url_parse
 from app import db
 from app.auth import bp
 from app.auth.forms import LoginForm, RegistrationForm
+from app.auth.throttle import get_throttle
 from app.models import User
+from app.models import activity
+from app.models import pool_metrics
+from app.passwords import PasswordHashBusy
+from app.user_management.decorators import admin_required
 
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -34,17 +39,35 @@ def login():
 
     # 處理POST請求（表單提交）
     if form.validate_on_submit():
+        # 在驗證密碼之前檢查頻率限制
+        throttle = get_throttle()
+        if not throttle.check_login(form.username.data, request.remote_addr):
+            flash('登入嘗試次數過多，請稍後再試', 'warning')
+            return render_template('auth/login.html', title='登錄', form=form), 429
+
         # 根據用戶名查找用戶
         user = User.query.filter_by(username=form.username.data).first()
 
-        # 驗證用戶存在且密碼正確
-        if user is None or not user.check_password(form.password.data):
+        # 驗證用戶存在且密碼正確（密碼運算繁忙時請用戶稍後再試）
+        try:
+            password_ok = user is not None and user.check_password(form.password.data)
+        except PasswordHashBusy as e:
+            flash(str(e), 'warning')
+            return render_template('auth/login.html', title='登錄', form=form), 503
+
+        if not password_ok:
+            throttle.login_failed(form.username.data)
             flash('使用者名稱或密碼錯誤')
             return redirect(url_for('auth.login'))
 
+        throttle.login_succeeded(form.username.data)
+
         # 登錄用戶，設置記住我選項
         login_user(user, remember=form.remember_me.data)
 
+        # 記錄最後登入時間（暫存後批量寫入）
+        activity.record(user.user_id)
+
         # 處理登錄後的重定向
         next_page = request.args.get('next')  # 獲取原本要訪問的頁面
 
@@ -100,11 +123,20 @@ def register():
 
     # 處理POST請求（表單提交）
     if form.validate_on_submit():
+        # 在計算密碼哈希之前檢查頻率限制
+        if not get_throttle().check_register(request.remote_addr):
+            flash('註冊次數過多，請稍後再試', 'warning')
+            return render_template('auth/register.html', title='註冊', form=form), 429
+
         # 創建新用戶對象
         user = User(username=form.username.data)
 
         # 設置密碼（會自動進行哈希加密）
-        user.set_password(form.password.data)
+        try:
+            user.set_password(form.password.data)
+        except PasswordHashBusy as e:
+            flash(str(e), 'warning')
+            return render_template('auth/register.html', title='註冊', form=form), 503
 
         # 添加到數據庫會話並提交
         db.session.add(user)
@@ -117,4 +149,36 @@ def register():
         return redirect(url_for('auth.login'))
 
     # GET請求或表單驗證失敗時，顯示註冊頁面
-    return render_template('auth/register.html', title='註冊', form=form)
\ No newline at end of file
+    return render_template('auth/register.html', title='註冊', form=form)
+
+@bp.route('/metrics')
+@login_required
+@admin_required
+def throttle_metrics():
+    """
+    登入頻率限制統計 - 僅管理員可訪問
+    返回本進程的登入成功、失敗及被限制次數
+
+    Returns:
+        JSON: 統計名稱 -> 次數
+
+    路由:
+        GET /auth/metrics - 查看統計
+    """
+    return jsonify(get_throttle().metrics())
+
+@bp.route('/metrics/pool')
+@login_required
+@admin_required
+def pool_metrics_view():
+    """
+    數據庫連線池統計 - 僅管理員可訪問
+    返回本進程連線池的使用中及溢出連線數、取用連線的等待時間及等待超時次數
+
+    Returns:
+        JSON: 連線池狀態及統計
+
+    路由:
+        GET /auth/metrics/pool - 查看統計
+    """
+    return jsonify(pool_metrics.metrics())
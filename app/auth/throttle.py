@@ -0,0 +1,245 @@
+"""
+登入及註冊頻率限制
+在計算任何密碼哈希之前檢查，防止暴力破解及惡意消耗伺服器CPU
+
+每個限制以滑動窗口計數：保留當前和上一個固定窗口的計數，按時間比例估算滑動窗口內的次數，
+每個鍵只需存儲三個數字
+- 同一用戶名的登入失敗次數（LOGIN_THROTTLE_USERNAME_LIMIT）
+- 同一IP的登入嘗試次數（LOGIN_THROTTLE_IP_LIMIT）
+- 同一IP的註冊嘗試次數（REGISTER_THROTTLE_IP_LIMIT）
+
+計數默認存放在進程內存中；多進程部署時可將THROTTLE_STORAGE_URL設為redis://...，
+讓所有進程共用計數（需安裝redis套件）
+"""
+
+import threading
+import time
+from collections import Counter
+from flask import current_app
+
+# 進程內存儲最多保留的鍵數量，超過時清除已過期的鍵
+MAX_MEMORY_KEYS = 100000
+
+
+class MemoryStore:
+    """進程內存計數存儲"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # 鍵 -> [窗口序號, 上一窗口計數, 當前窗口計數]
+
+    def _bucket(self, key, index):
+        """取得鍵在指定窗口的計數，窗口已前移時滾動計數"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return [index, 0, 0]
+        if bucket[0] == index:
+            return bucket
+        if bucket[0] == index - 1:
+            return [index, bucket[2], 0]
+        return [index, 0, 0]
+
+    def hit(self, key, window, now):
+        """為鍵增加一次計數"""
+        index = int(now // window)
+        with self._lock:
+            bucket = self._bucket(key, index)
+            bucket[2] += 1
+            self._buckets[key] = bucket
+            if len(self._buckets) > MAX_MEMORY_KEYS:
+                self._prune(window, now)
+
+    def counts(self, key, window, now):
+        """返回(上一窗口計數, 當前窗口計數)"""
+        index = int(now // window)
+        with self._lock:
+            bucket = self._bucket(key, index)
+        return bucket[1], bucket[2]
+
+    def reset(self, key, window, now):
+        """清除鍵的計數"""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def _prune(self, window, now):
+        """清除兩個窗口內沒有計數的鍵"""
+        index = int(now // window)
+        expired = [key for key, bucket in self._buckets.items() if bucket[0] < index - 1]
+        for key in expired:
+            del self._buckets[key]
+
+
+class RedisStore:
+    """
+    Redis計數存儲，供多進程部署共用
+    每個窗口一個計數鍵，存活兩個窗口長度後自動過期
+
+    Args:
+        url: Redis連接URL
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('THROTTLE_STORAGE_URL使用Redis時需要安裝redis套件')
+        self._redis = redis.Redis.from_url(url)
+
+    def hit(self, key, window, now):
+        """為鍵增加一次計數"""
+        name = f'throttle:{key}:{int(now // window)}'
+        pipe = self._redis.pipeline()
+        pipe.incr(name)
+        pipe.expire(name, int(window * 2))
+        pipe.execute()
+
+    def counts(self, key, window, now):
+        """返回(上一窗口計數, 當前窗口計數)"""
+        index = int(now // window)
+        previous, current = self._redis.mget(f'throttle:{key}:{index - 1}',
+                                             f'throttle:{key}:{index}')
+        return int(previous or 0), int(current or 0)
+
+    def reset(self, key, window, now):
+        """清除鍵的計數"""
+        index = int(now // window)
+        self._redis.delete(f'throttle:{key}:{index - 1}', f'throttle:{key}:{index}')
+
+
+class Limit:
+    """
+    單一滑動窗口限制
+
+    Args:
+        name: 限制名稱，作為計數鍵的前綴及統計數據的名稱
+        limit: 窗口內允許的次數
+        window: 窗口長度（秒）
+    """
+
+    def __init__(self, name, limit, window):
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    def _key(self, value):
+        return f'{self.name}:{value}'
+
+    def exceeded(self, store, value, now):
+        """檢查滑動窗口內的次數是否已達上限"""
+        if not self.limit:
+            return False
+        previous, current = store.counts(self._key(value), self.window, now)
+        weight = 1 - (now % self.window) / self.window
+        return previous * weight + current >= self.limit
+
+    def hit(self, store, value, now):
+        """記錄一次"""
+        if self.limit:
+            store.hit(self._key(value), self.window, now)
+
+    def reset(self, store, value, now):
+        """清除計數"""
+        if self.limit:
+            store.reset(self._key(value), self.window, now)
+
+
+class Throttle:
+    """
+    登入及註冊頻率限制器，每個應用一個實例
+
+    Args:
+        config: 應用配置
+    """
+
+    def __init__(self, config):
+        url = config.get('THROTTLE_STORAGE_URL', 'memory://')
+        self.store = RedisStore(url) if url.startswith(('redis://', 'rediss://')) else MemoryStore()
+        self.login_username = Limit('login_user', config.get('LOGIN_THROTTLE_USERNAME_LIMIT', 5),
+                                    config.get('LOGIN_THROTTLE_WINDOW', 300))
+        self.login_ip = Limit('login_ip', config.get('LOGIN_THROTTLE_IP_LIMIT', 30),
+                              config.get('LOGIN_THROTTLE_WINDOW', 300))
+        self.register_ip = Limit('register_ip', config.get('REGISTER_THROTTLE_IP_LIMIT', 5),
+                                 config.get('REGISTER_THROTTLE_WINDOW', 3600))
+        self._metrics_lock = threading.Lock()
+        self._metrics = Counter()
+
+    def _count(self, metric):
+        with self._metrics_lock:
+            self._metrics[metric] += 1
+
+    def check_login(self, username, ip):
+        """
+        檢查是否允許此次登入嘗試，允許時記錄該IP的一次嘗試
+
+        Args:
+            username: 提交的用戶名
+            ip: 客戶端IP
+
+        Returns:
+            bool: 是否允許進行密碼驗證
+        """
+        now = time.time()
+        username = _normalize(username)
+        if self.login_username.exceeded(self.store, username, now):
+            self._count('login_throttled_username')
+            return False
+        if self.login_ip.exceeded(self.store, ip, now):
+            self._count('login_throttled_ip')
+            return False
+        self.login_ip.hit(self.store, ip, now)
+        return True
+
+    def login_failed(self, username):
+        """記錄一次登入失敗"""
+        self._count('login_failed')
+        self.login_username.hit(self.store, _normalize(username), time.time())
+
+    def login_succeeded(self, username):
+        """登入成功後清除該用戶名的失敗計數"""
+        self._count('login_succeeded')
+        self.login_username.reset(self.store, _normalize(username), time.time())
+
+    def check_register(self, ip):
+        """
+        檢查是否允許此次註冊，允許時記錄該IP的一次嘗試
+
+        Args:
+            ip: 客戶端IP
+
+        Returns:
+            bool: 是否允許註冊
+        """
+        now = time.time()
+        if self.register_ip.exceeded(self.store, ip, now):
+            self._count('register_throttled_ip')
+            return False
+        self.register_ip.hit(self.store, ip, now)
+        return True
+
+    def metrics(self):
+        """
+        取得本進程的計數統計
+
+        Returns:
+            dict: 統計名稱 -> 次數
+        """
+        with self._metrics_lock:
+            return dict(self._metrics)
+
+
+def _normalize(username):
+    """統一用戶名大小寫及空白，避免以變體繞過限制"""
+    return (username or '').strip().lower()
+
+
+def get_throttle():
+    """
+    取得當前應用的頻率限制器，首次使用時建立
+
+    Returns:
+        Throttle: 頻率限制器
+    """
+    throttle = current_app.extensions.get('login_throttle')
+    if throttle is None:
+        throttle = current_app.extensions.setdefault('login_throttle', Throttle(current_app.config))
+    return throttle
@@ -61,9 +61,10 @@ def can_edit_class(class_id):
         return True
     
     # 教師只能編輯自己擔任班主任的班級
+    # 調用此函數的視圖都會顯示該班級，班級對象由請求範圍快取載入後直接重用
     if current_user.role == 'teacher':
-        from app.models import Class
-        class_obj = Class.query.get(class_id)
+        from app.models.request_cache import get_class
+        class_obj = get_class(class_id)
         if class_obj and class_obj.teacher_id == current_user.related_id:
             return True
     
@@ -88,9 +89,10 @@ def can_view_class(class_id):
     
     # 學生只能查看自己所在的班級
     if current_user.role == 'student':
-        from app.models import Student
-        student = Student.query.filter_by(student_id=current_user.related_id).first()
-        if student and str(student.class_id) == str(class_id):
+        # 視圖不使用學生本身的資料，只探測學生的班級ID，不載入學生對象
+        from app.models.queries import get_student_class_id
+        student_class_id = get_student_class_id(current_user.related_id)
+        if student_class_id is not None and str(student_class_id) == str(class_id):
             return True
     
     return False
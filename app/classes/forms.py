@@ -4,9 +4,11 @@
 """
 
 from flask_wtf import FlaskForm
-from wtforms import StringField, IntegerField, SelectField, TextAreaField, SubmitField
+from wtforms import StringField, IntegerField, SelectField, TextAreaField, SubmitField, BooleanField
 from wtforms.validators import DataRequired, Length, Optional, NumberRange, ValidationError
-from app.models import Class, Department, Teacher
+from app.models import Class, Teacher
+from app.models.reference_data import get_departments
+from app.fields import LookupField
 
 class ClassForm(FlaskForm):
     """
@@ -36,10 +38,12 @@ class ClassForm(FlaskForm):
         if field.data == 0:
             raise ValidationError('請選擇有效的系所')
 
-    # 班導師選擇字段：可選，選項從數據庫動態載入
-    teacher_id = SelectField('班導師', coerce=str, validators=[
+    # 班導師選擇字段：可選，選項由教師搜尋API動態載入
+    teacher_id = LookupField('班導師', validators=[
         Optional()
-    ], render_kw={"class": "form-select"})
+    ], model=Teacher, endpoint='teacher_management.lookup_teachers',
+    get_label=lambda t: f"{t.name} ({t.teacher_id})",
+    placeholder='-- 請選擇班導師 --', render_kw={"class": "form-select"})
 
     # 班級描述字段：可選
     description = TextAreaField('班級描述', validators=[
@@ -56,7 +60,7 @@ class ClassForm(FlaskForm):
     def __init__(self, class_obj=None, *args, **kwargs):
         """
         表單初始化方法
-        動態載入系所和教師選項列表
+        動態載入系所選項列表
 
         Args:
             class_obj: 班級對象（編輯模式時使用）
@@ -66,16 +70,10 @@ class ClassForm(FlaskForm):
         super(ClassForm, self).__init__(*args, **kwargs)
         self.class_obj = class_obj
 
-        # 載入系所選項
+        # 載入系所選項（來自參考資料快取）
         self.department_id.choices = [(0, '-- 請選擇系所 --')] + [
             (d.department_id, d.department_name)
-            for d in Department.query.order_by(Department.department_name).all()
-        ]
-
-        # 載入教師選項
-        self.teacher_id.choices = [('', '-- 請選擇班導師 --')] + [
-            (t.teacher_id, f"{t.name} ({t.teacher_id})")
-            for t in Teacher.query.order_by(Teacher.name).all()
+            for d in get_departments()
         ]
 
     def validate_class_name(self, field):
@@ -102,7 +100,7 @@ class ClassForm(FlaskForm):
         Raises:
             ValidationError: 當教師已擔任其他班級班導師時拋出驗證錯誤
         """
-        if field.data and field.data != '':
+        if field.data:
             # 檢查該教師是否已擔任其他班級的班導師
             existing_class = Class.query.filter_by(teacher_id=field.data).first()
             if existing_class and (not self.class_obj or existing_class.class_id != self.class_obj.class_id):
@@ -153,8 +151,61 @@ class ClassSearchForm(FlaskForm):
         """
         super(ClassSearchForm, self).__init__(*args, **kwargs)
 
-        # 載入系所篩選選項
+        # 載入系所篩選選項（來自參考資料快取）
         self.department_filter.choices = [(0, '-- 所有系所 --')] + [
             (d.department_id, d.department_name)
-            for d in Department.query.order_by(Department.department_name).all()
+            for d in get_departments()
+        ]
+
+
+class BalanceForm(FlaskForm):
+    """
+    分班平衡表單
+    選擇年級（可限定系所）的候選班級，將未分班的學生平均分配
+    """
+
+    # 年級字段：候選班級的年級
+    grade = SelectField('年級', coerce=int, choices=[
+        (1, '一年級'),
+        (2, '二年級'),
+        (3, '三年級'),
+        (4, '四年級'),
+        (5, '五年級'),
+        (6, '六年級')
+    ], render_kw={"class": "form-select"})
+
+    # 系所字段：0表示該年級的全部班級
+    department_id = SelectField('系所', coerce=int, validators=[
+        Optional()
+    ], render_kw={"class": "form-select"})
+
+    # 入學年份字段：只分配該年入學的學生
+    enrollment_year = IntegerField('入學年份', validators=[
+        Optional(),
+        NumberRange(min=1900, max=2100, message='入學年份無效')
+    ], render_kw={"placeholder": "不限"})
+
+    # 每班人數上限
+    capacity = IntegerField('每班人數上限', validators=[
+        Optional(),
+        NumberRange(min=1, message='人數上限必須大於0')
+    ], render_kw={"placeholder": "不限"})
+
+    # 是否平衡性別比例
+    balance_gender = BooleanField('平衡各班性別人數', default=True)
+
+    # 預覽及套用按鈕
+    preview = SubmitField('預覽')
+    apply = SubmitField('套用分班')
+
+    def __init__(self, *args, **kwargs):
+        """
+        表單初始化方法
+        動態載入系所選項
+        """
+        super(BalanceForm, self).__init__(*args, **kwargs)
+
+        self.department_id.choices = [(0, '-- 全部系所 --')] + [
+            (d.department_id, d.department_name)
+            for d in get_departments()
         ]
\ No newline at end of file
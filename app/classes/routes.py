@@ -3,16 +3,88 @@
 處理班級相關的CRUD操作和視圖函數
 """
 
-from flask import render_template, redirect, url_for, flash, request, abort
+from flask import render_template, redirect, url_for, flash, request, abort, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy import func
 from sqlalchemy.orm import joinedload
 from app import db
 from . import bp
-from .forms import ClassForm
+from .forms import ClassForm, BalanceForm
+from app.student.forms import ReassignForm
 from .decorators import admin_or_teacher_required, admin_required, can_edit_class, can_view_class
 from app.models import Class, Department, Teacher, Student
+from app.models.queries import class_has_students, keyset_page
+from app.models.balancing import apply_assignment, candidate_classes, plan_assignment, unassigned_students
+from app.models.request_cache import get_entity_or_404, get_student, get_class
 from datetime import datetime
 
+# 班級詳情頁預覽的學生人數上限，完整名單請見班級學生列表
+STUDENT_PREVIEW_LIMIT = 10
+
+# 我的班級頁面顯示的同班同學人數上限
+MY_CLASS_PREVIEW_LIMIT = 50
+
+# 班級名單每次載入的學生人數及上限
+ROSTER_PAGE_SIZE = 20
+ROSTER_MAX_PAGE_SIZE = 100
+
+# 班級名單API可選擇的欄位（學號固定返回，作為游標）
+ROSTER_COLUMNS = {
+    'student_id': Student.student_id,
+    'name': Student.name,
+    'gender': Student.gender,
+    'status': Student.status,
+    'phone': Student.phone,
+    'email': Student.email,
+    'birth_date': Student.birth_date,
+    'enrollment_date': Student.enrollment_date,
+}
+
+# 班級名單默認返回的欄位
+DEFAULT_ROSTER_FIELDS = ('student_id', 'name', 'gender', 'phone', 'status')
+
+# 學生查看本班名單時只能選擇的欄位，同學的聯絡方式及出生日期等僅限管理員及教師
+STUDENT_ROSTER_FIELDS = ('student_id', 'name', 'gender', 'status')
+
+def roster_fields(default=False):
+    """
+    取得當前用戶在班級名單中可選擇的欄位
+
+    Args:
+        default: 是否只返回默認欄位中可選擇的部分
+
+    Returns:
+        list: 欄位名稱列表
+    """
+    allowed = ROSTER_COLUMNS if current_user.role in ('admin', 'teacher') else STUDENT_ROSTER_FIELDS
+    fields = DEFAULT_ROSTER_FIELDS if default else ROSTER_COLUMNS
+    return [field for field in fields if field in allowed]
+
+def get_student_preview(class_id, limit=STUDENT_PREVIEW_LIMIT):
+    """
+    取得班級學生預覽及總人數
+    只載入前limit名學生，人數另以COUNT查詢取得，避免載入整個班級名單
+
+    Args:
+        class_id: 班級ID
+        limit: 預覽的學生人數上限
+
+    Returns:
+        tuple: (學生預覽列表, 班級學生總人數)
+    """
+    students = Student.query.filter_by(class_id=class_id).order_by(
+        Student.student_id
+    ).limit(limit).all()
+
+    # 預覽未滿時人數即為預覽筆數，可省去COUNT查詢
+    if len(students) < limit:
+        return students, len(students)
+
+    student_count = db.session.query(func.count(Student.student_id)).filter(
+        Student.class_id == class_id
+    ).scalar()
+    return students, student_count
+
 @bp.route('/')
 @login_required
 @admin_or_teacher_required
@@ -61,7 +133,7 @@ def add_class():
                 class_name=form.class_name.data,
                 grade=form.grade.data,
                 department_id=form.department_id.data if form.department_id.data != 0 else None,
-                teacher_id=form.teacher_id.data if form.teacher_id.data != '' else None,
+                teacher_id=form.teacher_id.data,
                 created_at=datetime.now()
             )
             
@@ -80,6 +152,47 @@ def add_class():
                          form=form,
                          action='add')
 
+@bp.route('/balance', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def balance_classes():
+    """
+    分班平衡路由 - 僅管理員可訪問
+    將未分班的在學學生平均分配到指定年級（可限定系所）的班級；預覽不修改資料，套用時以一次批量更新寫入
+    """
+    form = BalanceForm()
+    plan = None
+    student_count = 0
+
+    if form.validate_on_submit():
+        classes = candidate_classes(form.grade.data, form.department_id.data or None)
+        students = unassigned_students(form.enrollment_year.data)
+        student_count = len(students)
+
+        if not classes:
+            flash('沒有符合條件的班級', 'warning')
+        elif not students:
+            flash('沒有未分班的學生', 'info')
+        else:
+            plan = plan_assignment(students, classes, capacity=form.capacity.data,
+                                   balance_gender=form.balance_gender.data)
+            if form.apply.data:
+                try:
+                    count = apply_assignment(plan)
+                    flash(f'已將 {count} 名學生分配到 {len(classes)} 個班級', 'success')
+                    if plan.unplaced:
+                        flash(f'{len(plan.unplaced)} 名學生因班級已滿未能分配', 'warning')
+                    return redirect(url_for('class_management.balance_classes'))
+                except Exception as e:
+                    db.session.rollback()
+                    flash(f'套用分班時發生錯誤：{str(e)}', 'danger')
+
+    return render_template('classes/balance.html',
+                         title='分班平衡',
+                         form=form,
+                         plan=plan,
+                         student_count=student_count)
+
 @bp.route('/<int:class_id>')
 @login_required
 def view_class(class_id):
@@ -88,15 +201,16 @@ def view_class(class_id):
         flash('您沒有權限查看此班級', 'danger')
         abort(403)
     
-    class_obj = Class.query.options(
-        joinedload(Class.department),
-        joinedload(Class.teacher),
-        joinedload(Class.students)
-    ).get_or_404(class_id)
-    
+    # 權限檢查時已載入的班級對象會直接重用
+    class_obj = get_entity_or_404(Class, class_id)
+
+    students, student_count = get_student_preview(class_id)
+
     return render_template('classes/detail.html',
                          title=f'班級詳情 - {class_obj.class_name}',
-                         class_obj=class_obj)
+                         class_obj=class_obj,
+                         students=students,
+                         student_count=student_count)
 
 @bp.route('/<int:class_id>/edit', methods=['GET', 'POST'])
 @login_required
@@ -106,7 +220,7 @@ def edit_class(class_id):
         flash('您沒有權限編輯此班級', 'danger')
         abort(403)
     
-    class_obj = Class.query.get_or_404(class_id)
+    class_obj = get_entity_or_404(Class, class_id)
     form = ClassForm(class_obj=class_obj, obj=class_obj)
     
     if form.validate_on_submit():
@@ -114,7 +228,7 @@ def edit_class(class_id):
             class_obj.class_name = form.class_name.data
             class_obj.grade = form.grade.data
             class_obj.department_id = form.department_id.data if form.department_id.data != 0 else None
-            class_obj.teacher_id = form.teacher_id.data if form.teacher_id.data != '' else None
+            class_obj.teacher_id = form.teacher_id.data
             class_obj.description = form.description.data
             class_obj.updated_at = datetime.now()
 
@@ -138,11 +252,11 @@ def edit_class(class_id):
 @admin_required
 def delete_class(class_id):
     """刪除班級路由 - 僅管理員可訪問"""
-    class_obj = Class.query.get_or_404(class_id)
+    class_obj = get_entity_or_404(Class, class_id)
     
     try:
         # 檢查是否有學生在此班級
-        if class_obj.students:
+        if class_has_students(class_id):
             flash(f'無法刪除班級 "{class_obj.class_name}"，因為還有學生在此班級中', 'warning')
             return redirect(url_for('class_management.list_classes'))
         
@@ -166,19 +280,68 @@ def class_students(class_id):
         flash('您沒有權限查看此班級', 'danger')
         abort(403)
 
-    class_obj = Class.query.get_or_404(class_id)
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
+    class_obj = get_entity_or_404(Class, class_id)
 
-    # 使用 Student 查詢而不是關聯對象來實現分頁
-    students = Student.query.filter_by(class_id=class_id).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # 首屏學生及總人數，後續由頁面捲動時透過名單API按游標載入
+    students, student_count = get_student_preview(class_id, limit=ROSTER_PAGE_SIZE)
+    next_cursor = students[-1].student_id if student_count > len(students) else None
+
+    # 可編輯本班的管理員或班導師可將全班移至其他班級
+    reassign_form = None
+    if can_edit_class(class_id):
+        reassign_form = ReassignForm(source_class_id=class_id)
 
     return render_template('classes/students.html',
                          title=f'{class_obj.class_name} - 學生列表',
                          class_obj=class_obj,
-                         students=students)
+                         students=students,
+                         student_count=student_count,
+                         next_cursor=next_cursor,
+                         roster_fields=roster_fields(default=True),
+                         reassign_form=reassign_form)
+
+@bp.route('/<int:class_id>/roster')
+@login_required
+def class_roster(class_id):
+    """
+    班級名單API - 供班級學生列表無限捲動使用
+    以學號為游標，每次只沿（班級ID, 學號）索引讀取一段，不計算總數
+
+    查詢參數:
+        after: 上一段最後一名學生的學號
+        limit: 每段筆數（最多ROSTER_MAX_PAGE_SIZE）
+        fields: 以逗號分隔的欄位名稱，默認為學號、姓名、性別、電話、狀態；學生只能選擇學號、姓名、性別、狀態
+    """
+    if not can_view_class(class_id):
+        return jsonify({'error': '您沒有權限查看此班級'}), 403
+
+    fields = request.args.get('fields', ','.join(roster_fields(default=True))).split(',')
+    unknown = [f for f in fields if f not in ROSTER_COLUMNS]
+    if unknown:
+        return jsonify({'error': f'不支援的欄位：{", ".join(unknown)}'}), 400
+    allowed = roster_fields()
+    forbidden = [f for f in fields if f not in allowed]
+    if forbidden:
+        return jsonify({'error': f'您沒有權限查看欄位：{", ".join(forbidden)}'}), 403
+    if 'student_id' not in fields:
+        fields.insert(0, 'student_id')
+
+    limit = min(max(request.args.get('limit', ROSTER_PAGE_SIZE, type=int), 1), ROSTER_MAX_PAGE_SIZE)
+
+    query = db.session.query(*[ROSTER_COLUMNS[f] for f in fields]).filter(
+        Student.class_id == class_id
+    )
+    rows, next_cursor = keyset_page(query, Student.student_id,
+                                    after=request.args.get('after'), limit=limit)
+
+    return jsonify({
+        'students': [
+            {field: (value.isoformat() if hasattr(value, 'isoformat') else value)
+             for field, value in zip(fields, row)}
+            for row in rows
+        ],
+        'next': next_cursor
+    })
 
 @bp.route('/search')
 @login_required
@@ -211,6 +374,37 @@ def search_classes():
         ]
     }
 
+@bp.route('/lookup')
+@login_required
+@admin_or_teacher_required
+def lookup_classes():
+    """
+    班級選項搜尋API - 供學生表單等搜尋式下拉選單使用
+    以班級ID為游標分頁，只讀取顯示所需的欄位
+    """
+    query_text = request.args.get('q', '').strip()
+    query = Class.query.with_entities(
+        Class.class_id, Class.class_name, Department.department_name
+    ).outerjoin(Class.department)
+
+    if query_text:
+        query = query.filter(Class.class_name.contains(query_text))
+
+    # 教師只能選擇自己擔任班導師的班級
+    if current_user.role == 'teacher':
+        query = query.filter(Class.teacher_id == current_user.related_id)
+
+    after = request.args.get('after', type=int)
+    classes, next_cursor = keyset_page(query, Class.class_id, after=after)
+
+    return jsonify({
+        'results': [
+            {'id': c.class_id, 'text': f"{c.class_name} ({c.department_name or ''})"}
+            for c in classes
+        ],
+        'next': next_cursor
+    })
+
 @bp.route('/my-class')
 @login_required
 def my_class():
@@ -227,7 +421,7 @@ def my_class():
         return redirect(url_for('index'))
 
     # 查找學生記錄
-    student = Student.query.filter_by(student_id=current_user.related_id).first()
+    student = get_student(current_user.related_id)
     if not student:
         flash('找不到您的學生資料', 'danger')
         return redirect(url_for('index'))
@@ -237,17 +431,17 @@ def my_class():
         return redirect(url_for('index'))
 
     # 查找班級信息
-    class_obj = Class.query.options(
-        joinedload(Class.department),
-        joinedload(Class.teacher),
-        joinedload(Class.students)
-    ).get(student.class_id)
+    class_obj = get_class(student.class_id)
 
     if not class_obj:
         flash('找不到您的班級資料', 'danger')
         return redirect(url_for('index'))
 
+    classmates, student_count = get_student_preview(class_obj.class_id, limit=MY_CLASS_PREVIEW_LIMIT)
+
     return render_template('classes/my_class.html',
                          title=f'我的班級 - {class_obj.class_name}',
                          class_obj=class_obj,
-                         student=student)
+                         student=student,
+                         classmates=classmates,
+                         student_count=student_count)
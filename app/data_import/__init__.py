@@ -0,0 +1,12 @@
+"""
+資料匯入藍圖初始化
+處理學生、教師、班級資料的批量匯入
+"""
+
+from flask import Blueprint
+
+# 創建資料匯入藍圖
+bp = Blueprint('data_import', __name__, url_prefix='/import')
+
+# 導入路由模塊（必須在藍圖創建後導入以避免循環導入）
+from app.data_import import routes
@@ -0,0 +1,34 @@
+"""
+資料匯入表單
+定義上傳匯入檔案的WTForms表單類
+"""
+
+from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import SelectField, BooleanField, SubmitField
+from wtforms.validators import DataRequired
+
+class ImportForm(FlaskForm):
+    """
+    匯入檔案上傳表單
+    """
+
+    # 資料種類選擇字段：必填
+    kind = SelectField('資料種類', choices=[
+        ('students', '學生'),
+        ('teachers', '教師'),
+        ('classes', '班級')
+    ], validators=[DataRequired(message='請選擇資料種類')],
+    render_kw={"class": "form-select"})
+
+    # 匯入檔案字段：必填，只接受CSV或XLSX
+    file = FileField('匯入檔案', validators=[
+        FileRequired(message='請選擇檔案'),
+        FileAllowed(['csv', 'xlsx'], message='只支援CSV或XLSX檔案')
+    ])
+
+    # 只驗證不寫入
+    dry_run = BooleanField('只檢查資料，不寫入')
+
+    # 提交按鈕
+    submit = SubmitField('開始匯入')
@@ -0,0 +1,52 @@
+"""
+資料匯入路由
+處理管理員上傳CSV/XLSX檔案並批量匯入資料
+"""
+
+from flask import render_template, flash, current_app
+from flask_login import login_required
+from app.data_import import bp
+from app.data_import.forms import ImportForm
+from app.models.importer import read_rows, import_rows, DEFAULT_BATCH_SIZE
+from app.user_management.decorators import admin_required
+
+# 頁面上最多顯示的錯誤行數
+MAX_DISPLAYED_ERRORS = 200
+
+
+@bp.route('/', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def upload():
+    """
+    資料匯入頁面 - 僅管理員可訪問
+    上傳的檔案逐行讀取並分批寫入，無效的行列出行號和原因
+
+    Returns:
+        str: 匯入頁面，匯入後附帶結果摘要
+    """
+    form = ImportForm()
+    result = None
+
+    if form.validate_on_submit():
+        upload_file = form.file.data
+        batch_size = current_app.config.get('IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        try:
+            rows = read_rows(upload_file.stream, upload_file.filename)
+            result = import_rows(form.kind.data, rows, batch_size=batch_size,
+                                 dry_run=form.dry_run.data)
+        except ValueError as e:
+            flash(str(e), 'danger')
+        else:
+            if form.dry_run.data:
+                flash(f'檢查完成：共{result.total}行，{result.inserted}行有效，{result.failed}行有錯誤', 'info')
+            elif result.failed:
+                flash(f'匯入完成：共{result.total}行，成功{result.inserted}行，{result.failed}行失敗', 'warning')
+            else:
+                flash(f'匯入完成：成功匯入{result.inserted}行', 'success')
+
+    return render_template('data_import/upload.html',
+                           title='資料匯入',
+                           form=form,
+                           result=result,
+                           max_errors=MAX_DISPLAYED_ERRORS)
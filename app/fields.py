@@ -0,0 +1,99 @@
+"""
+自定義表單字段
+提供以搜尋API動態載入選項的下拉選擇字段，取代預先載入所有選項的SelectField
+"""
+
+from flask import url_for
+from markupsafe import Markup, escape
+from wtforms import Field
+from wtforms.validators import ValidationError
+from wtforms.widgets import html_params
+from sqlalchemy import inspect
+from app import db
+
+
+class LookupSelect:
+    """
+    搜尋式下拉選單部件
+    只輸出空白選項和當前選中的選項，其餘選項由前端腳本根據data-lookup-url載入
+    """
+
+    def __call__(self, field, **kwargs):
+        kwargs.setdefault('id', field.id)
+        kwargs['data-lookup-url'] = url_for(field.endpoint)
+        html = [f'<select {html_params(name=field.name, **kwargs)}>']
+        html.append(f'<option value=""{" selected" if field.data is None else ""}>'
+                    f'{escape(field.placeholder)}</option>')
+        if field.data is not None:
+            html.append(f'<option value="{escape(field.data)}" selected>'
+                        f'{escape(field.selected_label())}</option>')
+        html.append('</select>')
+        return Markup(''.join(html))
+
+
+class LookupField(Field):
+    """
+    搜尋式關聯選擇字段
+    提交的ID以一次主鍵查詢驗證是否存在，不需要將所有選項載入到choices中
+
+    Args:
+        label: 字段標籤
+        validators: 驗證器列表
+        model: 關聯的模型類
+        endpoint: 提供選項搜尋的JSON端點名稱
+        get_label: 根據模型對象生成顯示文字的函數
+        coerce: 提交值的類型轉換函數
+        placeholder: 未選擇時顯示的文字
+    """
+    widget = LookupSelect()
+
+    def __init__(self, label=None, validators=None, model=None, endpoint=None,
+                 get_label=str, coerce=str, placeholder='-- 請選擇 --', **kwargs):
+        super(LookupField, self).__init__(label, validators, **kwargs)
+        self.model = model
+        self.endpoint = endpoint
+        self.get_label = get_label
+        self.coerce = coerce
+        self.placeholder = placeholder
+        # 可選的查詢範圍限制函數，接收並返回查詢對象（例如限制教師只能選擇自己的班級）
+        self.scope = None
+
+    def process_data(self, value):
+        if value is None or value == '':
+            self.data = None
+            return
+        try:
+            self.data = self.coerce(value)
+        except (ValueError, TypeError):
+            self.data = None
+
+    def process_formdata(self, valuelist):
+        if not valuelist or valuelist[0] == '':
+            self.data = None
+            return
+        try:
+            self.data = self.coerce(valuelist[0])
+        except (ValueError, TypeError):
+            self.data = None
+            raise ValueError('無效的選項')
+
+    def pre_validate(self, form):
+        """以主鍵查詢驗證提交的ID是否存在且在允許的範圍內"""
+        if self.data is None:
+            return
+
+        primary_key = inspect(self.model).primary_key[0]
+        query = db.session.query(primary_key).filter(primary_key == self.data)
+        if self.scope is not None:
+            query = self.scope(query)
+
+        if not db.session.query(query.exists()).scalar():
+            raise ValidationError('請選擇有效的選項')
+
+    def selected_label(self):
+        """返回當前選中項目的顯示文字"""
+        obj = db.session.get(self.model, self.data)
+        return self.get_label(obj) if obj is not None else str(self.data)
+
+    def _value(self):
+        return '' if self.data is None else str(self.data)
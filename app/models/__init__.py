@@ -5,7 +5,7 @@
 
 from datetime import datetime, timezone
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.passwords import hash_password, verify_password
 from app import db, login_manager
 
 def get_current_time():
@@ -19,15 +19,16 @@ def get_current_time():
 def load_user(id):
     """
     Flask-Login用戶載入回調函數
-    根據用戶ID從數據庫載入用戶對象
+    根據用戶ID載入用戶快照，快取命中時不查詢數據庫
 
     Args:
         id (str): 用戶ID
 
     Returns:
-        User: 用戶對象，如果不存在則返回None
+        UserSnapshot: 用戶快照，如果不存在則返回None
     """
-    return User.query.get(int(id))
+    from app.models.user_cache import get_user
+    return get_user(int(id))
 
 class User(UserMixin, db.Model):
     """
@@ -37,6 +38,12 @@ class User(UserMixin, db.Model):
     """
     __tablename__ = 'users'
 
+    # 列表排序使用的複合索引（排序欄位, 主鍵）
+    __table_args__ = (
+        db.Index('ix_users_role_user_id', 'role', 'user_id'),
+        db.Index('ix_users_created_at_user_id', 'created_at', 'user_id'),
+    )
+
     # 主鍵：用戶ID
     user_id = db.Column(db.Integer, primary_key=True)
 
@@ -55,8 +62,8 @@ class User(UserMixin, db.Model):
     # 賬戶狀態：是否啟用，默認為啟用
     is_active = db.Column(db.Boolean, default=True)
 
-    # 最後登錄時間
-    last_login = db.Column(db.TIMESTAMP)
+    # 最後登錄時間：由app.models.activity批量寫入，首頁「最近登錄」按此欄位排序
+    last_login = db.Column(db.TIMESTAMP, index=True)
 
     # 創建時間：使用應用伺服器時間
     created_at = db.Column(db.TIMESTAMP, default=get_current_time)
@@ -77,17 +84,17 @@ class User(UserMixin, db.Model):
     def set_password(self, password):
         """
         設置用戶密碼
-        將明文密碼進行哈希加密後存儲
+        將明文密碼進行哈希加密後存儲，哈希運算在密碼進程池中執行
 
         Args:
             password (str): 明文密碼
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         """
         驗證用戶密碼
-        將輸入的明文密碼與存儲的哈希值進行比較
+        將輸入的明文密碼與存儲的哈希值進行比較，驗證運算在密碼進程池中執行
 
         Args:
             password (str): 待驗證的明文密碼
@@ -95,7 +102,7 @@ class User(UserMixin, db.Model):
         Returns:
             bool: 密碼是否正確
         """
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     def __repr__(self):
         """
@@ -113,20 +120,28 @@ class Student(db.Model):
     """
     __tablename__ = 'students'
 
+    # 列表排序使用的複合索引（排序欄位, 主鍵）
+    __table_args__ = (
+        db.Index('ix_students_name_student_id', 'name', 'student_id'),
+        db.Index('ix_students_created_at_student_id', 'created_at', 'student_id'),
+        # 班級名單按學號游標分頁時沿此索引範圍讀取
+        db.Index('ix_students_class_id_student_id', 'class_id', 'student_id'),
+    )
+
     # 主鍵：學生學號
     student_id = db.Column(db.String(20), primary_key=True)
 
     # 學生姓名：不能為空
     name = db.Column(db.String(100), nullable=False)
 
-    # 班級ID：外鍵關聯到classes表
+    # 班級ID：外鍵關聯到classes表，由（班級ID, 學號）複合索引支援按班級查詢學生
     class_id = db.Column(db.Integer, db.ForeignKey('classes.class_id'))
 
-    # 性別：男或女，不能為空
-    gender = db.Column(db.Enum('男', '女'), nullable=False)
+    # 性別：男或女，不能為空，建立索引以支援篩選
+    gender = db.Column(db.Enum('男', '女'), nullable=False, index=True)
 
-    # 出生日期
-    birth_date = db.Column(db.Date)
+    # 出生日期，建立索引以支援範圍篩選
+    birth_date = db.Column(db.Date, index=True)
 
     # 住址
     address = db.Column(db.String(200))
@@ -137,11 +152,11 @@ class Student(db.Model):
     # 電子郵箱
     email = db.Column(db.String(100))
 
-    # 入學日期
-    enrollment_date = db.Column(db.Date)
+    # 入學日期，建立索引以支援範圍篩選
+    enrollment_date = db.Column(db.Date, index=True)
 
-    # 學籍狀態：在學、休學、退學、畢業
-    status = db.Column(db.Enum('在學', '休學', '退學', '畢業'))
+    # 學籍狀態：在學、休學、退學、畢業，建立索引以支援篩選
+    status = db.Column(db.Enum('在學', '休學', '退學', '畢業'), index=True)
 
     # 身份證號碼
     id_number = db.Column(db.String(18))
@@ -178,14 +193,14 @@ class Class(db.Model):
     # 班級名稱：不能為空
     class_name = db.Column(db.String(100), nullable=False)
 
-    # 年級：不能為空
-    grade = db.Column(db.Integer, nullable=False)
+    # 年級：不能為空，建立索引以支援按年級篩選
+    grade = db.Column(db.Integer, nullable=False, index=True)
 
-    # 所屬部門ID：外鍵關聯到departments表
-    department_id = db.Column(db.Integer, db.ForeignKey('departments.department_id'))
+    # 所屬部門ID：外鍵關聯到departments表，建立索引以支援按系所篩選
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.department_id'), index=True)
 
-    # 班主任教師ID：外鍵關聯到teachers表
-    teacher_id = db.Column(db.String(20), db.ForeignKey('teachers.teacher_id'))
+    # 班主任教師ID：外鍵關聯到teachers表，建立索引以支援按班導師查詢班級
+    teacher_id = db.Column(db.String(20), db.ForeignKey('teachers.teacher_id'), index=True)
 
     # 關聯關係：班級所屬部門
     department = db.relationship('Department', backref='classes')
@@ -233,17 +248,23 @@ class Teacher(db.Model):
     """
     __tablename__ = 'teachers'
 
+    # 列表排序使用的複合索引（排序欄位, 主鍵）
+    __table_args__ = (
+        db.Index('ix_teachers_name_teacher_id', 'name', 'teacher_id'),
+        db.Index('ix_teachers_created_at_teacher_id', 'created_at', 'teacher_id'),
+    )
+
     # 主鍵：教師編號
     teacher_id = db.Column(db.String(20), primary_key=True)
 
     # 教師姓名：不能為空
     name = db.Column(db.String(100), nullable=False)
 
-    # 性別：男或女，不能為空
-    gender = db.Column(db.Enum('男', '女'), nullable=False)
+    # 性別：男或女，不能為空，建立索引以支援篩選
+    gender = db.Column(db.Enum('男', '女'), nullable=False, index=True)
 
-    # 出生日期
-    birth_date = db.Column(db.Date)
+    # 出生日期，建立索引以支援範圍篩選
+    birth_date = db.Column(db.Date, index=True)
 
     # 身份證號碼
     id_number = db.Column(db.String(18))
@@ -257,14 +278,14 @@ class Teacher(db.Model):
     # 電子郵箱
     email = db.Column(db.String(100))
 
-    # 所屬部門ID：外鍵關聯到departments表
-    department_id = db.Column(db.Integer, db.ForeignKey('departments.department_id'))
+    # 所屬部門ID：外鍵關聯到departments表，建立索引以支援按系所篩選
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.department_id'), index=True)
 
     # 職位
     position = db.Column(db.String(100))
 
-    # 入職日期
-    hire_date = db.Column(db.Date)
+    # 入職日期，建立索引以支援範圍篩選
+    hire_date = db.Column(db.Date, index=True)
 
     # 薪資
     salary = db.Column(db.Numeric(10, 2))
@@ -289,4 +310,87 @@ class Teacher(db.Model):
         Returns:
             str: 教師對象的描述
         """
-        return f'<Teacher {self.name}>'
\ No newline at end of file
+        return f'<Teacher {self.name}>'
+
+class RolloverRun(db.Model):
+    """
+    學年升級記錄
+    每個學年一筆，記錄執行進度（階段及游標）以便中斷後續跑，完成後保存受影響的行數
+    """
+    __tablename__ = 'rollover_runs'
+
+    # 主鍵：記錄ID
+    run_id = db.Column(db.Integer, primary_key=True)
+
+    # 學年標識，每個學年只能升級一次
+    school_year = db.Column(db.String(20), nullable=False, unique=True)
+
+    # 畢業年級：此年級及以上班級的在學學生改為畢業，其餘班級升一年級
+    final_grade = db.Column(db.Integer, nullable=False)
+
+    # 當前階段：graduate（畢業）、promote（升級）、done（完成）
+    phase = db.Column(db.String(20), nullable=False, default='graduate')
+
+    # 當前階段已處理到的鍵值（畢業階段為學號，升級階段為班級ID）
+    cursor = db.Column(db.String(20))
+
+    # 改為畢業的學生人數
+    students_graduated = db.Column(db.Integer, nullable=False, default=0)
+
+    # 升級的班級數量
+    classes_promoted = db.Column(db.Integer, nullable=False, default=0)
+
+    # 開始及完成時間
+    started_at = db.Column(db.TIMESTAMP, default=get_current_time)
+    finished_at = db.Column(db.TIMESTAMP)
+
+    def __repr__(self):
+        """
+        對象的字符串表示
+
+        Returns:
+            str: 升級記錄的描述
+        """
+        return f'<RolloverRun {self.school_year} {self.phase}>'
+
+class DuplicateCandidate(db.Model):
+    """
+    疑似重複學生記錄
+    由重複檢測產生的候選配對，供管理員審核後合併或標記為非重複
+    """
+    __tablename__ = 'duplicate_candidates'
+
+    # 每對學生只保留一筆記錄（學號較小者為student_id_a）；審核佇列按狀態及分數排序
+    __table_args__ = (
+        db.UniqueConstraint('student_id_a', 'student_id_b', name='uq_duplicate_candidates_pair'),
+        db.Index('ix_duplicate_candidates_status_score', 'status', 'score'),
+    )
+
+    # 主鍵：記錄ID
+    candidate_id = db.Column(db.Integer, primary_key=True)
+
+    # 配對的兩個學號，建立索引以支援合併後清理涉及某學號的記錄
+    student_id_a = db.Column(db.String(20), nullable=False)
+    student_id_b = db.Column(db.String(20), nullable=False, index=True)
+
+    # 相似度分數（0-1）
+    score = db.Column(db.Float, nullable=False)
+
+    # 判定依據，例如「身份證號相同, 姓名相似」
+    reasons = db.Column(db.String(200))
+
+    # 審核狀態：pending（待審核）、merged（已合併）、dismissed（非重複）
+    status = db.Column(db.String(20), nullable=False, default='pending')
+
+    # 記錄創建及審核時間
+    created_at = db.Column(db.TIMESTAMP, default=get_current_time)
+    reviewed_at = db.Column(db.TIMESTAMP)
+
+    def __repr__(self):
+        """
+        對象的字符串表示
+
+        Returns:
+            str: 候選配對的描述
+        """
+        return f'<DuplicateCandidate {self.student_id_a}-{self.student_id_b} {self.score:.2f}>'
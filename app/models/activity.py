@@ -0,0 +1,148 @@
+"""
+最後登入時間記錄
+登入（及可選的活動）時間先暫存在進程內存中，由背景線程定期以批量UPDATE寫入users.last_login，
+避免每次登入都對用戶表進行一次同步寫入
+同一用戶在兩次寫入之間只保留最新的時間；寫入失敗時放回暫存等待下次重試
+進程正常結束時（atexit）會寫入剩餘的暫存資料
+"""
+
+import atexit
+import threading
+from datetime import datetime
+from sqlalchemy import bindparam, or_
+from app import db
+from app.models import User
+
+# 默認寫入間隔（秒）
+DEFAULT_FLUSH_INTERVAL = 30
+
+# 暫存筆數達到此數量時提前寫入
+DEFAULT_FLUSH_SIZE = 500
+
+_lock = threading.Lock()
+_pending = {}  # 用戶ID -> 最新的登入時間
+_flush_requested = threading.Event()
+_app = None
+_worker = None
+
+
+def init_app(app):
+    """
+    登記用於背景寫入的應用實例
+    背景線程在首次記錄時才啟動，命令行工具及未登入的進程不會建立線程
+
+    Args:
+        app: Flask應用實例
+    """
+    global _app
+    _app = app
+
+    if app.config.get('LAST_SEEN_ON_ACTIVITY'):
+        from flask_login import current_user
+
+        @app.before_request
+        def _record_activity():
+            """已登入用戶的每個請求都更新最後活動時間"""
+            if current_user.is_authenticated:
+                record(current_user.user_id)
+
+
+def record(user_id, when=None):
+    """
+    記錄用戶的登入或活動時間
+
+    Args:
+        user_id: 用戶ID
+        when: 時間，默認為當前時間
+
+    Raises:
+        RuntimeError: 尚未調用init_app時拋出，否則暫存的時間無法寫入
+    """
+    if _app is None:
+        raise RuntimeError('activity.init_app()尚未調用，無法記錄登入時間')
+    when = when or datetime.now()
+    with _lock:
+        previous = _pending.get(user_id)
+        if previous is None or previous < when:
+            _pending[user_id] = when
+        pending_count = len(_pending)
+    _ensure_worker()
+
+    if pending_count >= _config('LAST_LOGIN_FLUSH_SIZE', DEFAULT_FLUSH_SIZE):
+        _flush_requested.set()
+
+
+def flush():
+    """
+    將暫存的登入時間以一次批量UPDATE寫入數據庫
+    只會將時間往後更新，不會覆蓋較新的記錄
+
+    Returns:
+        int: 寫入的用戶數量
+    """
+    global _pending
+    if _app is None:
+        return 0
+    with _lock:
+        batch, _pending = _pending, {}
+    if not batch:
+        return 0
+
+    users = User.__table__
+    statement = users.update().where(
+        users.c.user_id == bindparam('uid')
+    ).where(
+        or_(users.c.last_login.is_(None), users.c.last_login < bindparam('ts'))
+    ).values(
+        last_login=bindparam('ts'),
+        updated_at=users.c.updated_at  # 登入不算修改用戶資料
+    )
+    params = [{'uid': user_id, 'ts': when} for user_id, when in batch.items()]
+
+    with _app.app_context():
+        try:
+            db.session.execute(statement, params)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            # 放回暫存，保留較新的時間，下次再試
+            with _lock:
+                for user_id, when in batch.items():
+                    if user_id not in _pending or _pending[user_id] < when:
+                        _pending[user_id] = when
+            _app.logger.warning('寫入最後登入時間失敗: %s', e)
+            return 0
+        finally:
+            db.session.remove()
+    return len(batch)
+
+
+def _config(key, default):
+    """讀取應用配置"""
+    return _app.config.get(key, default) if _app is not None else default
+
+
+def _ensure_worker():
+    """啟動背景寫入線程（每個進程一個）"""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='last-login-flush', daemon=True)
+            _worker.start()
+
+
+def _run():
+    """背景線程：每隔固定間隔或暫存過多時寫入"""
+    interval = _config('LAST_LOGIN_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+    while True:
+        _flush_requested.wait(interval)
+        _flush_requested.clear()
+        flush()
+
+
+@atexit.register
+def _flush_at_exit():
+    """進程結束前寫入剩餘的暫存資料"""
+    flush()
@@ -0,0 +1,411 @@
+"""
+數據庫備份及還原
+將各模型表匯出為gzip壓縮的NDJSON檔案（每行一個JSON陣列，欄位順序記錄在manifest.json），並可還原到同一或另一個數據庫，
+也可用於將正式環境的資料複製到測試環境
+
+匯出：
+- 多個線程並行匯出不同的表，每個線程使用各自的連線，以伺服器端游標按主鍵順序逐批讀取並直接寫入壓縮檔，記憶體用量固定
+- 所有連線讀取同一個一致的快照：MySQL以短暫的全局讀鎖同時開啟各連線的一致性快照事務（並記錄binlog位置），
+  PostgreSQL匯出快照供其他連線共用；其他數據庫（或沒有加鎖權限時）改為單一連線、單一事務依序匯出
+- manifest.json在全部表匯出完成後才寫入，沒有manifest的目錄視為不完整的備份
+
+還原：
+- 按外鍵依賴順序逐表讀取，以executemany INSERT分批寫入，每批一個事務
+- MySQL在還原期間關閉外鍵及唯一性檢查；二級索引在寫入前刪除、全部寫入後再建立（外鍵欄位上的索引保留）
+- PostgreSQL還原後將自增主鍵的序列調整到最大值
+"""
+
+import gzip
+import json
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time
+from decimal import Decimal
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+from app import db
+
+# 默認並行匯出的線程數
+DEFAULT_WORKERS = 4
+
+# 默認每批讀取及寫入的行數
+DEFAULT_BATCH_SIZE = 5000
+
+# gzip壓縮等級，較高的等級壓縮率提升有限但明顯較慢
+COMPRESS_LEVEL = 6
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+
+class BackupError(RuntimeError):
+    """備份或還原無法執行"""
+
+
+class BackupResult:
+    """
+    備份或還原結果
+
+    Attributes:
+        tables: 表名 -> 行數
+        snapshot: 快照資訊（匯出時的數據庫類型、時間、一致性方式及binlog位置等）
+    """
+
+    def __init__(self, tables, snapshot):
+        self.tables = tables
+        self.snapshot = snapshot
+
+    @property
+    def rows(self):
+        return sum(self.tables.values())
+
+
+def _select_tables(names=None):
+    """按外鍵依賴順序取得要處理的表"""
+    tables = db.metadata.sorted_tables
+    if not names:
+        return tables
+    known = {table.name for table in tables}
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise BackupError(f'未知的表：{", ".join(unknown)}')
+    return [table for table in tables if table.name in names]
+
+
+def _file_name(table):
+    return f'{table.name}.ndjson.gz'
+
+
+def _encode(value):
+    """將JSON不支援的欄位值轉換為字串"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f'無法序列化{type(value).__name__}')
+
+
+def _decoder(column):
+    """取得將匯出的欄位值還原為Python型別的函數，不需要轉換時返回None"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat
+    if python_type is date:
+        return date.fromisoformat
+    if python_type is time:
+        return time.fromisoformat
+    if python_type is Decimal:
+        return Decimal
+    if python_type is bytes:
+        return bytes.fromhex
+    return None
+
+
+# ---------------------------------------------------------------------------
+# 匯出
+# ---------------------------------------------------------------------------
+
+def _open_snapshot(engine, workers):
+    """
+    開啟讀取同一快照的連線
+
+    Args:
+        engine: 數據庫引擎
+        workers: 希望開啟的連線數
+
+    Returns:
+        tuple: (連線列表, 快照資訊)
+    """
+    dialect = engine.dialect.name
+    snapshot = {'dialect': dialect, 'taken_at': datetime.now().isoformat(timespec='seconds')}
+
+    if dialect in ('mysql', 'mariadb'):
+        # 全局讀鎖期間開啟的一致性快照事務看到的是同一時間點；沒有RELOAD權限時改為單一連線
+        lock = engine.connect()
+        try:
+            try:
+                lock.exec_driver_sql('FLUSH TABLES WITH READ LOCK')
+            except DBAPIError:
+                lock.rollback()
+                workers = 1
+                locked = False
+            else:
+                locked = True
+            connections = []
+            for _ in range(workers):
+                conn = engine.connect()
+                conn.exec_driver_sql('SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+                conn.exec_driver_sql('START TRANSACTION WITH CONSISTENT SNAPSHOT')
+                connections.append(conn)
+            for statement in ('SHOW MASTER STATUS', 'SHOW BINARY LOG STATUS'):
+                try:
+                    row = lock.exec_driver_sql(statement).first()
+                except DBAPIError:
+                    continue
+                if row is not None:
+                    snapshot['binlog_file'], snapshot['binlog_position'] = row[0], row[1]
+                break
+            if locked:
+                lock.exec_driver_sql('UNLOCK TABLES')
+        finally:
+            lock.close()
+        snapshot['consistency'] = 'consistent-snapshot' if locked else 'single-transaction'
+        return connections, snapshot
+
+    if dialect == 'postgresql':
+        # 第一個連線匯出快照，其他連線在各自的事務中使用同一快照
+        lead = engine.connect().execution_options(isolation_level='REPEATABLE READ')
+        snapshot['snapshot'] = lead.exec_driver_sql('SELECT pg_export_snapshot()').scalar()
+        snapshot['lsn'] = str(lead.exec_driver_sql('SELECT pg_current_wal_lsn()').scalar())
+        connections = [lead]
+        for _ in range(workers - 1):
+            conn = engine.connect().execution_options(isolation_level='REPEATABLE READ')
+            conn.exec_driver_sql(f"SET TRANSACTION SNAPSHOT '{snapshot['snapshot']}'")
+            connections.append(conn)
+        snapshot['consistency'] = 'exported-snapshot'
+        return connections, snapshot
+
+    conn = engine.connect()
+    if dialect == 'sqlite':
+        # pysqlite只在寫入前自動開始事務，明確開始事務使整個匯出讀取同一版本
+        conn.exec_driver_sql('BEGIN')
+    snapshot['consistency'] = 'single-transaction'
+    return [conn], snapshot
+
+
+def _dump_table(conn, table, path, batch_size):
+    """以伺服器端游標按主鍵順序讀取一個表並寫入壓縮檔，返回行數"""
+    statement = select(table).order_by(*table.primary_key.columns)
+    result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=COMPRESS_LEVEL) as stream:
+        for rows in result.partitions():
+            stream.write(''.join(
+                json.dumps(list(row), ensure_ascii=False, default=_encode, separators=(',', ':')) + '\n'
+                for row in rows
+            ))
+            count += len(rows)
+    return count
+
+
+def dump(directory, tables=None, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    匯出數據庫到目錄
+
+    Args:
+        directory: 輸出目錄，不存在時建立，已存在時必須為空
+        tables: 要匯出的表名列表，未指定時為全部模型表
+        workers: 並行匯出的線程數
+        batch_size: 每批讀取的行數
+        progress: 每個表完成後調用的回調函數，參數為(表名, 行數)
+
+    Returns:
+        BackupResult: 匯出結果
+
+    Raises:
+        BackupError: 輸出目錄不為空或表名未知時拋出
+    """
+    selected = _select_tables(tables)
+    if os.path.isdir(directory) and os.listdir(directory):
+        raise BackupError(f'輸出目錄{directory}不為空')
+    os.makedirs(directory, exist_ok=True)
+
+    engine = db.engine
+    connections, snapshot = _open_snapshot(engine, max(1, min(workers, len(selected))))
+    idle = queue.Queue()
+    for conn in connections:
+        idle.put(conn)
+
+    def run(table):
+        conn = idle.get()
+        try:
+            return table.name, _dump_table(conn, table, os.path.join(directory, _file_name(table)), batch_size)
+        finally:
+            idle.put(conn)
+
+    counts = {}
+    try:
+        with ThreadPoolExecutor(max_workers=len(connections)) as executor:
+            for name, count in executor.map(run, selected):
+                counts[name] = count
+                if progress:
+                    progress(name, count)
+    finally:
+        for conn in connections:
+            conn.rollback()
+            conn.close()
+
+    manifest = {
+        'format': FORMAT_VERSION,
+        'snapshot': snapshot,
+        'tables': [
+            {
+                'name': table.name,
+                'file': _file_name(table),
+                'columns': [column.name for column in table.columns],
+                'rows': counts[table.name],
+            }
+            for table in selected
+        ],
+    }
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as stream:
+        json.dump(manifest, stream, ensure_ascii=False, indent=2)
+    return BackupResult(counts, snapshot)
+
+
+# ---------------------------------------------------------------------------
+# 還原
+# ---------------------------------------------------------------------------
+
+def read_manifest(directory):
+    """
+    讀取備份目錄的manifest
+
+    Args:
+        directory: 備份目錄
+
+    Returns:
+        dict: manifest內容
+
+    Raises:
+        BackupError: manifest不存在（備份不完整）或格式不支援時拋出
+    """
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.isfile(path):
+        raise BackupError(f'{directory}中沒有{MANIFEST}，備份不完整或不是備份目錄')
+    with open(path, encoding='utf-8') as stream:
+        manifest = json.load(stream)
+    if manifest.get('format') != FORMAT_VERSION:
+        raise BackupError(f'不支援的備份格式：{manifest.get("format")}')
+    return manifest
+
+
+def _deferrable_indexes(table):
+    """
+    還原前可刪除、還原後再建立的索引
+    首欄為外鍵欄位的索引保留，MySQL的外鍵需要該索引
+    """
+    return [
+        index for index in table.indexes
+        if not list(index.columns)[0].foreign_keys
+    ]
+
+
+def _set_checks(conn, enabled):
+    """MySQL還原期間關閉外鍵及唯一性檢查；其他數據庫按外鍵依賴順序寫入"""
+    if conn.dialect.name in ('mysql', 'mariadb'):
+        value = 1 if enabled else 0
+        conn.exec_driver_sql(f'SET FOREIGN_KEY_CHECKS = {value}, UNIQUE_CHECKS = {value}')
+
+
+def _reset_sequences(conn, table):
+    """PostgreSQL寫入明確的主鍵值後，將自增主鍵的序列調整到目前最大值"""
+    column = table.autoincrement_column
+    if column is not None:
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', '{column.name}'), "
+            f"COALESCE(MAX({column.name}), 1), MAX({column.name}) IS NOT NULL) FROM {table.name}"
+        )
+
+
+def _read_rows(path, columns, decoders, batch_size):
+    """逐批讀取匯出檔並轉換為欄位字典"""
+    batch = []
+    with gzip.open(path, 'rt', encoding='utf-8') as stream:
+        for line in stream:
+            values = json.loads(line)
+            for i, decode in decoders:
+                if values[i] is not None:
+                    values[i] = decode(values[i])
+            batch.append(dict(zip(columns, values)))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def restore(directory, tables=None, batch_size=DEFAULT_BATCH_SIZE, replace=False, progress=None):
+    """
+    從備份目錄還原數據庫
+
+    Args:
+        directory: dump產生的備份目錄
+        tables: 要還原的表名列表，未指定時為備份中的全部表
+        batch_size: 每批寫入的行數
+        replace: 是否先清空目標表；否則目標表必須為空
+        progress: 每批提交後調用的回調函數，參數為(表名, 已寫入行數)
+
+    Returns:
+        BackupResult: 還原結果
+
+    Raises:
+        BackupError: 備份不完整、欄位與目前的表不相符或目標表不為空時拋出
+    """
+    manifest = read_manifest(directory)
+    entries = {entry['name']: entry for entry in manifest['tables']}
+    selected = [table for table in _select_tables(tables) if table.name in entries]
+    if tables:
+        missing = [name for name in tables if name not in entries]
+        if missing:
+            raise BackupError(f'備份中沒有表：{", ".join(missing)}')
+
+    for table in selected:
+        unknown = [name for name in entries[table.name]['columns'] if name not in table.c]
+        if unknown:
+            raise BackupError(f'{table.name}的欄位{", ".join(unknown)}在目前的數據庫中不存在')
+        if not os.path.isfile(os.path.join(directory, entries[table.name]['file'])):
+            raise BackupError(f'缺少{table.name}的匯出檔')
+
+    counts = {}
+    with db.engine.connect() as conn:
+        if replace:
+            for table in reversed(selected):
+                conn.execute(table.delete())
+            conn.commit()
+        else:
+            occupied = [table.name for table in selected
+                        if conn.execute(select(func.count()).select_from(table)).scalar()]
+            if occupied:
+                raise BackupError(f'目標表不為空：{", ".join(occupied)}（使用replace先清空）')
+
+        _set_checks(conn, False)
+        dropped = [index for table in selected for index in _deferrable_indexes(table)]
+        conn.commit()
+        for index in dropped:
+            index.drop(conn, checkfirst=True)
+        conn.commit()
+
+        try:
+            for table in selected:
+                entry = entries[table.name]
+                columns = entry['columns']
+                decoders = [(i, decode) for i, decode in
+                            ((i, _decoder(table.c[name])) for i, name in enumerate(columns)) if decode]
+                count = 0
+                insert = table.insert()
+                for batch in _read_rows(os.path.join(directory, entry['file']), columns, decoders, batch_size):
+                    conn.execute(insert, batch)
+                    conn.commit()
+                    count += len(batch)
+                    if progress:
+                        progress(table.name, count)
+                counts[table.name] = count
+                if conn.dialect.name == 'postgresql':
+                    _reset_sequences(conn, table)
+                    conn.commit()
+        finally:
+            # 中途失敗時也重建索引及恢復檢查，數據庫不會留在缺少索引的狀態
+            conn.rollback()
+            for index in dropped:
+                index.create(conn, checkfirst=True)
+            _set_checks(conn, True)
+            conn.commit()
+
+    return BackupResult(counts, manifest['snapshot'])
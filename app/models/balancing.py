@@ -0,0 +1,198 @@
+"""
+分班平衡
+將未分班的學生分配到同年級（可限定系所）的候選班級，使各班人數及性別比例盡量平均
+
+演算法（O(n log n)）：
+- 每種性別一個最小堆，鍵為（班級人數, 該性別人數, 班級ID）；學生分配後以新版本號重新推入各個堆，
+  舊的堆項目在彈出時按版本號略過
+- 各性別的學生按比例交錯排序後依序分配，人數較少的性別也會平均分散到各班
+- 可選的班級人數上限：已滿的班級不再分配，未能分配的學生列入結果
+
+預覽不修改任何資料；套用時以一條executemany UPDATE寫入，只更新仍未分班的學生
+"""
+
+import heapq
+from collections import namedtuple
+from datetime import date, datetime
+from sqlalchemy import bindparam, func
+from app import db
+from app.models import Student, Class
+
+# 參與分班的學籍狀態
+ELIGIBLE_STATUS = '在學'
+
+ClassLoad = namedtuple('ClassLoad', 'class_id class_name size_before size_after genders_before genders_after')
+
+
+class AssignmentPlan:
+    """
+    分班預覽
+
+    Attributes:
+        assignments: 學號 -> 班級ID
+        classes: 各候選班級分班前後的人數及性別人數（ClassLoad列表）
+        unplaced: 因班級已滿而未能分配的學號列表
+    """
+
+    def __init__(self, assignments, classes, unplaced):
+        self.assignments = assignments
+        self.classes = classes
+        self.unplaced = unplaced
+
+
+def candidate_classes(grade, department_id=None):
+    """
+    取得候選班級
+
+    Args:
+        grade: 年級
+        department_id: 系所ID，未指定時為該年級的全部班級
+
+    Returns:
+        list: (班級ID, 班級名稱)列表
+    """
+    query = db.session.query(Class.class_id, Class.class_name).filter(Class.grade == grade)
+    if department_id:
+        query = query.filter(Class.department_id == department_id)
+    return query.order_by(Class.class_id).all()
+
+
+def unassigned_students(enrollment_year=None):
+    """
+    取得未分班的在學學生
+
+    Args:
+        enrollment_year: 入學年份，未指定時不限
+
+    Returns:
+        list: (學號, 性別)列表，按學號排序
+    """
+    query = db.session.query(Student.student_id, Student.gender).filter(
+        Student.class_id.is_(None), Student.status == ELIGIBLE_STATUS
+    )
+    if enrollment_year:
+        # 以日期範圍篩選，可使用入學日期索引
+        query = query.filter(Student.enrollment_date >= date(enrollment_year, 1, 1),
+                             Student.enrollment_date < date(enrollment_year + 1, 1, 1))
+    return query.order_by(Student.student_id).all()
+
+
+def _interleave(students):
+    """
+    按性別比例交錯排列學生
+    每個性別的第i個學生排序鍵為(i + 0.5) / 該性別人數，合併後各性別均勻分布
+
+    Args:
+        students: (學號, 性別)列表
+
+    Returns:
+        list: 排列後的(學號, 性別)列表
+    """
+    by_gender = {}
+    for student in students:
+        by_gender.setdefault(student[1], []).append(student)
+    keyed = [
+        ((i + 0.5) / len(group), student)
+        for group in by_gender.values()
+        for i, student in enumerate(group)
+    ]
+    keyed.sort(key=lambda item: (item[0], item[1][0]))
+    return [student for _, student in keyed]
+
+
+def plan_assignment(students, classes, capacity=None, balance_gender=True):
+    """
+    計算分班結果，不修改任何資料
+
+    Args:
+        students: 待分班的(學號, 性別)列表
+        classes: 候選班級的(班級ID, 班級名稱)列表
+        capacity: 每班人數上限，未指定時不限
+        balance_gender: 是否平衡各班性別人數；否則只平衡總人數
+
+    Returns:
+        AssignmentPlan: 分班預覽
+    """
+    class_ids = [class_id for class_id, _ in classes]
+    sizes = dict.fromkeys(class_ids, 0)
+    genders = {class_id: {} for class_id in class_ids}
+
+    # 以一次分組查詢取得各候選班級現有的人數及性別人數
+    if class_ids:
+        rows = db.session.query(Student.class_id, Student.gender, func.count(Student.student_id)).filter(
+            Student.class_id.in_(class_ids), Student.status == ELIGIBLE_STATUS
+        ).group_by(Student.class_id, Student.gender)
+        for class_id, gender, count in rows:
+            sizes[class_id] += count
+            genders[class_id][gender] = count
+    sizes_before = dict(sizes)
+    genders_before = {class_id: dict(counts) for class_id, counts in genders.items()}
+
+    students = _interleave(students) if balance_gender else list(students)
+    gender_keys = {gender for _, gender in students} if balance_gender else {None}
+    version = dict.fromkeys(class_ids, 0)
+
+    def entry(class_id, gender):
+        same_gender = genders[class_id].get(gender, 0) if gender is not None else 0
+        return (sizes[class_id], same_gender, class_id, version[class_id])
+
+    heaps = {gender: [entry(class_id, gender) for class_id in class_ids] for gender in gender_keys}
+    for heap in heaps.values():
+        heapq.heapify(heap)
+
+    assignments, unplaced = {}, []
+    for student_id, gender in students:
+        key = gender if balance_gender else None
+        heap = heaps[key]
+        # 略過版本已過期或已滿的班級
+        while heap and (heap[0][3] != version[heap[0][2]]
+                        or (capacity and sizes[heap[0][2]] >= capacity)):
+            heapq.heappop(heap)
+        if not heap:
+            unplaced.append(student_id)
+            continue
+
+        class_id = heapq.heappop(heap)[2]
+        assignments[student_id] = class_id
+        sizes[class_id] += 1
+        genders[class_id][gender] = genders[class_id].get(gender, 0) + 1
+        version[class_id] += 1
+        for other_key, other_heap in heaps.items():
+            heapq.heappush(other_heap, entry(class_id, other_key))
+
+    loads = [
+        ClassLoad(class_id, class_name, sizes_before[class_id], sizes[class_id],
+                  genders_before[class_id], genders[class_id])
+        for class_id, class_name in classes
+    ]
+    return AssignmentPlan(assignments, loads, unplaced)
+
+
+def apply_assignment(plan):
+    """
+    以一條批量UPDATE寫入分班結果
+    只更新仍未分班的學生，預覽後已被分班的學生不會被覆蓋
+
+    Args:
+        plan: AssignmentPlan
+
+    Returns:
+        int: 實際分班的學生人數
+    """
+    if not plan.assignments:
+        return 0
+
+    students = Student.__table__
+    statement = students.update().where(
+        students.c.student_id == bindparam('sid')
+    ).where(
+        students.c.class_id.is_(None)
+    ).values(
+        class_id=bindparam('cid'),
+        updated_at=datetime.now()
+    )
+    result = db.session.execute(statement, [
+        {'sid': student_id, 'cid': class_id} for student_id, class_id in plan.assignments.items()
+    ])
+    db.session.commit()
+    return result.rowcount
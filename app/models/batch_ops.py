@@ -0,0 +1,409 @@
+"""
+批量操作
+在一個事務中對學生、教師、班級執行一組create/update/upsert/delete操作，供外部系統整合使用
+
+處理分為兩步：
+1. 驗證：每個實體以一次IN查詢載入操作涉及的現有主鍵（update另外載入現有資料以合併部分欄位），
+   唯一欄位（不分大小寫的主鍵、郵箱、班級名稱、班導師）各以一次IN查詢載入操作涉及的值及其所屬記錄，
+   再按順序逐一驗證，批次中較早的操作（例如先建立再更新、先刪除再建立）會計入後續操作的檢查；
+   欄位轉換沿用批量匯入的規則，update只有提供的欄位為必填
+2. 執行：任何操作無效時整批不寫入；全部有效時將連續的同類操作合併為一條批量語句
+   （executemany INSERT/UPDATE、ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE、DELETE ... IN），
+   最後一次提交
+"""
+
+from datetime import datetime
+from sqlalchemy import delete, func, insert, update
+from app import db
+from app.models import Student, Teacher, Class
+from app.models import reference_data
+from app.models.importer import IMPORTERS, PartialRow, RowError
+
+OPERATIONS = ('create', 'update', 'upsert', 'delete')
+
+
+class BatchError(ValueError):
+    """批量請求的整體格式無效"""
+
+
+class _Entity:
+    """
+    批量操作支援的實體
+
+    Args:
+        kind: 對應的匯入種類（欄位轉換規則）
+        model: 模型類
+        key: 主鍵欄位名稱
+        cache_kinds: 修改後需要失效的參考資料種類
+        unique: (欄位名稱, 錯誤訊息格式)列表，這些欄位的值在所有記錄中不分大小寫不能重複
+    """
+
+    def __init__(self, kind, model, key, cache_kinds=(), unique=()):
+        self.kind = kind
+        self.model = model
+        self.key = key
+        self.cache_kinds = cache_kinds
+        self.unique = unique
+
+    @property
+    def column(self):
+        return getattr(self.model, self.key)
+
+    def normalize_key(self, value):
+        """將請求中的主鍵值轉換為數據庫中的型別"""
+        if value is None or value == '':
+            return None
+        if self.model is Class:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                raise RowError(f'班級ID必須是數字：{value}')
+        return str(value).strip() or None
+
+
+ENTITIES = {
+    'student': _Entity('students', Student, 'student_id',
+                       unique=(('email', '郵箱已被使用：{}'),)),
+    'teacher': _Entity('teachers', Teacher, 'teacher_id', (reference_data.TEACHERS,),
+                       unique=(('email', '郵箱已被使用：{}'),)),
+    'class': _Entity('classes', Class, 'class_id',
+                     (reference_data.CLASSES,),
+                     unique=(('class_name', '班級名稱已被使用：{}'),
+                             ('teacher_id', '教師{}已擔任其他班級的班導師'))),
+}
+
+
+def _fold(value):
+    """唯一欄位比較用的值：字串去除空白並轉為小寫"""
+    if value is None:
+        return None
+    value = str(value).strip().lower()
+    return value or None
+
+
+def _ci_in(column, values):
+    """
+    不分大小寫的IN條件，values已轉為小寫
+    MySQL的默認排序規則本身不分大小寫，直接比較以使用索引；其他數據庫比較LOWER(欄位)
+    """
+    if db.session.get_bind().dialect.name in ('mysql', 'mariadb'):
+        return column.in_(values)
+    return func.lower(column).in_(values)
+
+
+class _State:
+    """
+    單一實體在驗證過程中的狀態：現有主鍵、現有資料、不可刪除的主鍵，
+    以及唯一欄位的值目前屬於哪一筆記錄
+
+    Args:
+        entity: _Entity
+        keys: 操作涉及的主鍵
+        update_keys: update操作的主鍵
+        delete_keys: delete操作的主鍵
+        values: 唯一欄位名稱 -> 操作涉及的值（已轉為小寫）
+    """
+
+    def __init__(self, entity, keys, update_keys, delete_keys, values):
+        self.entity = entity
+        self.converter = IMPORTERS[entity.kind](check_unique=False)
+        self.existing = set()
+        if keys:
+            self.existing = {key for (key,) in db.session.query(entity.column).filter(entity.column.in_(keys))}
+
+        # 不分大小寫的主鍵 -> 實際主鍵，用於拒絕僅大小寫不同的新主鍵
+        self.folded_keys = {}
+        folded = {_fold(key) for key in keys if isinstance(key, str)}
+        if folded:
+            for (key,) in db.session.query(entity.column).filter(_ci_in(entity.column, folded)):
+                self.folded_keys[_fold(key)] = key
+
+        # update只需提供要修改的欄位，其餘欄位取自現有資料
+        self.current = {}
+        if update_keys:
+            table = entity.model.__table__
+            for row in db.session.execute(table.select().where(table.c[entity.key].in_(update_keys))):
+                self.current[row._mapping[entity.key]] = dict(row._mapping)
+
+        # 唯一欄位：值 -> 所屬記錄的主鍵，及主鍵 -> 值（記錄修改或刪除時釋放原來的值）
+        self.owners = {field: {} for field, _ in entity.unique}
+        self.claims = {field: {} for field, _ in entity.unique}
+        for field, _ in entity.unique:
+            if values.get(field):
+                column = getattr(entity.model, field)
+                rows = db.session.query(entity.column, column).filter(_ci_in(column, values[field]))
+                for key, value in rows:
+                    self._assign(field, key, _fold(value))
+        for key, record in self.current.items():
+            for field, _ in entity.unique:
+                self._assign(field, key, _fold(record.get(field)))
+
+        self.blocked = {}
+        if delete_keys:
+            if entity.model is Class:
+                rows = db.session.query(Student.class_id).filter(
+                    Student.class_id.in_(delete_keys)).distinct()
+                self.blocked = {class_id: '班級仍有學生' for (class_id,) in rows}
+            elif entity.model is Teacher:
+                rows = db.session.query(Class.teacher_id).filter(
+                    Class.teacher_id.in_(delete_keys)).distinct()
+                self.blocked = {teacher_id: '教師仍擔任班導師' for (teacher_id,) in rows}
+
+    def _assign(self, field, owner, value):
+        """將唯一欄位的值登記為屬於owner，並釋放owner原來的值"""
+        previous = self.claims[field].pop(owner, None)
+        if previous is not None and self.owners[field].get(previous) == owner:
+            del self.owners[field][previous]
+        if value is not None:
+            self.owners[field][value] = owner
+            self.claims[field][owner] = value
+
+    def check_key(self, key):
+        """檢查新主鍵與現有主鍵（包括批次中較早建立的）是否僅大小寫不同"""
+        if isinstance(key, str):
+            other = self.folded_keys.get(_fold(key))
+            if other is not None and other != key:
+                raise RowError(f'{key}與現有的{other}僅大小寫不同')
+
+    def claim(self, owner, record):
+        """
+        檢查並登記記錄的唯一欄位值
+
+        Args:
+            owner: 記錄的主鍵，新建立的班級使用操作序號
+            record: 轉換後的記錄
+
+        Raises:
+            RowError: 值已屬於其他記錄時拋出
+        """
+        for field, message in self.entity.unique:
+            value = _fold(record.get(field))
+            if value is not None and self.owners[field].get(value, owner) != owner:
+                raise RowError(message.format(record[field]))
+        for field, _ in self.entity.unique:
+            self._assign(field, owner, _fold(record.get(field)))
+        if isinstance(owner, str):
+            self.folded_keys[_fold(owner)] = owner
+
+    def release(self, key):
+        """記錄刪除後釋放其主鍵及唯一欄位值"""
+        for field, _ in self.entity.unique:
+            self._assign(field, key, None)
+        if isinstance(key, str) and self.folded_keys.get(_fold(key)) == key:
+            del self.folded_keys[_fold(key)]
+
+
+def _parse(operation):
+    """檢查單一操作的格式，返回(操作, 實體名稱, 資料)"""
+    if not isinstance(operation, dict):
+        raise RowError('操作必須是物件')
+    op, entity_name, data = operation.get('op'), operation.get('entity'), operation.get('data') or {}
+    if op not in OPERATIONS:
+        raise RowError(f'不支援的操作：{op}')
+    if entity_name not in ENTITIES:
+        raise RowError(f'不支援的實體：{entity_name}')
+    if not isinstance(data, dict):
+        raise RowError('data必須是物件')
+    return op, entity_name, data
+
+
+def run_batch(operations):
+    """
+    驗證並在一個事務中執行批量操作
+
+    Args:
+        operations: 操作列表，每個操作為{"op": ..., "entity": ..., "data": {...}}
+
+    Returns:
+        tuple: (是否已提交, 每個操作的結果列表)
+            結果包含index、op、entity、key、status（created/updated/deleted/error），失敗時附error
+
+    Raises:
+        BatchError: operations不是列表時拋出
+    """
+    if not isinstance(operations, list):
+        raise BatchError('operations必須是列表')
+
+    # 第一輪：檢查格式並收集各實體涉及的主鍵
+    parsed, results = [], []
+    keys = {name: set() for name in ENTITIES}
+    update_keys = {name: set() for name in ENTITIES}
+    delete_keys = {name: set() for name in ENTITIES}
+    values = {name: {field: set() for field, _ in ENTITIES[name].unique} for name in ENTITIES}
+    for index, operation in enumerate(operations):
+        result = {'index': index}
+        results.append(result)
+        try:
+            op, entity_name, data = _parse(operation)
+            result.update(op=op, entity=entity_name)
+            entity = ENTITIES[entity_name]
+            key = entity.normalize_key(data.get(entity.key))
+            result['key'] = key
+        except RowError as e:
+            result.update(status='error', error=str(e))
+            parsed.append(None)
+            continue
+        parsed.append((op, entity_name, data, key))
+        for field, value_set in values[entity_name].items():
+            value = _fold(data.get(field))
+            if value is not None:
+                value_set.add(value)
+        if key is not None:
+            keys[entity_name].add(key)
+            if op == 'update':
+                update_keys[entity_name].add(key)
+            elif op == 'delete':
+                delete_keys[entity_name].add(key)
+
+    states = {
+        name: _State(ENTITIES[name], keys[name], update_keys[name], delete_keys[name], values[name])
+        for name in ENTITIES if any(p and p[1] == name for p in parsed)
+    }
+
+    # 第二輪：按順序驗證並轉換資料
+    plans = []
+    for result, item in zip(results, parsed):
+        if item is None:
+            continue
+        op, entity_name, data, key = item
+        try:
+            record, status = _validate(ENTITIES[entity_name], states[entity_name], op, data, key,
+                                       result['index'])
+        except RowError as e:
+            result.update(status='error', error=str(e))
+            continue
+        result['status'] = status
+        plans.append((result, entity_name, op, record))
+
+    if any(result.get('status') == 'error' for result in results):
+        return False, results
+
+    # 執行：連續的同類操作合併為一條批量語句
+    now = datetime.now()
+    touched = set()
+    group = []
+    for plan in plans + [None]:
+        if group and (plan is None or plan[1:3] != group[0][1:3]):
+            _execute(ENTITIES[group[0][1]], group[0][2], group, now)
+            touched.add(group[0][1])
+            group = []
+        if plan is not None:
+            group.append(plan)
+    db.session.commit()
+
+    for entity_name in touched:
+        if ENTITIES[entity_name].cache_kinds:
+            reference_data.invalidate(*ENTITIES[entity_name].cache_kinds)
+    return True, results
+
+
+def _validate(entity, state, op, data, key, index):
+    """
+    驗證單一操作並更新驗證狀態
+
+    Returns:
+        tuple: (要寫入的記錄或主鍵, 結果狀態)
+    """
+    if op == 'create':
+        if key is not None and key in state.existing:
+            raise RowError(f'{key}已存在')
+        record = state.converter.convert(data)
+        status = 'created'
+    else:
+        if key is None:
+            raise RowError(f'缺少{entity.key}')
+        if op == 'delete':
+            if key not in state.existing:
+                raise RowError(f'{key}不存在')
+            if key in state.blocked:
+                raise RowError(state.blocked[key])
+            state.existing.discard(key)
+            state.current.pop(key, None)
+            state.release(key)
+            return key, 'deleted'
+        if op == 'update':
+            if key not in state.existing:
+                raise RowError(f'{key}不存在')
+            merged = dict(state.current.get(key, {}))
+            if 'class_name' in data and 'class_id' not in data and entity.model is Student:
+                merged.pop('class_id', None)
+            merged.update(data)
+            # 只有要修改的欄位為必填，現有資料中為空的欄位（例如沒有入職日期的教師）不影響更新
+            record = state.converter.convert(PartialRow(merged, data))
+            status = 'updated'
+        else:
+            record = state.converter.convert(data)
+            status = 'updated' if key in state.existing else 'created'
+
+    # 班級欄位轉換不含班級ID，由請求中的主鍵補上
+    if entity.model is Class and key is not None:
+        record['class_id'] = key
+
+    if status == 'created':
+        state.check_key(key)
+    # 新建立的班級沒有主鍵，以操作序號作為唯一欄位值的所屬記錄
+    state.claim(key if key is not None else ('new', index), record)
+
+    if key is not None:
+        state.existing.add(key)
+        state.current[key] = record
+    return record, status
+
+
+def _execute(entity, op, group, now):
+    """以一條批量語句執行一組連續的同類操作"""
+    model = entity.model
+    if op == 'delete':
+        db.session.execute(delete(model).where(entity.column.in_([record for _, _, _, record in group])))
+        return
+
+    timestamps = {'updated_at': now} if hasattr(model, 'updated_at') else {}
+    if op == 'update':
+        db.session.execute(update(model), [dict(record, **timestamps) for _, _, _, record in group])
+        return
+
+    if hasattr(model, 'created_at'):
+        timestamps['created_at'] = now
+    records = [dict(record, **timestamps) for _, _, _, record in group]
+    if op == 'upsert':
+        db.session.execute(_upsert_statement(model, entity.key, records[0]), records)
+    elif model is Class:
+        # 班級ID由數據庫產生，經ORM新增以取得ID並填入結果
+        classes = [Class(**record) for record in records]
+        db.session.add_all(classes)
+        db.session.flush()
+        for (result, _, _, _), class_obj in zip(group, classes):
+            result['key'] = class_obj.class_id
+    else:
+        db.session.execute(insert(model), records)
+
+
+def _upsert_statement(model, key, sample):
+    """
+    建立按主鍵衝突時更新的INSERT語句
+
+    Args:
+        model: 模型類
+        key: 主鍵欄位名稱
+        sample: 一筆記錄，決定要更新的欄位
+
+    Returns:
+        Insert: MySQL為ON DUPLICATE KEY UPDATE，PostgreSQL/SQLite為ON CONFLICT DO UPDATE
+    """
+    table = model.__table__
+    columns = [name for name in sample if name not in (key, 'created_at')]
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        statement = dialect_insert(table)
+        return statement.on_duplicate_key_update({name: statement.inserted[name] for name in columns})
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise BatchError(f'數據庫{dialect}不支援upsert')
+    statement = dialect_insert(table)
+    return statement.on_conflict_do_update(index_elements=[key],
+                                           set_={name: statement.excluded[name] for name in columns})
@@ -0,0 +1,322 @@
+"""
+重複學生檢測
+以分塊鍵（身份證號、郵箱、正規化電話、姓名二字組、出生日期加姓氏）將學生分組，
+只比較同一組內的配對，候選配對數量與學生人數接近線性，不需要兩兩比較全部學生
+超過人數上限的姓名二字組分塊（例如常見姓氏加常見用字）按出生年份拆分為子分塊再比較，
+拆分後仍超過上限或無法拆分的分塊才略過，略過數量記錄在檢測結果中
+
+每個候選配對按相同或相似的欄位計分，達到門檻的配對寫入duplicate_candidates作為審核佇列；
+已審核過（合併或標記為非重複）的配對不會重新加入
+"""
+
+import re
+import unicodedata
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from difflib import SequenceMatcher
+from sqlalchemy import insert, or_
+from app import db
+from app.models import Student, User, DuplicateCandidate
+
+# 默認列入審核佇列的分數門檻
+DEFAULT_THRESHOLD = 0.5
+
+# 分塊人數上限，超過時拆分為子分塊，仍超過的分塊不產生配對，避免退化為兩兩比較
+DEFAULT_MAX_BLOCK_SIZE = 50
+
+# 每批插入的候選配對數量
+INSERT_BATCH_SIZE = 1000
+
+# 各欄位相同時的分數
+WEIGHTS = {
+    'id_number': 0.6,
+    'email': 0.5,
+    'phone': 0.3,
+    'birth_date': 0.2,
+    'name': 0.4,
+}
+
+# 姓名相似度低於此值時不計分
+NAME_SIMILARITY_FLOOR = 0.6
+
+# 合併時從被合併記錄補入保留記錄空白欄位的欄位
+MERGE_FIELDS = ('class_id', 'birth_date', 'address', 'phone', 'email',
+                'enrollment_date', 'status', 'id_number')
+
+_NON_DIGITS = re.compile(r'\D')
+
+Person = namedtuple('Person', 'student_id name id_number email phone birth_date')
+
+
+class DetectionResult:
+    """
+    檢測結果
+
+    Attributes:
+        students: 參與檢測的學生人數
+        pairs: 比較的候選配對數量
+        split_blocks: 超過人數上限而按出生年份拆分的姓名分塊數量
+        skipped_blocks: 因超過人數上限而略過的分塊數量（包括拆分後仍超過上限的子分塊）
+        added: 新加入審核佇列的配對數量
+    """
+
+    def __init__(self):
+        self.students = 0
+        self.pairs = 0
+        self.split_blocks = 0
+        self.skipped_blocks = 0
+        self.added = 0
+
+
+def normalize_name(name):
+    """統一全形半形、大小寫並移除空白"""
+    return re.sub(r'\s+', '', unicodedata.normalize('NFKC', name or '')).lower()
+
+
+def normalize_phone(phone):
+    """只保留數字並取末9碼，使0912...與+886 912...視為相同"""
+    digits = _NON_DIGITS.sub('', phone or '')
+    return digits[-9:] if len(digits) >= 8 else None
+
+
+def _person(row):
+    """將查詢結果轉換為正規化後的比較資料"""
+    student_id, name, id_number, email, phone, birth_date = row
+    return Person(
+        student_id,
+        normalize_name(name),
+        (id_number or '').strip().upper() or None,
+        (email or '').strip().lower() or None,
+        normalize_phone(phone),
+        birth_date,
+    )
+
+
+def blocking_keys(person):
+    """
+    產生學生的分塊鍵，具有相同分塊鍵的學生才會被比較
+
+    Args:
+        person: Person
+
+    Returns:
+        iterator: 分塊鍵
+    """
+    if person.id_number:
+        yield ('id_number', person.id_number)
+    if person.email:
+        yield ('email', person.email)
+    if person.phone:
+        yield ('phone', person.phone)
+    name = person.name
+    if len(name) >= 2:
+        for i in range(len(name) - 1):
+            yield ('name', name[i:i + 2])
+    elif name:
+        yield ('name', name)
+    if person.birth_date and name:
+        yield ('birth_date', person.birth_date, name[0])
+
+
+def split_block(key, members, people):
+    """
+    將超過人數上限的分塊拆分為子分塊
+    姓名二字組分塊按出生年份拆分（沒有出生日期的學生歸入同一子分塊），其他分塊無法再細分
+
+    Args:
+        key: 分塊鍵
+        members: 分塊中學生的索引列表
+        people: Person列表
+
+    Returns:
+        list: 子分塊列表，每個子分塊為學生索引列表
+    """
+    if key[0] != 'name':
+        return [members]
+    groups = defaultdict(list)
+    for index in members:
+        birth_date = people[index].birth_date
+        groups[birth_date.year if birth_date else None].append(index)
+    return list(groups.values())
+
+
+def score_pair(a, b):
+    """
+    計算兩個學生為同一人的分數
+
+    Args:
+        a: Person
+        b: Person
+
+    Returns:
+        tuple: (0-1之間的分數, 判定依據列表)
+    """
+    score, reasons = 0.0, []
+    for field, label in (('id_number', '身份證號相同'), ('email', '郵箱相同'),
+                         ('phone', '電話相同'), ('birth_date', '出生日期相同')):
+        value = getattr(a, field)
+        if value and value == getattr(b, field):
+            score += WEIGHTS[field]
+            reasons.append(label)
+
+    if a.name and b.name:
+        if a.name == b.name:
+            score += WEIGHTS['name']
+            reasons.append('姓名相同')
+        else:
+            similarity = SequenceMatcher(None, a.name, b.name).ratio()
+            if similarity >= NAME_SIMILARITY_FLOOR:
+                score += WEIGHTS['name'] * similarity
+                reasons.append('姓名相似')
+    return min(score, 1.0), reasons
+
+
+def find_duplicates(threshold=DEFAULT_THRESHOLD, max_block_size=DEFAULT_MAX_BLOCK_SIZE):
+    """
+    檢測疑似重複的學生並加入審核佇列
+
+    Args:
+        threshold: 列入審核佇列的分數門檻
+        max_block_size: 分塊人數上限，超過時先拆分為子分塊
+
+    Returns:
+        DetectionResult: 檢測結果
+    """
+    result = DetectionResult()
+
+    # 只讀取比較需要的欄位，逐批讀取並建立分塊
+    people = []
+    blocks = defaultdict(list)
+    rows = db.session.query(
+        Student.student_id, Student.name, Student.id_number,
+        Student.email, Student.phone, Student.birth_date
+    ).order_by(Student.student_id).yield_per(5000)
+    for row in rows:
+        person = _person(row)
+        for key in blocking_keys(person):
+            blocks[key].append(len(people))
+        people.append(person)
+    result.students = len(people)
+
+    # 同一分塊內的配對；學生按學號順序讀取，配對中索引較小者即為student_id_a
+    pairs = set()
+    for key, members in blocks.items():
+        if len(members) < 2:
+            continue
+        groups = [members]
+        if len(members) > max_block_size:
+            groups = split_block(key, members, people)
+            if len(groups) > 1:
+                result.split_blocks += 1
+        for group in groups:
+            if len(group) < 2:
+                continue
+            if len(group) > max_block_size:
+                result.skipped_blocks += 1
+                continue
+            for i, first in enumerate(group):
+                for second in group[i + 1:]:
+                    pairs.add((first, second))
+    result.pairs = len(pairs)
+
+    # 已在佇列中或已審核的配對
+    known = set(db.session.query(DuplicateCandidate.student_id_a, DuplicateCandidate.student_id_b))
+    now = datetime.now()
+    batch = []
+    for first, second in pairs:
+        a, b = people[first], people[second]
+        if (a.student_id, b.student_id) in known:
+            continue
+        score, reasons = score_pair(a, b)
+        if score < threshold:
+            continue
+        batch.append({
+            'student_id_a': a.student_id,
+            'student_id_b': b.student_id,
+            'score': round(score, 3),
+            'reasons': ', '.join(reasons),
+            'status': 'pending',
+            'created_at': now,
+        })
+        if len(batch) >= INSERT_BATCH_SIZE:
+            db.session.execute(insert(DuplicateCandidate), batch)
+            result.added += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(DuplicateCandidate), batch)
+        result.added += len(batch)
+    db.session.commit()
+    return result
+
+
+def merge_students(candidate, keep_id):
+    """
+    合併一對重複的學生記錄
+    被合併記錄的非空欄位補入保留記錄的空白欄位；被合併學生的帳號在保留學生沒有帳號時改為關聯保留學生，
+    否則停用；最後刪除被合併的學生，並移除其他涉及該學生的待審核配對
+
+    Args:
+        candidate: DuplicateCandidate
+        keep_id: 保留的學號（必須是配對中的其中一個）
+
+    Returns:
+        Student: 保留的學生
+
+    Raises:
+        ValueError: keep_id不屬於此配對或學生已不存在時拋出
+    """
+    if keep_id not in (candidate.student_id_a, candidate.student_id_b):
+        raise ValueError('保留的學號不屬於此配對')
+    drop_id = candidate.student_id_b if keep_id == candidate.student_id_a else candidate.student_id_a
+
+    keep = db.session.get(Student, keep_id)
+    drop = db.session.get(Student, drop_id)
+    if keep is None or drop is None:
+        raise ValueError('配對中的學生已不存在')
+
+    for field in MERGE_FIELDS:
+        if getattr(keep, field) in (None, '') and getattr(drop, field) not in (None, ''):
+            setattr(keep, field, getattr(drop, field))
+    keep.updated_at = datetime.now()
+
+    accounts = User.query.filter(User.role == 'student',
+                                 User.related_id.in_([keep_id, drop_id])).all()
+    keep_has_account = any(user.related_id == keep_id for user in accounts)
+    changed_users = []
+    for user in accounts:
+        if user.related_id != drop_id:
+            continue
+        if keep_has_account:
+            user.is_active = False
+        else:
+            user.related_id = keep_id
+            keep_has_account = True
+        changed_users.append(user.user_id)
+
+    candidate.status = 'merged'
+    candidate.reviewed_at = datetime.now()
+    DuplicateCandidate.query.filter(
+        DuplicateCandidate.candidate_id != candidate.candidate_id,
+        DuplicateCandidate.status == 'pending',
+        or_(DuplicateCandidate.student_id_a == drop_id, DuplicateCandidate.student_id_b == drop_id)
+    ).delete(synchronize_session=False)
+
+    db.session.delete(drop)
+    db.session.commit()
+
+    from app.models.user_cache import invalidate_user
+    for user_id in changed_users:
+        invalidate_user(user_id)
+    return keep
+
+
+def dismiss_candidate(candidate):
+    """
+    將配對標記為非重複，之後的檢測不會再加入
+
+    Args:
+        candidate: DuplicateCandidate
+    """
+    candidate.status = 'dismissed'
+    candidate.reviewed_at = datetime.now()
+    db.session.commit()
@@ -0,0 +1,45 @@
+"""
+分面統計
+以一次GROUP BY查詢取得列表篩選結果在各分面（狀態、班級、性別）的人數分佈
+"""
+
+from collections import Counter
+from sqlalchemy import func
+from app.models import Student
+
+# 學生列表的分面欄位：名稱 -> 欄位
+STUDENT_FACETS = {
+    'status': Student.status,
+    'class_id': Student.class_id,
+    'gender': Student.gender,
+}
+
+
+def count_facets(query, columns, selections):
+    """
+    計算各分面的人數
+    查詢本身不含分面欄位的條件，按所有分面欄位的組合分組後在記憶體中匯總：
+    每個分面的人數只套用其他分面的已選值，因此切換該分面時可直接看到各選項的人數
+
+    Args:
+        query: 已套用權限及非分面條件的查詢對象
+        columns: 分面名稱 -> 欄位
+        selections: 分面名稱 -> 已選值集合
+
+    Returns:
+        dict: 分面名稱 -> Counter（值 -> 人數）
+    """
+    names = list(columns)
+    rows = query.with_entities(
+        *columns.values(), func.count()
+    ).group_by(*columns.values()).order_by(None).all()
+
+    facets = {name: Counter() for name in names}
+    for row in rows:
+        values = dict(zip(names, row))
+        count = row[-1]
+        for name in names:
+            if all(values[other] in selections[other]
+                   for other in names if other != name and other in selections):
+                facets[name][values[name]] += count
+    return facets
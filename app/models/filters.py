@@ -0,0 +1,322 @@
+"""
+進階篩選條件
+將查詢字串或JSON形式的篩選條件編譯為參數化的SQLAlchemy條件表達式
+只開放有索引支援的欄位和運算符，其餘條件一律拒絕
+
+查詢字串形式：欄位__運算符=值，省略運算符時為eq，in可重複參數或以逗號分隔
+    ?grade__between=1,3&status__in=在學,休學&enrollment_year=2024&gender=女
+JSON形式：條件列表，所有條件以AND組合
+    [{"field": "grade", "op": "between", "value": [1, 3]},
+     {"field": "status", "op": "in", "value": ["在學", "休學"]}]
+"""
+
+import json
+from datetime import date, datetime
+from sqlalchemy import select, or_
+from app.models import Student, Teacher, Class
+
+# 運算符分類
+EQUALITY_OPS = ('eq', 'in')
+RANGE_OPS = ('eq', 'in', 'gt', 'gte', 'lt', 'lte', 'between')
+
+# 查詢字串中欄位與運算符的分隔符
+OP_SEPARATOR = '__'
+
+
+class FilterError(ValueError):
+    """篩選條件無效時拋出的異常"""
+
+
+def _parse_int(value):
+    """將值轉換為整數"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise FilterError(f'無效的數字：{value}')
+
+
+def _parse_date(value):
+    """將YYYY-MM-DD格式的值轉換為日期"""
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        raise FilterError(f'無效的日期：{value}（格式應為YYYY-MM-DD）')
+
+
+def _parse_year(value):
+    """將值轉換為年份"""
+    year = _parse_int(value)
+    if not 1900 <= year <= 2100:
+        raise FilterError(f'無效的年份：{value}')
+    return year
+
+
+def _choice_parser(choices):
+    """生成只接受指定選項的轉換函數"""
+    def parse(value):
+        if value not in choices:
+            raise FilterError(f'無效的選項：{value}')
+        return value
+    return parse
+
+
+def _compare(column, op, value):
+    """生成單一欄位的比較條件"""
+    if op == 'eq':
+        return column == value
+    if op == 'in':
+        return column.in_(value)
+    if op == 'gt':
+        return column > value
+    if op == 'gte':
+        return column >= value
+    if op == 'lt':
+        return column < value
+    if op == 'lte':
+        return column <= value
+    return column.between(value[0], value[1])
+
+
+class FilterField:
+    """
+    可篩選欄位定義
+
+    Args:
+        column: 條件作用的欄位
+        parse: 值的轉換及驗證函數
+        ops: 允許的運算符
+        build: 自定義條件生成函數，接收(運算符, 值)，用於關聯表或衍生欄位
+    """
+
+    def __init__(self, column=None, parse=str, ops=EQUALITY_OPS, build=None):
+        self.column = column
+        self.parse = parse
+        self.ops = ops
+        self.build = build
+
+    def compile(self, op, value):
+        """將運算符和值編譯為條件表達式"""
+        if op in ('in', 'between'):
+            values = value if isinstance(value, (list, tuple)) else str(value).split(',')
+            values = [self.parse(v) for v in values if v != '']
+            if not values:
+                raise FilterError('篩選值不能為空')
+            if op == 'between':
+                if len(values) != 2:
+                    raise FilterError('between需要兩個值')
+                values = (min(values), max(values))
+            value = values
+        else:
+            if isinstance(value, (list, tuple)):
+                raise FilterError(f'運算符{op}只接受單一值')
+            value = self.parse(value)
+
+        if self.build is not None:
+            return self.build(op, value)
+        return _compare(self.column, op, value)
+
+
+def _year_range(column):
+    """
+    將年份條件轉換為日期欄位的範圍條件
+    使用範圍比較而非YEAR()函數，讓日期欄位的索引可以生效
+    """
+    def build(op, value):
+        if op == 'in':
+            return or_(*[column.between(date(y, 1, 1), date(y, 12, 31)) for y in value])
+        if op == 'between':
+            return column.between(date(value[0], 1, 1), date(value[1], 12, 31))
+
+        start, end = date(value, 1, 1), date(value, 12, 31)
+        bounds = {
+            'eq': column.between(start, end),
+            'gt': column > end,
+            'gte': column >= start,
+            'lt': column < start,
+            'lte': column <= end,
+        }
+        return bounds[op]
+    return build
+
+
+def _class_subquery(column):
+    """
+    生成按班級屬性篩選學生的條件
+    以 class_id IN (SELECT class_id FROM classes WHERE ...) 形式利用兩側索引
+    """
+    def build(op, value):
+        return Student.class_id.in_(
+            select(Class.class_id).where(_compare(column, op, value))
+        )
+    return build
+
+
+class FilterSet:
+    """
+    一組可篩選欄位
+    負責解析查詢字串或JSON篩選條件並編譯為條件表達式列表
+
+    Args:
+        fields: 欄位名稱 -> FilterField
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def compile(self, conditions):
+        """
+        將(欄位, 運算符, 值)條件列表編譯為條件表達式
+
+        Args:
+            conditions: 條件列表
+
+        Returns:
+            list: SQLAlchemy條件表達式列表
+
+        Raises:
+            FilterError: 欄位或運算符不支援，或值無效時拋出
+        """
+        expressions = []
+        for name, op, value in conditions:
+            # JSON條件中的field、op可能是列表等非字串值，不能作為字典鍵查找
+            if not isinstance(name, str) or not isinstance(op, str):
+                raise FilterError('篩選條件的field和op必須是字串')
+            field = self.fields.get(name)
+            if field is None:
+                raise FilterError(f'不支援按「{name}」篩選')
+            if op not in field.ops:
+                raise FilterError(f'欄位「{name}」不支援運算符「{op}」')
+            expressions.append(field.compile(op, value))
+        return expressions
+
+    def parse_args(self, args):
+        """
+        從查詢字串解析篩選條件
+        只處理已定義的欄位名稱或含有運算符分隔符的參數，其餘參數（分頁、排序等）忽略
+
+        Args:
+            args: request.args
+
+        Returns:
+            list: (欄位, 運算符, 值)條件列表
+        """
+        conditions = []
+        for key in args:
+            name, separator, op = key.partition(OP_SEPARATOR)
+            if not separator and name not in self.fields:
+                continue
+            op = op or 'eq'
+            values = [v for v in args.getlist(key) if v != '']
+            if not values:
+                continue
+            if op in ('in', 'between'):
+                values = [part for v in values for part in v.split(',')]
+                conditions.append((name, op, values))
+            else:
+                conditions.extend((name, op, v) for v in values)
+        return conditions
+
+    def parse_json(self, data):
+        """
+        從JSON解析篩選條件
+
+        Args:
+            data: JSON字串或已解析的條件列表
+
+        Returns:
+            list: (欄位, 運算符, 值)條件列表
+        """
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                raise FilterError('篩選條件不是有效的JSON')
+        if not isinstance(data, list):
+            raise FilterError('篩選條件必須是列表')
+
+        conditions = []
+        for item in data:
+            if not isinstance(item, dict) or 'field' not in item or 'value' not in item:
+                raise FilterError('每個篩選條件必須包含field和value')
+            conditions.append((item['field'], item.get('op', 'eq'), item['value']))
+        return conditions
+
+    def parse_request(self, args):
+        """
+        從請求參數取得篩選條件
+        filter參數為JSON形式，其餘為查詢字串形式，兩者可同時使用
+
+        Args:
+            args: request.args
+
+        Returns:
+            list: (欄位, 運算符, 值)條件列表
+        """
+        conditions = self.parse_args(args)
+        if args.get('filter'):
+            conditions += self.parse_json(args.get('filter'))
+        return conditions
+
+    def from_request(self, args):
+        """
+        從請求參數取得並編譯篩選條件
+
+        Args:
+            args: request.args
+
+        Returns:
+            list: SQLAlchemy條件表達式列表
+        """
+        return self.compile(self.parse_request(args))
+
+    def selections(self, conditions, names):
+        """
+        將指定欄位的eq/in條件轉換為允許值集合，同一欄位有多個條件時取交集
+        用於在記憶體中套用條件（例如分面統計）
+
+        Args:
+            conditions: (欄位, 運算符, 值)條件列表
+            names: 需要轉換的欄位名稱
+
+        Returns:
+            dict: 欄位名稱 -> 允許值集合
+
+        Raises:
+            FilterError: 值無效時拋出
+        """
+        selected = {}
+        for name, op, value in conditions:
+            if name not in names:
+                continue
+            field = self.fields[name]
+            if op not in EQUALITY_OPS:
+                raise FilterError(f'欄位「{name}」不支援運算符「{op}」')
+            values = value if isinstance(value, (list, tuple)) else [value]
+            allowed = {field.parse(v) for v in values if v != ''}
+            selected[name] = selected[name] & allowed if name in selected else allowed
+        return selected
+
+
+# 學生篩選欄位，對應的欄位均有索引
+STUDENT_FILTERS = FilterSet({
+    'class_id': FilterField(Student.class_id, _parse_int),
+    'gender': FilterField(Student.gender, _choice_parser(('男', '女'))),
+    'status': FilterField(Student.status, _choice_parser(('在學', '休學', '退學', '畢業'))),
+    'enrollment_date': FilterField(Student.enrollment_date, _parse_date, RANGE_OPS),
+    'enrollment_year': FilterField(parse=_parse_year, ops=RANGE_OPS,
+                                   build=_year_range(Student.enrollment_date)),
+    'birth_date': FilterField(Student.birth_date, _parse_date, RANGE_OPS),
+    'grade': FilterField(parse=_parse_int, ops=RANGE_OPS, build=_class_subquery(Class.grade)),
+    'department': FilterField(parse=_parse_int, build=_class_subquery(Class.department_id)),
+})
+
+# 教師篩選欄位，對應的欄位均有索引
+TEACHER_FILTERS = FilterSet({
+    'department': FilterField(Teacher.department_id, _parse_int),
+    'gender': FilterField(Teacher.gender, _choice_parser(('男', '女'))),
+    'hire_date': FilterField(Teacher.hire_date, _parse_date, RANGE_OPS),
+    'hire_year': FilterField(parse=_parse_year, ops=RANGE_OPS, build=_year_range(Teacher.hire_date)),
+    'birth_date': FilterField(Teacher.birth_date, _parse_date, RANGE_OPS),
+})
@@ -0,0 +1,484 @@
+"""
+批量資料匯入
+逐行讀取CSV/XLSX檔案，對照預先載入的鍵集合（現有學號、郵箱、班級名稱等）驗證，
+再以executemany批量INSERT，每批一個事務；無效的行記錄行號和原因後跳過，不影響其他行
+
+支援的資料種類：students、teachers、classes
+欄位名稱可使用英文欄位名或中文標題（例如student_id或學號）
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from sqlalchemy import insert
+from app import db
+from app.models import Student, Teacher, Class
+from app.models import reference_data
+
+# 默認每批插入的行數
+DEFAULT_BATCH_SIZE = 1000
+
+_ALPHANUMERIC = re.compile(r'^[A-Za-z0-9]+$')
+_PHONE = re.compile(r'^[\d\-\+\(\)\s]+$')
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+GENDERS = ('男', '女')
+STUDENT_STATUSES = ('在學', '休學', '退學', '畢業')
+
+# 中文標題 -> 欄位名稱
+HEADER_ALIASES = {
+    '學號': 'student_id',
+    '教師編號': 'teacher_id',
+    '姓名': 'name',
+    '性別': 'gender',
+    '出生日期': 'birth_date',
+    '身份證號': 'id_number',
+    '地址': 'address',
+    '電話': 'phone',
+    '郵箱': 'email',
+    '入學日期': 'enrollment_date',
+    '學籍狀態': 'status',
+    '班級': 'class_name',
+    '班級名稱': 'class_name',
+    '班級ID': 'class_id',
+    '年級': 'grade',
+    '系所': 'department',
+    '所屬系所': 'department',
+    '班導師': 'teacher_id',
+    '職位': 'position',
+    '入職日期': 'hire_date',
+    '薪資': 'salary',
+    '備註': 'notes',
+}
+
+
+class RowError(ValueError):
+    """單行資料無效時拋出的異常"""
+
+
+class PartialRow(dict):
+    """
+    部分更新的記錄：欄位值為現有資料合併要修改的欄位，只有要修改的欄位視為必填，
+    其餘欄位沿用現有資料（現有資料中允許為空的必填欄位不會使更新失敗）
+
+    Args:
+        data: 合併後的欄位值
+        supplied: 要修改的欄位名稱
+    """
+
+    def __init__(self, data, supplied):
+        super().__init__(data)
+        self.supplied = set(supplied)
+
+
+def _required(row, names, required=True):
+    """部分更新時，未提供的欄位不視為必填"""
+    if not required:
+        return False
+    if isinstance(row, PartialRow):
+        return any(name in row.supplied for name in names)
+    return True
+
+
+class ImportResult:
+    """
+    匯入結果
+
+    Attributes:
+        total: 讀取的資料行數
+        inserted: 成功插入的行數
+        errors: (行號, 錯誤原因)列表
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.inserted = 0
+        self.errors = []
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+
+def read_rows(stream, filename):
+    """
+    逐行讀取上傳的檔案
+
+    Args:
+        stream: 二進位檔案對象
+        filename: 檔案名稱，用於判斷格式（.csv或.xlsx）
+
+    Returns:
+        iterator: (行號, 欄位名稱 -> 值)
+    """
+    if filename.lower().endswith('.xlsx'):
+        return _read_xlsx(stream)
+    if filename.lower().endswith('.csv'):
+        return _read_csv(stream)
+    raise ValueError('只支援CSV或XLSX檔案')
+
+
+def _normalize_header(name):
+    """將標題轉換為欄位名稱"""
+    name = str(name or '').strip()
+    return HEADER_ALIASES.get(name, name.lower())
+
+
+def _read_csv(stream):
+    """讀取CSV檔案（UTF-8，可帶BOM）"""
+    reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    headers = [_normalize_header(h) for h in next(reader, [])]
+    for line, values in enumerate(reader, start=2):
+        if any(v.strip() for v in values):
+            yield line, dict(zip(headers, values))
+
+
+def _read_xlsx(stream):
+    """
+    以唯讀模式逐行讀取XLSX檔案的第一個工作表
+    損壞或副檔名不符的檔案（不是有效的ZIP或缺少工作表部件）轉換為ValueError
+    """
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ValueError('讀取XLSX檔案需要安裝openpyxl套件')
+
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise ValueError(f'無法讀取XLSX檔案，檔案可能已損壞：{e}')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        headers = [_normalize_header(h) for h in next(rows, ())]
+        for line, values in enumerate(rows, start=2):
+            if any(v not in (None, '') for v in values):
+                yield line, dict(zip(headers, values))
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise ValueError(f'無法讀取XLSX檔案，檔案可能已損壞：{e}')
+    finally:
+        workbook.close()
+
+
+# 欄位值轉換及驗證
+
+def _text(row, name, required=False, label=None, min_length=0, max_length=None, pattern=None):
+    """取得文字欄位，數值會轉為字串（XLSX中的學號等）"""
+    value = row.get(name)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = '' if value is None else str(value).strip()
+    label = label or name
+    if not value:
+        if _required(row, (name,), required):
+            raise RowError(f'缺少{label}')
+        return None
+    if len(value) < min_length or (max_length and len(value) > max_length):
+        raise RowError(f'{label}長度不符')
+    if pattern is not None and not pattern.match(value):
+        raise RowError(f'{label}格式無效：{value}')
+    return value
+
+
+def _choice(row, name, choices, label, required=True):
+    """取得固定選項欄位"""
+    value = _text(row, name, required=required, label=label)
+    if value is not None and value not in choices:
+        raise RowError(f'{label}無效：{value}')
+    return value
+
+
+def _date(row, name, label, required=False):
+    """取得日期欄位（YYYY-MM-DD或XLSX日期）"""
+    value = row.get(name)
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = _text(row, name, required=required, label=label)
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise RowError(f'{label}格式無效（應為YYYY-MM-DD）：{value}')
+
+
+def _int(row, name, label, required=False):
+    """取得整數欄位"""
+    value = _text(row, name, required=required, label=label)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f'{label}必須是數字：{value}')
+
+
+def _unique(value, existing, label):
+    """檢查值不在已存在的集合中，通過後加入集合以檢查檔案內的重複"""
+    if value is None:
+        return value
+    key = value.lower() if isinstance(value, str) else value
+    if key in existing:
+        raise RowError(f'{label}已存在：{value}')
+    existing.add(key)
+    return value
+
+
+class _StudentImporter:
+    """
+    學生匯入：預先載入現有學號、郵箱及班級
+
+    Args:
+        check_unique: 是否載入現有學號及郵箱以檢查重複；只需轉換欄位時（批量操作API）可關閉
+    """
+
+    model = Student
+
+    def __init__(self, check_unique=True):
+        if check_unique:
+            self.student_ids = {s.lower() for (s,) in db.session.query(Student.student_id)}
+            self.emails = {e.lower() for (e,) in db.session.query(Student.email).filter(Student.email.isnot(None))}
+        self.class_ids = set()
+        self.class_names = {}
+        for class_ref in reference_data.get_classes():
+            self.class_ids.add(class_ref.class_id)
+            # 名稱重複的班級無法以名稱對應，記為None
+            name = class_ref.class_name
+            self.class_names[name] = None if name in self.class_names else class_ref.class_id
+
+    def _class_id(self, row):
+        class_id = _int(row, 'class_id', '班級ID')
+        if class_id is not None:
+            if class_id not in self.class_ids:
+                raise RowError(f'班級ID不存在：{class_id}')
+            return class_id
+        name = _text(row, 'class_name', label='班級')
+        if name is None:
+            if not _required(row, ('class_name', 'class_id')):
+                return None
+            raise RowError('缺少班級')
+        if name not in self.class_names:
+            raise RowError(f'班級不存在：{name}')
+        if self.class_names[name] is None:
+            raise RowError(f'班級名稱「{name}」重複，請改用班級ID')
+        return self.class_names[name]
+
+    def convert(self, row):
+        """轉換並驗證欄位值，不檢查重複"""
+        return {
+            'student_id': _text(row, 'student_id', True, '學號', 5, 20, _ALPHANUMERIC),
+            'name': _text(row, 'name', True, '姓名', 2, 50),
+            'class_id': self._class_id(row),
+            'gender': _choice(row, 'gender', GENDERS, '性別'),
+            'birth_date': _date(row, 'birth_date', '出生日期'),
+            'id_number': _text(row, 'id_number', label='身份證號', min_length=10, max_length=18),
+            'address': _text(row, 'address', label='地址', max_length=200),
+            'phone': _text(row, 'phone', label='電話', max_length=20, pattern=_PHONE),
+            'email': _text(row, 'email', label='郵箱', max_length=100, pattern=_EMAIL),
+            'enrollment_date': _date(row, 'enrollment_date', '入學日期'),
+            'status': _choice(row, 'status', STUDENT_STATUSES, '學籍狀態'),
+        }
+
+    def parse(self, row):
+        record = self.convert(row)
+        # 所有欄位通過後才登記唯一值，避免無效行佔用學號或郵箱
+        _unique(record['student_id'], self.student_ids, '學號')
+        try:
+            _unique(record['email'], self.emails, '郵箱')
+        except RowError:
+            self.student_ids.discard(record['student_id'].lower())
+            raise
+        return record
+
+    def finish(self):
+        pass
+
+
+class _TeacherImporter:
+    """
+    教師匯入：預先載入現有教師編號、郵箱及系所
+
+    Args:
+        check_unique: 是否載入現有教師編號及郵箱以檢查重複
+    """
+
+    model = Teacher
+
+    def __init__(self, check_unique=True):
+        if check_unique:
+            self.teacher_ids = {t.lower() for (t,) in db.session.query(Teacher.teacher_id)}
+            self.emails = {e.lower() for (e,) in db.session.query(Teacher.email).filter(Teacher.email.isnot(None))}
+        self.departments = _department_lookup()
+
+    def convert(self, row):
+        """轉換並驗證欄位值，不檢查重複"""
+        salary = _text(row, 'salary', label='薪資')
+        if salary is not None:
+            try:
+                salary = float(salary)
+            except ValueError:
+                raise RowError(f'薪資必須是數字：{salary}')
+            if salary < 0:
+                raise RowError('薪資不能為負數')
+
+        return {
+            'teacher_id': _text(row, 'teacher_id', True, '教師編號', 3, 20, _ALPHANUMERIC),
+            'name': _text(row, 'name', True, '姓名', 2, 50),
+            'gender': _choice(row, 'gender', GENDERS, '性別'),
+            'birth_date': _date(row, 'birth_date', '出生日期'),
+            'id_number': _text(row, 'id_number', label='身份證號', min_length=10, max_length=18),
+            'address': _text(row, 'address', label='地址', max_length=200),
+            'phone': _text(row, 'phone', label='電話', max_length=20, pattern=_PHONE),
+            'email': _text(row, 'email', label='郵箱', max_length=100, pattern=_EMAIL),
+            'department_id': _department_id(row, self.departments),
+            'position': _text(row, 'position', label='職位', max_length=50),
+            'hire_date': _date(row, 'hire_date', '入職日期', required=True),
+            'salary': salary,
+            'notes': _text(row, 'notes', label='備註', max_length=500),
+        }
+
+    def parse(self, row):
+        record = self.convert(row)
+        _unique(record['teacher_id'], self.teacher_ids, '教師編號')
+        try:
+            _unique(record['email'], self.emails, '郵箱')
+        except RowError:
+            self.teacher_ids.discard(record['teacher_id'].lower())
+            raise
+        return record
+
+    def finish(self):
+        reference_data.invalidate(reference_data.TEACHERS)
+
+
+class _ClassImporter:
+    """
+    班級匯入：預先載入現有班級名稱、班導師、系所及教師編號
+
+    Args:
+        check_unique: 是否檢查班級名稱重複及教師是否已擔任其他班級的班導師
+    """
+
+    model = Class
+
+    def __init__(self, check_unique=True):
+        if check_unique:
+            self.class_names = {c.class_name.lower() for c in reference_data.get_classes()}
+            self.homeroom_teachers = {
+                t for (t,) in db.session.query(Class.teacher_id).filter(Class.teacher_id.isnot(None)).distinct()
+            }
+        self.departments = _department_lookup()
+        self.teacher_ids = {t.teacher_id for t in reference_data.get_teachers()}
+
+    def convert(self, row):
+        """轉換並驗證欄位值，不檢查重複"""
+        teacher_id = _text(row, 'teacher_id', label='班導師')
+        if teacher_id is not None and teacher_id not in self.teacher_ids:
+            raise RowError(f'教師編號不存在：{teacher_id}')
+        grade = _int(row, 'grade', '年級', required=True)
+        if not 1 <= grade <= 6:
+            raise RowError('年級必須在1-6之間')
+
+        return {
+            'class_name': _text(row, 'class_name', True, '班級名稱', 2, 100),
+            'grade': grade,
+            'department_id': _department_id(row, self.departments),
+            'teacher_id': teacher_id,
+        }
+
+    def parse(self, row):
+        record = self.convert(row)
+        # 每位教師只能擔任一個班級的班導師（數據庫中已有的及檔案內較早的行）
+        teacher_id = record['teacher_id']
+        if teacher_id is not None and teacher_id in self.homeroom_teachers:
+            raise RowError(f'教師{teacher_id}已擔任其他班級的班導師')
+        _unique(record['class_name'], self.class_names, '班級名稱')
+        if teacher_id is not None:
+            self.homeroom_teachers.add(teacher_id)
+        return record
+
+    def finish(self):
+        reference_data.invalidate(reference_data.CLASSES)
+
+
+def _department_lookup():
+    """系所名稱及ID -> 系所ID"""
+    lookup = {}
+    for department in reference_data.get_departments():
+        lookup[department.department_name] = department.department_id
+        lookup[str(department.department_id)] = department.department_id
+    return lookup
+
+
+def _department_id(row, departments):
+    """以系所名稱或ID取得系所ID"""
+    value = _text(row, 'department', label='系所') or _text(row, 'department_id', label='系所')
+    if value is None:
+        if not _required(row, ('department', 'department_id')):
+            return None
+        raise RowError('缺少系所')
+    if value not in departments:
+        raise RowError(f'系所不存在：{value}')
+    return departments[value]
+
+
+IMPORTERS = {
+    'students': _StudentImporter,
+    'teachers': _TeacherImporter,
+    'classes': _ClassImporter,
+}
+
+
+def import_rows(kind, rows, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    驗證並批量插入資料
+
+    Args:
+        kind: 資料種類（students、teachers或classes）
+        rows: (行號, 欄位名稱 -> 值)的迭代器，通常來自read_rows
+        batch_size: 每批插入的行數
+        dry_run: 只驗證不寫入
+
+    Returns:
+        ImportResult: 匯入結果
+    """
+    importer = IMPORTERS[kind]()
+    result = ImportResult()
+    batch, lines = [], []
+
+    def flush():
+        if not batch:
+            return
+        if not dry_run:
+            try:
+                db.session.execute(insert(importer.model), batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                result.errors.extend((line, f'寫入失敗：{e.__class__.__name__}') for line in lines)
+                batch.clear()
+                lines.clear()
+                return
+        result.inserted += len(batch)
+        batch.clear()
+        lines.clear()
+
+    for line, row in rows:
+        result.total += 1
+        try:
+            batch.append(importer.parse(row))
+            lines.append(line)
+        except RowError as e:
+            result.errors.append((line, str(e)))
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    if result.inserted and not dry_run:
+        importer.finish()
+    return result
@@ -0,0 +1,131 @@
+"""
+數據庫連線池統計
+連線池大小、溢出上限、等待超時、回收時間及取用前檢測由配置（環境變量）決定；
+本進程的連線池使用InstrumentedQueuePool，記錄每次取用連線的等待時間及等待超時次數，
+並以連線池事件統計新建、取用、歸還及失效的連線數量
+
+統計只涵蓋本進程，多進程部署時每個進程各自統計
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from app import db
+
+# 保留最近多少次取用的等待時間用於計算百分位數
+WAIT_SAMPLES = 1000
+
+# 只對連線池有效的引擎參數，記憶體SQLite使用單一共用連線時需要移除
+POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'poolclass')
+
+_lock = threading.Lock()
+_counts = Counter()
+_waits = deque(maxlen=WAIT_SAMPLES)
+_wait_stats = {'count': 0, 'total': 0.0, 'max': 0.0, 'peak_checked_out': 0}
+
+
+class InstrumentedQueuePool(QueuePool):
+    """記錄取用連線等待時間及等待超時次數的QueuePool"""
+
+    # 沿用QueuePool的日誌名稱，否則按模組命名會歸入Flask的app日誌，除錯模式下每次取用連線都會輸出
+    _sqla_logger_namespace = 'sqlalchemy.pool.impl.QueuePool'
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with _lock:
+                _counts['timeouts'] += 1
+            raise
+        waited = time.perf_counter() - started
+        checked_out = self.checkedout()
+        with _lock:
+            _waits.append(waited)
+            _wait_stats['count'] += 1
+            _wait_stats['total'] += waited
+            _wait_stats['max'] = max(_wait_stats['max'], waited)
+            _wait_stats['peak_checked_out'] = max(_wait_stats['peak_checked_out'], checked_out)
+        return connection
+
+
+def _count(name):
+    def listener(*args):
+        with _lock:
+            _counts[name] += 1
+    return listener
+
+
+event.listen(InstrumentedQueuePool, 'connect', _count('connects'))
+event.listen(InstrumentedQueuePool, 'checkout', _count('checkouts'))
+event.listen(InstrumentedQueuePool, 'checkin', _count('checkins'))
+event.listen(InstrumentedQueuePool, 'invalidate', _count('invalidations'))
+
+
+def init_app(app):
+    """
+    按配置設定引擎參數，必須在db.init_app之前調用
+    記憶體SQLite（測試用）使用單一共用連線，不設定連線池參數
+
+    Args:
+        app: Flask應用實例
+    """
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        options = {key: value for key, value in options.items() if key not in POOL_OPTIONS}
+    else:
+        options.setdefault('poolclass', InstrumentedQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def _percentile(values, percent):
+    """取得已排序數值列表的百分位數"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def metrics():
+    """
+    取得本進程連線池的即時狀態及累計統計，需在應用上下文中調用
+
+    Returns:
+        dict: 連線池設定、目前使用中及溢出的連線數、等待時間（毫秒）及各事件次數
+    """
+    pool = db.engine.pool
+    result = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        result.update(
+            pool_size=pool.size(),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+        )
+
+    with _lock:
+        counts = dict(_counts)
+        waits = sorted(_waits)
+        stats = dict(_wait_stats)
+    result.update(
+        connects=counts.get('connects', 0),
+        checkouts=counts.get('checkouts', 0),
+        checkins=counts.get('checkins', 0),
+        invalidations=counts.get('invalidations', 0),
+        timeouts=counts.get('timeouts', 0),
+        peak_checked_out=stats['peak_checked_out'],
+        wait_ms={
+            'avg': round(stats['total'] / stats['count'] * 1000, 3) if stats['count'] else 0.0,
+            'max': round(stats['max'] * 1000, 3),
+            'p50': round(_percentile(waits, 50) * 1000, 3),
+            'p95': round(_percentile(waits, 95) * 1000, 3),
+            'p99': round(_percentile(waits, 99) * 1000, 3),
+            'samples': len(waits),
+        },
+    )
+    return result
@@ -0,0 +1,163 @@
+"""
+批量開設帳號
+為學生或教師名冊批量建立登入帳號：用戶名為學號或教師編號，related_id關聯到對應記錄
+已存在的用戶名及已有帳號的記錄以一次集合查詢找出後跳過，
+初始密碼在密碼進程池中並行哈希，再以executemany分批INSERT，全部批次在同一事務中一次提交
+產生的初始密碼只在返回結果（帳號清單）中出現一次，不會另外保存；
+任何一批失敗時整個事務回滾，不會留下已建立但初始密碼遺失的帳號
+"""
+
+import csv
+import io
+import secrets
+import string
+from datetime import datetime
+from sqlalchemy import insert, or_
+from app import db
+from app.models import User, Student, Teacher
+from app.passwords import hash_passwords
+
+# 默認每批插入的帳號數量
+DEFAULT_BATCH_SIZE = 500
+
+# 默認初始密碼長度
+DEFAULT_PASSWORD_LENGTH = 10
+
+# 初始密碼字元（排除容易混淆的0、O、1、l、I）
+PASSWORD_ALPHABET = ''.join(c for c in string.ascii_letters + string.digits if c not in '0O1lI')
+
+# 帳號清單欄位
+CREDENTIAL_HEADERS = ['username', 'password', 'role', 'related_id', 'name']
+
+
+class ProvisionResult:
+    """
+    開設結果
+
+    Attributes:
+        created: (用戶名, 初始密碼, 角色, 關聯ID, 姓名)列表
+        skipped: (用戶名, 原因)列表
+    """
+
+    def __init__(self):
+        self.created = []
+        self.skipped = []
+
+    def credential_sheet(self):
+        """
+        生成帳號清單CSV（UTF-8帶BOM）
+
+        Returns:
+            str: CSV內容
+        """
+        buffer = io.StringIO()
+        buffer.write('\ufeff')
+        writer = csv.writer(buffer)
+        writer.writerow(CREDENTIAL_HEADERS)
+        writer.writerows(self.created)
+        return buffer.getvalue()
+
+
+def generate_password(length=DEFAULT_PASSWORD_LENGTH):
+    """產生隨機初始密碼"""
+    return ''.join(secrets.choice(PASSWORD_ALPHABET) for _ in range(length))
+
+
+def _roster(role, class_id=None, include_inactive=False):
+    """
+    讀取名冊（編號, 姓名）
+
+    Args:
+        role: student或teacher
+        class_id: 只讀取指定班級的學生
+        include_inactive: 是否包含非在學狀態的學生
+
+    Returns:
+        list: (編號, 姓名)列表
+    """
+    if role == 'teacher':
+        query = db.session.query(Teacher.teacher_id, Teacher.name).order_by(Teacher.teacher_id)
+    else:
+        query = db.session.query(Student.student_id, Student.name).order_by(Student.student_id)
+        if class_id:
+            query = query.filter(Student.class_id == class_id)
+        if not include_inactive:
+            query = query.filter(Student.status == '在學')
+    return query.all()
+
+
+def provision_accounts(role, class_id=None, include_inactive=False,
+                       password_length=DEFAULT_PASSWORD_LENGTH, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    為名冊中尚無帳號的學生或教師建立帳號
+
+    Args:
+        role: student或teacher
+        class_id: 只處理指定班級的學生
+        include_inactive: 是否包含非在學狀態的學生
+        password_length: 初始密碼長度
+        batch_size: 每批插入的帳號數量
+
+    Returns:
+        ProvisionResult: 開設結果
+
+    Raises:
+        SQLAlchemyError: 寫入失敗（例如用戶名同時被佔用）時拋出，此時沒有建立任何帳號
+    """
+    result = ProvisionResult()
+    roster = _roster(role, class_id, include_inactive)
+    if not roster:
+        return result
+
+    # 以集合查詢找出已使用的用戶名及已關聯帳號的編號（每5000個編號一次查詢）
+    ids = [related_id for related_id, _ in roster]
+    taken_usernames, linked_ids = set(), set()
+    for chunk_start in range(0, len(ids), 5000):
+        chunk = ids[chunk_start:chunk_start + 5000]
+        rows = db.session.query(User.username, User.role, User.related_id).filter(
+            or_(User.username.in_(chunk),
+                (User.role == role) & User.related_id.in_(chunk))
+        )
+        for username, user_role, related_id in rows:
+            taken_usernames.add(username)
+            if user_role == role:
+                linked_ids.add(related_id)
+
+    pending = []
+    for related_id, name in roster:
+        if related_id in linked_ids:
+            result.skipped.append((related_id, '已有帳號'))
+        elif related_id in taken_usernames:
+            result.skipped.append((related_id, '用戶名已被使用'))
+        else:
+            pending.append((related_id, name))
+
+    passwords = [generate_password(password_length) for _ in pending]
+    password_hashes = hash_passwords(passwords)
+
+    now = datetime.now()
+    try:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            db.session.execute(insert(User), [
+                {
+                    'username': related_id,
+                    'password_hash': password_hash,
+                    'role': role,
+                    'related_id': related_id,
+                    'is_active': True,
+                    'created_at': now,
+                    'updated_at': now,
+                }
+                for (related_id, _), password_hash in zip(batch, password_hashes[start:start + batch_size])
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    result.created.extend(
+        (related_id, password, role, related_id, name)
+        for (related_id, name), password in zip(pending, passwords)
+    )
+    return result
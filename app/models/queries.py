@@ -0,0 +1,96 @@
+"""
+輕量查詢輔助函數
+提供權限檢查和完整性檢查使用的EXISTS/單欄位查詢及游標分頁
+只探測索引欄位，不載入完整的模型對象
+"""
+
+from sqlalchemy import exists, select
+from app import db
+from app.models import Student, Class
+
+
+def class_has_students(class_id):
+    """
+    檢查班級中是否有學生
+
+    Args:
+        class_id: 班級ID
+
+    Returns:
+        bool: 班級中是否至少有一名學生
+    """
+    return db.session.query(
+        exists().where(Student.class_id == class_id)
+    ).scalar()
+
+
+def get_student_class_id(student_id):
+    """
+    取得學生所屬班級ID
+
+    Args:
+        student_id: 學生學號
+
+    Returns:
+        int: 班級ID，學生不存在或未分配班級時返回None
+    """
+    return db.session.query(Student.class_id).filter(
+        Student.student_id == student_id
+    ).scalar()
+
+
+def teacher_class_ids_select(teacher_id):
+    """
+    教師擔任班導師的班級ID子查詢，用於在學生查詢中以IN條件套用教師的權限範圍
+    權限範圍不快取，每次沿classes.teacher_id索引讀取，班導師變更後所有進程立即生效
+
+    Args:
+        teacher_id: 教師編號
+
+    Returns:
+        Select: 班級ID子查詢
+    """
+    return select(Class.class_id).where(Class.teacher_id == teacher_id)
+
+
+def get_teacher_class_ids(teacher_id):
+    """
+    取得教師擔任班導師的班級ID集合
+
+    Args:
+        teacher_id: 教師編號
+
+    Returns:
+        frozenset: 班級ID集合，沒有擔任班導師時為空集合
+    """
+    if not teacher_id:
+        return frozenset()
+    return frozenset(db.session.scalars(teacher_class_ids_select(teacher_id)))
+
+
+# 游標分頁默認每頁筆數
+KEYSET_PAGE_SIZE = 20
+
+
+def keyset_page(query, id_column, after=None, limit=KEYSET_PAGE_SIZE):
+    """
+    以主鍵游標分頁讀取資料（搜尋選單選項、班級名單等）
+    按主鍵排序並從上一頁最後一筆之後開始讀取，不需要OFFSET或COUNT
+
+    Args:
+        query: 已套用搜尋條件的查詢對象
+        id_column: 主鍵欄位
+        after: 上一頁最後一筆的主鍵值
+        limit: 每頁筆數
+
+    Returns:
+        tuple: (本頁資料列表, 下一頁游標；沒有下一頁時為None)
+    """
+    if after not in (None, ''):
+        query = query.filter(id_column > after)
+
+    rows = query.order_by(id_column).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, getattr(rows[-1], id_column.key)
+    return rows, None
@@ -0,0 +1,71 @@
+"""
+學生批量調班
+將選取的學生或整個班級的學生以一條 UPDATE ... WHERE student_id IN (...) 移至目標班級，
+不逐一載入學生對象、不重新執行學生表單的驗證
+教師的權限範圍以一次班級ID查詢及一次計數查詢檢查
+"""
+
+from datetime import datetime
+from sqlalchemy import func, or_
+from app import db
+from app.models import Student
+from app.models.queries import get_teacher_class_ids
+from app.models.reference_data import get_classes
+
+
+class ReassignError(ValueError):
+    """調班請求無效或超出權限範圍"""
+
+
+def reassign_students(target_class_id, student_ids=None, source_class_id=None, teacher_id=None):
+    """
+    將學生批量移至目標班級
+
+    Args:
+        target_class_id: 目標班級ID
+        student_ids: 要調班的學號列表
+        source_class_id: 整班調動時的來源班級ID（與student_ids同時提供時只移動該班中的指定學生）
+        teacher_id: 教師操作時的教師編號，調動範圍限於其負責的班級；管理員為None
+
+    Returns:
+        int: 實際調班的學生人數
+
+    Raises:
+        ReassignError: 目標班級不存在、未選擇學生或超出權限範圍時拋出
+    """
+    if target_class_id not in {c.class_id for c in get_classes()}:
+        raise ReassignError('目標班級不存在')
+
+    student_ids = sorted({str(sid).strip() for sid in student_ids or () if str(sid).strip()})
+    if not student_ids and not source_class_id:
+        raise ReassignError('請選擇要調班的學生')
+    if source_class_id == target_class_id:
+        raise ReassignError('來源班級與目標班級相同')
+
+    conditions = []
+    if student_ids:
+        conditions.append(Student.student_id.in_(student_ids))
+    if source_class_id:
+        conditions.append(Student.class_id == source_class_id)
+
+    if teacher_id is not None:
+        scope = get_teacher_class_ids(teacher_id)
+        if target_class_id not in scope or (source_class_id and source_class_id not in scope):
+            raise ReassignError('只能在自己負責的班級之間調班')
+        if student_ids:
+            # 一次計數查詢確認所有選取的學生都在教師負責的班級中
+            in_scope = db.session.query(func.count(Student.student_id)).filter(
+                *conditions, Student.class_id.in_(scope)
+            ).scalar()
+            if in_scope != len(student_ids):
+                raise ReassignError('選取的學生中有不屬於您負責班級的學生')
+
+    count = Student.query.filter(
+        *conditions, or_(Student.class_id.is_(None), Student.class_id != target_class_id)
+    ).update({
+        Student.class_id: target_class_id,
+        Student.updated_at: datetime.now(),
+    }, synchronize_session=False)
+    # 提交後會話中已載入的學生對象（包括請求快取中的）全部過期，再次存取時重新讀取
+    db.session.commit()
+    return count
@@ -0,0 +1,185 @@
+"""
+參考資料快取
+快取系所、班級和教師等下拉選單使用的參考資料，整個進程共用
+每類資料帶有版本號，資料庫事務提交時若涉及這些模型則遞增版本號使快取失效
+另設有存活時間（REFERENCE_DATA_CACHE_TTL），讓多進程部署中其他進程的快取也能定期刷新
+教師可查看的班級ID集合（權限範圍）用於授權，不在此快取，見app.models.queries
+"""
+
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+from app.models import Department, Class, Teacher
+
+# 快取的資料為不綁定資料庫會話的唯讀快照
+DepartmentRef = namedtuple('DepartmentRef', ['department_id', 'department_name'])
+ClassRef = namedtuple('ClassRef', ['class_id', 'class_name', 'grade', 'department_id',
+                                   'department_name', 'teacher_id'])
+TeacherRef = namedtuple('TeacherRef', ['teacher_id', 'name', 'department_id'])
+
+# 參考資料種類與對應的模型
+DEPARTMENTS = 'departments'
+CLASSES = 'classes'
+TEACHERS = 'teachers'
+
+_MODEL_KINDS = {
+    Department: (DEPARTMENTS, CLASSES),  # 班級快照中包含系所名稱
+    Class: (CLASSES,),
+    Teacher: (TEACHERS,),
+}
+
+# 默認快取存活時間（秒）
+DEFAULT_TTL = 300
+
+_lock = threading.Lock()
+_versions = {DEPARTMENTS: 0, CLASSES: 0, TEACHERS: 0}
+_entries = {}
+
+
+def _load_departments():
+    """從數據庫載入系所快照，按名稱排序"""
+    return tuple(
+        DepartmentRef(d.department_id, d.department_name)
+        for d in Department.query.order_by(Department.department_name).all()
+    )
+
+
+def _load_classes():
+    """從數據庫載入班級快照，按名稱排序"""
+    return tuple(
+        ClassRef(c.class_id, c.class_name, c.grade, c.department_id,
+                 c.department.department_name if c.department else '', c.teacher_id)
+        for c in Class.query.options(joinedload(Class.department))
+                            .order_by(Class.class_name).all()
+    )
+
+
+def _load_teachers():
+    """從數據庫載入教師快照，按姓名排序"""
+    return tuple(
+        TeacherRef(t.teacher_id, t.name, t.department_id)
+        for t in Teacher.query.with_entities(
+            Teacher.teacher_id, Teacher.name, Teacher.department_id
+        ).order_by(Teacher.name).all()
+    )
+
+
+_LOADERS = {
+    DEPARTMENTS: _load_departments,
+    CLASSES: _load_classes,
+    TEACHERS: _load_teachers,
+}
+
+
+def _get(kind):
+    """
+    取得指定種類的參考資料
+    快取版本與當前版本不符或已過期時重新載入
+
+    Args:
+        kind: 參考資料種類
+
+    Returns:
+        tuple: 參考資料快照
+    """
+    ttl = current_app.config.get('REFERENCE_DATA_CACHE_TTL', DEFAULT_TTL)
+    now = time.monotonic()
+
+    with _lock:
+        version = _versions[kind]
+        entry = _entries.get(kind)
+    if entry and entry[0] == version and now - entry[1] < ttl:
+        return entry[2]
+
+    data = _LOADERS[kind]()
+
+    with _lock:
+        # 載入期間若版本已變更則不寫入，下次讀取時重新載入
+        if _versions[kind] == version:
+            _entries[kind] = (version, now, data)
+    return data
+
+
+def get_departments():
+    """
+    取得所有系所（按名稱排序）
+
+    Returns:
+        tuple: DepartmentRef列表
+    """
+    return _get(DEPARTMENTS)
+
+
+def get_classes(teacher_id=None):
+    """
+    取得班級（按名稱排序）
+
+    Args:
+        teacher_id: 如提供則只返回該教師擔任班導師的班級
+
+    Returns:
+        list: ClassRef列表
+    """
+    classes = _get(CLASSES)
+    if teacher_id is None:
+        return list(classes)
+    return [c for c in classes if c.teacher_id == teacher_id]
+
+
+def get_teachers():
+    """
+    取得所有教師（按姓名排序）
+
+    Returns:
+        tuple: TeacherRef列表
+    """
+    return _get(TEACHERS)
+
+
+def invalidate(*kinds):
+    """
+    使參考資料快取失效
+    批量SQL語句等不經過ORM單元操作的修改可直接調用
+
+    Args:
+        *kinds: 參考資料種類，未指定時全部失效
+    """
+    with _lock:
+        for kind in kinds or tuple(_versions):
+            _versions[kind] += 1
+            _entries.pop(kind, None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    """記錄本次事務中修改過的參考資料種類"""
+    pending = session.info.setdefault('reference_data_changes', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        pending.update(_MODEL_KINDS.get(type(obj), ()))
+
+
+@event.listens_for(Session, 'after_bulk_update')
+@event.listens_for(Session, 'after_bulk_delete')
+def _collect_bulk_changes(bulk_context):
+    """記錄ORM批量UPDATE/DELETE修改的參考資料種類"""
+    mapper = bulk_context.mapper
+    if mapper is not None:
+        pending = bulk_context.session.info.setdefault('reference_data_changes', set())
+        pending.update(_MODEL_KINDS.get(mapper.class_, ()))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    """事務提交後使受影響的快取失效"""
+    changes = session.info.pop('reference_data_changes', None)
+    if changes:
+        invalidate(*changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    """事務回滾時丟棄已記錄的修改"""
+    session.info.pop('reference_data_changes', None)
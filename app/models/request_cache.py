@@ -0,0 +1,82 @@
+"""
+請求範圍實體快取
+同一請求中權限檢查和視圖函數共用已載入的學生、班級、教師對象
+快取存放在flask.g上，請求結束即失效；載入時一併預先載入頁面所需的關聯
+
+只有視圖本身會顯示該實體時，權限檢查才透過這裡載入；
+視圖不使用的實體（例如學生查看班級時的學生本身）以app.models.queries中的單欄位查詢探測
+"""
+
+from flask import g, abort
+from sqlalchemy.orm import joinedload, selectinload
+from app import db
+from app.models import Student, Class, Teacher
+
+# 各模型載入時預先載入的關聯
+_EAGER_OPTIONS = {
+    Student: (
+        joinedload(Student.class_info).joinedload(Class.department),
+        joinedload(Student.class_info).joinedload(Class.teacher),
+    ),
+    Class: (
+        joinedload(Class.department),
+        joinedload(Class.teacher),
+    ),
+    Teacher: (
+        joinedload(Teacher.department),
+        selectinload(Teacher.classes),
+    ),
+}
+
+
+def get_entity(model, pk):
+    """
+    取得實體對象，同一請求中每個實體只查詢一次
+
+    Args:
+        model: 模型類（Student、Class或Teacher）
+        pk: 主鍵值
+
+    Returns:
+        實體對象，不存在時返回None
+    """
+    if pk is None:
+        return None
+
+    cache = g.setdefault('_entity_cache', {})
+    key = (model, str(pk))
+    if key not in cache:
+        cache[key] = db.session.get(model, pk, options=_EAGER_OPTIONS[model])
+    return cache[key]
+
+
+def get_entity_or_404(model, pk):
+    """
+    取得實體對象，不存在時返回404錯誤
+
+    Args:
+        model: 模型類
+        pk: 主鍵值
+
+    Returns:
+        實體對象
+    """
+    entity = get_entity(model, pk)
+    if entity is None:
+        abort(404)
+    return entity
+
+
+def get_student(student_id):
+    """取得學生（預先載入班級、系所及班導師）"""
+    return get_entity(Student, student_id)
+
+
+def get_class(class_id):
+    """取得班級（預先載入系所及班導師）"""
+    return get_entity(Class, class_id)
+
+
+def get_teacher(teacher_id):
+    """取得教師（預先載入系所及擔任班導師的班級）"""
+    return get_entity(Teacher, teacher_id)
@@ -0,0 +1,184 @@
+"""
+學年升級
+學年結束時將畢業年級班級中的在學學生改為畢業，並將其餘班級升一年級
+
+以集合式UPDATE分批執行，每批一個短事務，避免長時間鎖住學生表或班級表；
+進度（階段及游標）與每批更新在同一事務中寫入rollover_runs，中斷後重新執行會從上次提交的位置續跑：
+1. graduate：按學號順序分批將畢業年級班級中的在學學生改為畢業
+2. promote：按班級ID順序分批將低於畢業年級的班級年級加一
+先處理畢業再升級，剛升到畢業年級的班級不會被誤判為應屆畢業
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import func, select
+from app import db
+from app.models import Student, Class, RolloverRun
+
+# 默認每批更新的行數
+DEFAULT_CHUNK_SIZE = 1000
+
+# 默認畢業年級
+DEFAULT_FINAL_GRADE = 4
+
+GraduatingClass = namedtuple('GraduatingClass', 'class_id class_name grade students')
+
+
+class RolloverError(RuntimeError):
+    """學年升級無法執行"""
+
+
+class RolloverPlan:
+    """
+    學年升級預覽
+
+    Attributes:
+        final_grade: 畢業年級
+        graduating: 各畢業班級及其在學人數（GraduatingClass列表）
+        promotions: (年級, 班級數)列表，表示該年級的班級將升一年級
+    """
+
+    def __init__(self, final_grade, graduating, promotions):
+        self.final_grade = final_grade
+        self.graduating = graduating
+        self.promotions = promotions
+
+    @property
+    def students_to_graduate(self):
+        return sum(c.students for c in self.graduating)
+
+    @property
+    def classes_to_promote(self):
+        return sum(count for _, count in self.promotions)
+
+
+def _final_classes(final_grade):
+    """畢業年級班級ID子查詢"""
+    return select(Class.class_id).where(Class.grade >= final_grade)
+
+
+def plan_rollover(final_grade=DEFAULT_FINAL_GRADE):
+    """
+    統計學年升級將影響的資料，不做任何修改
+
+    Args:
+        final_grade: 畢業年級
+
+    Returns:
+        RolloverPlan: 升級預覽
+    """
+    graduating = [
+        GraduatingClass(*row)
+        for row in db.session.query(
+            Class.class_id, Class.class_name, Class.grade, func.count(Student.student_id)
+        ).join(Student, Student.class_id == Class.class_id).filter(
+            Class.grade >= final_grade, Student.status == '在學'
+        ).group_by(Class.class_id, Class.class_name, Class.grade).order_by(Class.grade, Class.class_name)
+    ]
+    promotions = db.session.query(Class.grade, func.count(Class.class_id)).filter(
+        Class.grade < final_grade
+    ).group_by(Class.grade).order_by(Class.grade).all()
+    return RolloverPlan(final_grade, graduating, promotions)
+
+
+def get_run(school_year):
+    """
+    取得指定學年的升級記錄
+
+    Args:
+        school_year: 學年標識
+
+    Returns:
+        RolloverRun: 升級記錄，不存在時返回None
+    """
+    return RolloverRun.query.filter_by(school_year=school_year).first()
+
+
+def run_rollover(school_year, final_grade=DEFAULT_FINAL_GRADE, chunk_size=DEFAULT_CHUNK_SIZE,
+                 progress=None):
+    """
+    執行學年升級，已有未完成的記錄時從上次的進度續跑
+
+    Args:
+        school_year: 學年標識
+        final_grade: 畢業年級（續跑時必須與原記錄一致）
+        chunk_size: 每批更新的行數
+        progress: 每批提交後調用的回調函數，參數為升級記錄
+
+    Returns:
+        RolloverRun: 完成後的升級記錄
+
+    Raises:
+        RolloverError: 該學年已完成升級或畢業年級與未完成的記錄不一致時拋出
+    """
+    run = get_run(school_year)
+    if run is None:
+        run = RolloverRun(school_year=school_year, final_grade=final_grade, phase='graduate')
+        db.session.add(run)
+        db.session.commit()
+    elif run.phase == 'done':
+        raise RolloverError(f'{school_year}學年已於{run.finished_at:%Y-%m-%d %H:%M}完成升級')
+    elif run.final_grade != final_grade:
+        raise RolloverError(f'{school_year}學年未完成的升級使用畢業年級{run.final_grade}，請使用相同的設定續跑')
+
+    if run.phase == 'graduate':
+        _graduate(run, chunk_size, progress)
+        run.phase = 'promote'
+        run.cursor = None
+        db.session.commit()
+
+    if run.phase == 'promote':
+        _promote(run, chunk_size, progress)
+        run.phase = 'done'
+        run.cursor = None
+        run.finished_at = datetime.now()
+        db.session.commit()
+
+    return run
+
+
+def _graduate(run, chunk_size, progress):
+    """按學號順序分批將畢業年級班級中的在學學生改為畢業"""
+    final_classes = _final_classes(run.final_grade)
+    while True:
+        query = db.session.query(Student.student_id).filter(
+            Student.class_id.in_(final_classes), Student.status == '在學'
+        )
+        if run.cursor:
+            query = query.filter(Student.student_id > run.cursor)
+        student_ids = [student_id for student_id, in query.order_by(Student.student_id).limit(chunk_size)]
+        if not student_ids:
+            return
+
+        count = Student.query.filter(
+            Student.student_id.in_(student_ids), Student.status == '在學'
+        ).update({
+            Student.status: '畢業',
+            Student.updated_at: datetime.now(),
+        }, synchronize_session=False)
+        run.cursor = student_ids[-1]
+        run.students_graduated += count
+        db.session.commit()
+        if progress:
+            progress(run)
+
+
+def _promote(run, chunk_size, progress):
+    """按班級ID順序分批將低於畢業年級的班級年級加一"""
+    while True:
+        query = db.session.query(Class.class_id).filter(Class.grade < run.final_grade)
+        if run.cursor:
+            query = query.filter(Class.class_id > int(run.cursor))
+        class_ids = [class_id for class_id, in query.order_by(Class.class_id).limit(chunk_size)]
+        if not class_ids:
+            return
+
+        # 游標之前的班級已升級，即使升級後年級仍低於畢業年級也不會再被選中
+        count = Class.query.filter(Class.class_id.in_(class_ids)).update(
+            {Class.grade: Class.grade + 1}, synchronize_session=False
+        )
+        run.cursor = str(class_ids[-1])
+        run.classes_promoted += count
+        db.session.commit()
+        if progress:
+            progress(run)
@@ -0,0 +1,272 @@
+"""
+測試資料產生
+以固定的亂數種子產生系所、教師、班級及學生資料（繁體中文姓名、符合檢查碼的身份證號、郵箱、手機、日期），
+相同的種子及相同的數據庫狀態會產生相同的資料（日期以當年為基準）
+
+資料按批產生並以Core executemany INSERT寫入，每批一個事務，記憶體用量與總筆數無關；
+編號接續數據庫中已有的同格式編號，可重複執行以追加資料
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, select
+from app import db
+from app.models import Department, Teacher, Class, Student
+
+# 默認每批插入的行數
+DEFAULT_BATCH_SIZE = 10000
+
+# 默認亂數種子
+DEFAULT_SEED = 42
+
+# 產生的編號格式：前綴 + 固定位數
+STUDENT_ID_PREFIX, STUDENT_ID_DIGITS = 'S', 7
+TEACHER_ID_PREFIX, TEACHER_ID_DIGITS = 'T', 5
+
+DEPARTMENT_NAMES = (
+    '資訊工程學系', '電機工程學系', '機械工程學系', '土木工程學系', '化學工程學系',
+    '企業管理學系', '會計學系', '財務金融學系', '外國語文學系', '中國文學系',
+    '應用數學系', '物理學系',
+)
+
+SURNAMES = '陳林黃張李王吳劉蔡楊許鄭謝郭洪曾邱廖賴周徐蘇葉莊呂江何蕭羅高潘簡朱鍾彭游詹胡施沈余盧梁趙顏柯翁魏孫戴'
+MALE_CHARS = '志明俊傑建宏家豪冠宇承恩宗翰柏翰彥廷哲瑋子軒品睿宇辰信宏文彬偉誠正嘉銘振國'
+FEMALE_CHARS = '怡君雅婷淑芬美玲佳穎欣怡詩涵宜蓁思妤家瑜婉婷心怡郁婷雅雯佩珊惠雯筱涵依琳'
+CITIES = ('臺北市', '新北市', '桃園市', '臺中市', '臺南市', '高雄市', '新竹市', '基隆市', '嘉義市', '宜蘭縣')
+ROADS = ('中正路', '中山路', '民生路', '復興路', '和平路', '光復路', '忠孝路', '信義路', '仁愛路', '成功路')
+SECTIONS = '甲乙丙丁戊己庚辛壬癸'
+POSITIONS = ('講師', '助理教授', '副教授', '教授')
+STUDENT_STATUSES = (('在學', 90), ('休學', 5), ('退學', 2), ('畢業', 3))
+
+# 身份證號首字母對應的數字
+_ID_LETTER_CODES = {
+    'A': 10, 'B': 11, 'C': 12, 'D': 13, 'E': 14, 'F': 15, 'G': 16, 'H': 17, 'I': 34,
+    'J': 18, 'K': 19, 'L': 20, 'M': 21, 'N': 22, 'O': 35, 'P': 23, 'Q': 24, 'R': 25,
+    'S': 26, 'T': 27, 'U': 28, 'V': 29, 'W': 32, 'X': 30, 'Y': 31, 'Z': 33,
+}
+_ID_LETTERS = ''.join(_ID_LETTER_CODES)
+_ID_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 1)
+
+
+class SeedResult:
+    """
+    產生結果
+
+    Attributes:
+        departments: 新增的系所數量
+        teachers: 新增的教師數量
+        classes: 新增的班級數量
+        students: 新增的學生數量
+    """
+
+    def __init__(self):
+        self.departments = 0
+        self.teachers = 0
+        self.classes = 0
+        self.students = 0
+
+
+def id_number(letter, gender, serial):
+    """
+    產生符合檢查碼規則的身份證號
+
+    Args:
+        letter: 首字母
+        gender: 男或女
+        serial: 0-9999999的流水號，不同流水號產生不同的身份證號
+
+    Returns:
+        str: 10碼身份證號
+    """
+    digits = [1 if gender == '男' else 2] + [int(c) for c in f'{serial:07d}']
+    code = _ID_LETTER_CODES[letter]
+    total = code // 10 + (code % 10) * 9 + sum(d * w for d, w in zip(digits, _ID_WEIGHTS))
+    check = (10 - total % 10) % 10
+    return letter + ''.join(map(str, digits)) + str(check)
+
+
+def _next_number(column, prefix, digits):
+    """取得接續已有同格式編號的下一個序號"""
+    latest = db.session.query(func.max(column)).filter(column.like(prefix + '_' * digits)).scalar()
+    try:
+        return int(latest[len(prefix):]) + 1 if latest else 1
+    except ValueError:
+        return 1
+
+
+class _Generator:
+    """按種子產生各欄位值"""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.today = date.today()
+
+    def person(self):
+        """產生性別及姓名"""
+        rng = self.rng
+        gender = '男' if rng.random() < 0.5 else '女'
+        chars = MALE_CHARS if gender == '男' else FEMALE_CHARS
+        given = rng.choice(chars) if rng.random() < 0.1 else rng.choice(chars) + rng.choice(chars)
+        return gender, rng.choice(SURNAMES) + given
+
+    def phone(self):
+        return f'09{self.rng.randrange(10 ** 8):08d}'
+
+    def address(self):
+        rng = self.rng
+        return f'{rng.choice(CITIES)}{rng.choice(ROADS)}{rng.randint(1, 300)}號'
+
+    def day_in_year(self, year):
+        return date(year, 1, 1) + timedelta(days=self.rng.randrange(365))
+
+    def status(self):
+        roll = self.rng.randrange(100)
+        for status, weight in STUDENT_STATUSES:
+            if roll < weight:
+                return status
+            roll -= weight
+        return STUDENT_STATUSES[0][0]
+
+
+def _insert(table, rows):
+    """以executemany寫入一批資料並提交"""
+    if rows:
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+
+
+def seed_data(students=0, teachers=0, classes=0, seed=DEFAULT_SEED, batch_size=DEFAULT_BATCH_SIZE,
+              progress=None):
+    """
+    產生測試資料
+
+    Args:
+        students: 學生數量，分配到新產生的班級（未產生班級時分配到現有班級）
+        teachers: 教師數量
+        classes: 班級數量，按系所及一至四年級平均分布；班導師為新產生的教師（或尚未擔任班導師的現有教師），
+            每位教師只擔任一個班級的班導師，教師不足時其餘班級不設班導師
+        seed: 亂數種子
+        batch_size: 每批插入的行數
+        progress: 每批提交後調用的回調函數，參數為(資料種類, 已寫入筆數)
+
+    Returns:
+        SeedResult: 產生結果
+    """
+    result = SeedResult()
+    gen = _Generator(seed)
+    rng = gen.rng
+    today = gen.today
+    created_at = datetime.now()
+
+    departments = [d for (d,) in db.session.query(Department.department_id).order_by(Department.department_id)]
+    if not departments and (teachers or classes):
+        _insert(Department.__table__, [{'department_name': name} for name in DEPARTMENT_NAMES])
+        departments = [d for (d,) in db.session.query(Department.department_id).order_by(Department.department_id)]
+        result.departments = len(departments)
+
+    # 教師
+    teacher_ids = []
+    start = _next_number(Teacher.teacher_id, TEACHER_ID_PREFIX, TEACHER_ID_DIGITS)
+    batch = []
+    for i in range(teachers):
+        teacher_id = f'{TEACHER_ID_PREFIX}{start + i:0{TEACHER_ID_DIGITS}d}'
+        gender, name = gen.person()
+        hire_date = gen.day_in_year(rng.randint(today.year - 30, today.year))
+        batch.append({
+            'teacher_id': teacher_id,
+            'name': name,
+            'gender': gender,
+            'birth_date': gen.day_in_year(hire_date.year - rng.randint(25, 40)),
+            'id_number': id_number(rng.choice(_ID_LETTERS), gender, (start + i) * 7919 % 10 ** 7),
+            'address': gen.address(),
+            'phone': gen.phone(),
+            'email': f'{teacher_id.lower()}@example.edu.tw',
+            'department_id': departments[i % len(departments)],
+            'position': rng.choice(POSITIONS),
+            'hire_date': hire_date,
+            'salary': rng.randrange(50000, 150000, 500),
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+        teacher_ids.append(teacher_id)
+        if len(batch) >= batch_size:
+            _insert(Teacher.__table__, batch)
+            result.teachers += len(batch)
+            batch = []
+            if progress:
+                progress('teachers', result.teachers)
+    _insert(Teacher.__table__, batch)
+    result.teachers += len(batch)
+
+    # 班級：每個系所、年級依序編為甲、乙、丙...班，略過數據庫中已有的班級名稱
+    if classes:
+        # 新產生的教師尚未擔任班導師；否則取尚未擔任班導師的現有教師
+        homeroom_teachers = teacher_ids or [t for (t,) in db.session.query(Teacher.teacher_id).filter(
+            Teacher.teacher_id.notin_(select(Class.teacher_id).where(Class.teacher_id.isnot(None)))
+        ).order_by(Teacher.teacher_id).limit(classes)]
+        department_names = dict(db.session.query(Department.department_id, Department.department_name))
+        existing_names = {name for (name,) in db.session.query(Class.class_name)}
+        sections = {}
+        batch = []
+        for i in range(classes):
+            department_id = departments[i % len(departments)]
+            grade = (i // len(departments)) % 4 + 1
+            section = sections.get((department_id, grade), 0)
+            while True:
+                label = SECTIONS[section] if section < len(SECTIONS) else str(section + 1)
+                class_name = f'{department_names[department_id]}{grade}年{label}班'
+                section += 1
+                if class_name not in existing_names:
+                    break
+            sections[(department_id, grade)] = section
+            existing_names.add(class_name)
+            batch.append({
+                'class_name': class_name,
+                'grade': grade,
+                'department_id': department_id,
+                'teacher_id': homeroom_teachers[i] if i < len(homeroom_teachers) else None,
+            })
+        # 班級ID由數據庫產生，插入後按ID範圍取回
+        before = db.session.query(func.max(Class.class_id)).scalar() or 0
+        _insert(Class.__table__, batch)
+        result.classes = len(batch)
+        class_rows = db.session.query(Class.class_id, Class.grade).filter(
+            Class.class_id > before).order_by(Class.class_id).all()
+    else:
+        class_rows = db.session.query(Class.class_id, Class.grade).order_by(Class.class_id).all()
+
+    # 學生：入學年份按班級年級推算
+    start = _next_number(Student.student_id, STUDENT_ID_PREFIX, STUDENT_ID_DIGITS)
+    batch = []
+    for i in range(students):
+        student_id = f'{STUDENT_ID_PREFIX}{start + i:0{STUDENT_ID_DIGITS}d}'
+        gender, name = gen.person()
+        if class_rows:
+            class_id, grade = class_rows[rng.randrange(len(class_rows))]
+        else:
+            class_id, grade = None, 1
+        enrollment_year = today.year - grade + (1 if today.month >= 9 else 0)
+        batch.append({
+            'student_id': student_id,
+            'name': name,
+            'class_id': class_id,
+            'gender': gender,
+            'birth_date': gen.day_in_year(enrollment_year - 18),
+            'address': gen.address(),
+            'phone': gen.phone(),
+            'email': f'{student_id.lower()}@student.example.edu.tw',
+            'enrollment_date': date(enrollment_year, 9, 1),
+            'status': gen.status(),
+            'id_number': id_number(rng.choice(_ID_LETTERS), gender, (start + i) * 7919 % 10 ** 7),
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+        if len(batch) >= batch_size:
+            _insert(Student.__table__, batch)
+            result.students += len(batch)
+            batch = []
+            if progress:
+                progress('students', result.students)
+    _insert(Student.__table__, batch)
+    result.students += len(batch)
+    return result
@@ -0,0 +1,60 @@
+"""
+列表排序輔助函數
+只允許按白名單中的欄位排序，每個欄位都有對應的（欄位, 主鍵）複合索引
+排序時以主鍵作為次要排序條件，確保分頁結果穩定
+"""
+
+from app.models import Student, Teacher, User
+
+# 學生列表可排序欄位：參數名稱 -> 欄位
+STUDENT_SORTS = {
+    'student_id': Student.student_id,
+    'name': Student.name,
+    'created_at': Student.created_at,
+}
+
+# 教師列表可排序欄位
+TEACHER_SORTS = {
+    'teacher_id': Teacher.teacher_id,
+    'name': Teacher.name,
+    'created_at': Teacher.created_at,
+}
+
+# 用戶列表可排序欄位
+USER_SORTS = {
+    'user_id': User.user_id,
+    'username': User.username,
+    'role': User.role,
+    'created_at': User.created_at,
+}
+
+
+def apply_sort(query, sorts, primary_key, sort=None, direction=None, default=None):
+    """
+    根據排序參數為查詢加上ORDER BY
+    不在白名單中的欄位改用默認排序，並以主鍵作為次要排序條件
+
+    Args:
+        query: SQLAlchemy查詢對象
+        sorts: 可排序欄位白名單
+        primary_key: 主鍵欄位
+        sort: 請求的排序欄位名稱
+        direction: 排序方向（asc或desc）
+        default: 默認排序欄位名稱
+
+    Returns:
+        tuple: (排序後的查詢對象, 實際排序欄位名稱, 實際排序方向)
+    """
+    if sort not in sorts:
+        sort = default
+    direction = 'desc' if direction == 'desc' else 'asc'
+
+    column = sorts[sort]
+    columns = [column] if column is primary_key else [column, primary_key]
+    if direction == 'desc':
+        query = query.order_by(*[c.desc() for c in columns])
+    else:
+        query = query.order_by(*[c.asc() for c in columns])
+
+    return query, sort, direction
+
@@ -0,0 +1,108 @@
+"""
+登入用戶快取
+Flask-Login每個請求都會載入當前用戶，這裡以用戶ID快取不綁定資料庫會話的唯讀快照
+快取設有存活時間（USER_CACHE_TTL），編輯、變更密碼或刪除用戶提交後立即失效
+"""
+
+import threading
+import time
+from flask import current_app
+
+# 默認快取存活時間（秒）
+DEFAULT_TTL = 60
+
+# 快取筆數上限，超過時先清除過期項目
+MAX_ENTRIES = 1024
+
+_lock = threading.Lock()
+_entries = {}
+_generation = 0
+
+
+class UserSnapshot:
+    """
+    當前用戶的唯讀快照
+    提供Flask-Login需要的屬性和方法，以及權限檢查使用的欄位
+
+    Args:
+        user: User模型對象
+    """
+
+    __slots__ = ('user_id', 'username', 'role', 'related_id', 'is_active')
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user):
+        self.user_id = user.user_id
+        self.username = user.username
+        self.role = user.role
+        self.related_id = user.related_id
+        self.is_active = bool(user.is_active) if user.is_active is not None else True
+
+    def get_id(self):
+        """返回用戶ID的字符串形式"""
+        return str(self.user_id)
+
+    def __eq__(self, other):
+        return getattr(other, 'user_id', None) == self.user_id
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.user_id)
+
+
+def get_user(user_id):
+    """
+    取得用戶快照，快取中沒有或已過期時從數據庫載入
+
+    Args:
+        user_id: 用戶ID
+
+    Returns:
+        UserSnapshot: 用戶快照，用戶不存在時返回None
+    """
+    from app import db
+    from app.models import User
+
+    ttl = current_app.config.get('USER_CACHE_TTL', DEFAULT_TTL)
+    now = time.monotonic()
+
+    with _lock:
+        generation = _generation
+        entry = _entries.get(user_id)
+    if entry and now - entry[0] < ttl:
+        return entry[1]
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    snapshot = UserSnapshot(user)
+
+    with _lock:
+        # 載入期間若有用戶被修改則不寫入，避免快取舊資料
+        if _generation != generation:
+            return snapshot
+        if len(_entries) >= MAX_ENTRIES:
+            expired = [key for key, (loaded_at, _) in _entries.items() if now - loaded_at >= ttl]
+            for key in expired:
+                del _entries[key]
+            if len(_entries) >= MAX_ENTRIES:
+                _entries.clear()
+        _entries[user_id] = (now, snapshot)
+    return snapshot
+
+
+def invalidate_user(user_id):
+    """
+    使指定用戶的快取失效
+
+    Args:
+        user_id: 用戶ID
+    """
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.pop(user_id, None)
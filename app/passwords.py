@@ -0,0 +1,183 @@
+"""
+密碼哈希運算
+PBKDF2哈希及驗證是CPU密集運算，在專用的進程池中執行，不佔用處理請求的線程
+同時進行的運算數量受PASSWORD_HASH_MAX_CONCURRENCY限制，等待超過
+PASSWORD_HASH_QUEUE_TIMEOUT秒時拋出PasswordHashBusy，避免大量登入拖垮整個服務
+批量運算（開設帳號）最多佔用名額總數減一個名額，至少保留一個名額給登入等單次運算
+PASSWORD_HASH_MAX_CONCURRENCY設為0時在當前線程直接運算（命令行工具、測試環境）
+子進程以forkserver方式啟動時會重新導入主模組，主模組不可在導入時直接進行密碼運算
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# 默認最大同時運算數量（即進程池大小）
+DEFAULT_MAX_CONCURRENCY = min(4, os.cpu_count() or 1)
+
+# 默認等待運算名額的秒數
+DEFAULT_QUEUE_TIMEOUT = 5
+
+# 批量哈希時每個子進程任務處理的密碼數量
+BULK_CHUNK_SIZE = 8
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+_bulk_slots = None
+
+
+class PasswordHashBusy(RuntimeError):
+    """等待密碼運算名額超時時拋出的異常"""
+
+
+def _config():
+    """取得(最大同時運算數量, 等待秒數)，沒有應用上下文時使用默認值"""
+    if has_app_context():
+        config = current_app.config
+        return (config.get('PASSWORD_HASH_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY),
+                config.get('PASSWORD_HASH_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT))
+    return DEFAULT_MAX_CONCURRENCY, DEFAULT_QUEUE_TIMEOUT
+
+
+def _get_executor(max_concurrency):
+    """
+    取得進程池及名額信號量，首次使用時建立
+    使用forkserver啟動子進程，避免從多線程的伺服器進程直接fork
+
+    Args:
+        max_concurrency: 最大同時運算數量
+
+    Returns:
+        tuple: (進程池, 名額信號量, 批量運算名額信號量)
+    """
+    global _executor, _slots, _bulk_slots
+    with _lock:
+        if _executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _executor = ProcessPoolExecutor(max_workers=max_concurrency, mp_context=context)
+            _slots = threading.BoundedSemaphore(max_concurrency)
+            _bulk_slots = threading.BoundedSemaphore(max(1, max_concurrency - 1))
+        return _executor, _slots, _bulk_slots
+
+
+def _run(func, *args):
+    """
+    在進程池中執行運算並等待結果
+
+    Args:
+        func: 運算函數
+        *args: 運算參數
+
+    Returns:
+        運算結果
+
+    Raises:
+        PasswordHashBusy: 等待名額超時時拋出
+    """
+    max_concurrency, queue_timeout = _config()
+    if not max_concurrency:
+        return func(*args)
+
+    executor, slots, _ = _get_executor(max_concurrency)
+    if not slots.acquire(timeout=queue_timeout):
+        raise PasswordHashBusy('系統忙碌，請稍後再試')
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_password(password):
+    """
+    計算密碼哈希值
+
+    Args:
+        password (str): 明文密碼
+
+    Returns:
+        str: 密碼哈希值
+    """
+    return _run(generate_password_hash, password)
+
+
+def verify_password(password_hash, password):
+    """
+    驗證密碼是否與哈希值相符
+
+    Args:
+        password_hash (str): 存儲的密碼哈希值
+        password (str): 待驗證的明文密碼
+
+    Returns:
+        bool: 密碼是否正確
+    """
+    return _run(check_password_hash, password_hash, password)
+
+
+def _hash_many(passwords):
+    """在子進程中計算一組密碼的哈希值"""
+    return [generate_password_hash(password) for password in passwords]
+
+
+def hash_passwords(passwords, chunk_size=BULK_CHUNK_SIZE):
+    """
+    批量計算密碼哈希值，分組後由進程池中的子進程並行運算
+    每組運算佔用一個名額，同時最多佔用名額總數減一個名額，登入等請求始終有名額可用；
+    等待名額超過PASSWORD_HASH_QUEUE_TIMEOUT秒時與單次運算相同拋出PasswordHashBusy
+
+    Args:
+        passwords: 明文密碼列表
+        chunk_size: 每組密碼數量
+
+    Returns:
+        list: 與輸入順序相同的密碼哈希值列表
+
+    Raises:
+        PasswordHashBusy: 等待名額超時時拋出，已提交的運算會被取消
+    """
+    max_concurrency, queue_timeout = _config()
+    if not max_concurrency:
+        return _hash_many(passwords)
+
+    executor, slots, bulk_slots = _get_executor(max_concurrency)
+
+    def release(_):
+        slots.release()
+        bulk_slots.release()
+
+    futures = []
+    try:
+        for start in range(0, len(passwords), chunk_size):
+            # 批量名額只由已在運算中的組佔用，必定會釋放；與登入共用的名額才設等待上限
+            bulk_slots.acquire()
+            if not slots.acquire(timeout=queue_timeout):
+                bulk_slots.release()
+                raise PasswordHashBusy('系統忙碌，請稍後再試')
+            try:
+                future = executor.submit(_hash_many, passwords[start:start + chunk_size])
+            except Exception:
+                release(None)
+                raise
+            future.add_done_callback(release)
+            futures.append(future)
+        return [password_hash for future in futures for password_hash in future.result()]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+
+@atexit.register
+def shutdown():
+    """進程結束時關閉進程池"""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -9,7 +9,7 @@ from sqlalchemy.orm import joinedload
 from app import db
 from app.search import bp
 from app.models import Student, Teacher, Class, Department
-from app.student.decorators import can_view_student_list
+from app.student.decorators import can_view_student_list, filter_students_by_permission
 from app.teacher.decorators import can_view_teacher_list
 
 
@@ -49,14 +49,10 @@ def search_api():
     # 搜尋學生
     if search_type in ['all', 'student'] and can_view_student_list():
         try:
-            student_query = Student.query.options(joinedload(Student.class_info))
-            
-            # 根據用戶權限過濾
-            if current_user.role == 'teacher':
-                # 教師只能看到自己班級的學生
-                student_query = student_query.join(Class).filter(
-                    Class.teacher_id == current_user.related_id
-                )
+            # 根據用戶權限過濾（教師只能看到自己班級的學生）
+            student_query = filter_students_by_permission(
+                Student.query.options(joinedload(Student.class_info))
+            )
             
             students = student_query.filter(
                 Student.name.contains(query) |
@@ -166,11 +162,7 @@ def search_suggestions():
     # 學生建議
     if can_view_student_list():
         try:
-            student_query = Student.query
-            if current_user.role == 'teacher':
-                student_query = student_query.join(Class).filter(
-                    Class.teacher_id == current_user.related_id
-                )
+            student_query = filter_students_by_permission(Student.query)
             
             students = student_query.filter(
                 Student.name.contains(query) |
@@ -61,9 +61,10 @@ def can_edit_student(student_id):
         return True
     
     # 教師可以編輯自己班級的學生
+    # 調用此函數的視圖都會顯示該學生，學生對象（連同班級）由請求範圍快取載入後直接重用
     if current_user.role == 'teacher':
-        from app.models import Student, Class
-        student = Student.query.get(student_id)
+        from app.models.request_cache import get_student
+        student = get_student(student_id)
         if student and student.class_info:
             return student.class_info.teacher_id == current_user.related_id
     
@@ -91,9 +92,10 @@ def can_view_student(student_id):
         return True
     
     # 教師可以查看自己班級的學生
+    # 調用此函數的視圖都會顯示該學生，學生對象（連同班級）由請求範圍快取載入後直接重用
     if current_user.role == 'teacher':
-        from app.models import Student, Class
-        student = Student.query.get(student_id)
+        from app.models.request_cache import get_student
+        student = get_student(student_id)
         if student and student.class_info:
             return student.class_info.teacher_id == current_user.related_id
     
@@ -134,9 +136,11 @@ def filter_students_by_permission(query):
         return query
     
     # 教師只能查看自己班級的學生
+    # 以班級ID子查詢過濾，不需要關聯班級表，權限範圍不經過快取
     if current_user.role == 'teacher':
-        from app.models import Class
-        return query.join(Class).filter(Class.teacher_id == current_user.related_id)
+        from app.models import Student
+        from app.models.queries import teacher_class_ids_select
+        return query.filter(Student.class_id.in_(teacher_class_ids_select(current_user.related_id)))
     
     # 學生只能查看自己
     if current_user.role == 'student':
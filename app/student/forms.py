@@ -4,9 +4,11 @@
 """
 
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, DateField, TextAreaField, SubmitField
+from wtforms import StringField, SelectField, DateField, TextAreaField, SubmitField, HiddenField
 from wtforms.validators import DataRequired, Email, Optional, Length, ValidationError, Regexp
 from app.models import Student, Class
+from app.models.reference_data import get_classes
+from app.fields import LookupField
 from flask_login import current_user
 
 class StudentForm(FlaskForm):
@@ -28,15 +30,12 @@ class StudentForm(FlaskForm):
         Length(min=2, max=50, message='姓名長度必須在2-50字符之間')
     ], render_kw={"placeholder": "請輸入學生姓名"})
 
-    # 班級選擇字段：必填，選項從數據庫動態載入
-    class_id = SelectField('班級', coerce=int, validators=[
+    # 班級選擇字段：必填，選項由班級搜尋API動態載入
+    class_id = LookupField('班級', validators=[
         DataRequired(message='請選擇班級')
-    ], render_kw={"class": "form-select"})
-
-    def validate_class_id(self, field):
-        """驗證班級選擇"""
-        if field.data == 0:
-            raise ValidationError('請選擇有效的班級')
+    ], model=Class, endpoint='class_management.lookup_classes', coerce=int,
+    get_label=lambda c: f"{c.class_name} ({c.department.department_name if c.department else ''})",
+    placeholder='-- 請選擇班級 --', render_kw={"class": "form-select"})
 
     # 性別選擇字段：必填，固定選項（男/女）
     gender = SelectField('性別', choices=[
@@ -110,7 +109,7 @@ class StudentForm(FlaskForm):
     def __init__(self, student=None, *args, **kwargs):
         """
         表單初始化方法
-        動態載入班級選項列表
+        根據用戶角色限制可選擇的班級範圍
 
         Args:
             student: 學生對象（編輯模式時使用）
@@ -120,22 +119,15 @@ class StudentForm(FlaskForm):
         super(StudentForm, self).__init__(*args, **kwargs)
         self.student = student
 
-        # 根據用戶角色載入班級選項
-        if current_user.role == 'admin':
-            # 管理員可以看到所有班級
-            self.class_id.choices = [(0, '-- 請選擇班級 --')] + [
-                (c.class_id, f"{c.class_name} ({c.department.department_name if c.department else ''})")
-                for c in Class.query.order_by(Class.class_name).all()
-            ]
-        elif current_user.role == 'teacher':
-            # 教師只能看到自己負責的班級
-            self.class_id.choices = [(0, '-- 請選擇班級 --')] + [
-                (c.class_id, f"{c.class_name} ({c.department.department_name if c.department else ''})")
-                for c in Class.query.filter_by(teacher_id=current_user.related_id).order_by(Class.class_name).all()
-            ]
-        else:
-            # 其他角色沒有班級選項
-            self.class_id.choices = [(0, '-- 無可選班級 --')]
+        # 根據用戶角色限制班級選擇範圍（提交時以一次主鍵查詢驗證）
+        if current_user.role == 'teacher':
+            # 教師只能選擇自己負責的班級
+            teacher_id = current_user.related_id
+            self.class_id.scope = lambda query: query.filter(Class.teacher_id == teacher_id)
+        elif current_user.role != 'admin':
+            # 其他角色沒有可選班級
+            self.class_id.scope = lambda query: query.filter(False)
+            self.class_id.placeholder = '-- 無可選班級 --'
 
     def validate_student_id(self, field):
         """
@@ -216,20 +208,66 @@ class StudentSearchForm(FlaskForm):
         """
         super(StudentSearchForm, self).__init__(*args, **kwargs)
 
-        # 根據用戶角色載入班級篩選選項
+        # 根據用戶角色載入班級篩選選項（來自參考資料快取）
         if current_user.role == 'admin':
             # 管理員可以看到所有班級
             self.class_filter.choices = [(0, '-- 所有班級 --')] + [
                 (c.class_id, c.class_name)
-                for c in Class.query.order_by(Class.class_name).all()
+                for c in get_classes()
             ]
         elif current_user.role == 'teacher':
             # 教師只能看到自己負責的班級
             self.class_filter.choices = [(0, '-- 所有班級 --')] + [
                 (c.class_id, c.class_name)
-                for c in Class.query.filter_by(teacher_id=current_user.related_id).order_by(Class.class_name).all()
+                for c in get_classes(teacher_id=current_user.related_id)
             ]
         else:
             # 其他角色沒有班級篩選選項
             self.class_filter.choices = [(0, '-- 無可選班級 --')]
 
+
+class ReassignForm(FlaskForm):
+    """
+    批量調班表單
+    選取的學號以student_ids多值欄位提交；整班調動時以source_class_id指定來源班級
+    """
+
+    # 目標班級：選項由班級搜尋API動態載入（教師只會搜尋到自己負責的班級）
+    target_class_id = LookupField('移至班級', validators=[
+        DataRequired(message='請選擇目標班級')
+    ], model=Class, endpoint='class_management.lookup_classes', coerce=int,
+    get_label=lambda c: c.class_name,
+    placeholder='-- 選擇目標班級 --', render_kw={"class": "form-select"})
+
+    # 整班調動時的來源班級
+    source_class_id = HiddenField('來源班級', validators=[Optional()])
+
+    # 提交按鈕
+    submit = SubmitField('調班')
+
+    def __init__(self, *args, **kwargs):
+        """
+        表單初始化方法
+        限制目標班級範圍：管理員為全部班級，教師為自己負責的班級（提交時以一次主鍵查詢驗證）
+        """
+        super(ReassignForm, self).__init__(*args, **kwargs)
+
+        if current_user.role == 'teacher':
+            teacher_id = current_user.related_id
+            self.target_class_id.scope = lambda query: query.filter(Class.teacher_id == teacher_id)
+
+
+class DuplicateReviewForm(FlaskForm):
+    """
+    重複學生審核表單
+    合併時以keep指定保留的學號；標記為非重複時不需要
+    """
+
+    # 保留的學號（頁面上以單選按鈕提交）
+    keep = StringField('保留記錄')
+
+    # 合併按鈕
+    merge = SubmitField('合併')
+
+    # 標記為非重複按鈕
+    dismiss = SubmitField('不是重複')
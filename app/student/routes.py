@@ -3,18 +3,89 @@
 處理學生相關的CRUD操作和視圖函數
 """
 
-from flask import render_template, redirect, url_for, flash, request, abort
+from flask import render_template, redirect, url_for, flash, request, abort, Response, stream_with_context, current_app
 from flask_login import login_required, current_user
 from sqlalchemy.orm import joinedload
 from app import db
 from app.student import bp
-from app.student.forms import StudentForm
+from app.student.forms import StudentForm, ReassignForm, DuplicateReviewForm
 from app.student.decorators import (admin_or_teacher_required, admin_required,
                         can_edit_student, can_view_student,
                         can_view_student_list, filter_students_by_permission)
-from app.models import Student, Class
+from app.models import Student, DuplicateCandidate
+from app.models.request_cache import get_entity_or_404
+from app.models.reference_data import get_classes, get_departments
+from app.models.filters import STUDENT_FILTERS, FilterError
+from app.models.facets import STUDENT_FACETS, count_facets
+from app.models.sorting import STUDENT_SORTS, apply_sort
+from app.models.exporter import FORMATS, stream_export
+from app.models.reassignment import ReassignError, reassign_students as reassign
+from app.models.duplicates import (DEFAULT_MAX_BLOCK_SIZE, find_duplicates,
+                                   merge_students, dismiss_candidate)
 from datetime import datetime
 
+def student_filter_conditions(args):
+    """
+    收集學生篩選條件
+    將班級/狀態篩選參數轉換為篩選條件，與查詢字串和JSON形式的進階篩選條件合併
+
+    Args:
+        args: request.args
+
+    Returns:
+        list: (欄位, 運算符, 值)條件列表
+
+    Raises:
+        FilterError: 篩選條件無效時拋出
+    """
+    conditions = STUDENT_FILTERS.parse_request(args)
+
+    # 應用班級篩選
+    class_filter = args.get('class_filter', 0, type=int)
+    if class_filter:
+        conditions.append(('class_id', 'eq', class_filter))
+
+    # 應用狀態篩選
+    status_filter = args.get('status_filter', '')
+    if status_filter:
+        conditions.append(('status', 'eq', status_filter))
+
+    return conditions
+
+def build_student_query(args, conditions=None):
+    """
+    根據請求參數建立學生查詢
+    套用權限範圍、關鍵字搜尋和篩選條件，供列表和匯出共用
+
+    Args:
+        args: request.args
+        conditions: 篩選條件列表，默認從args收集
+
+    Returns:
+        query: 過濾後的查詢對象
+
+    Raises:
+        FilterError: 篩選條件無效時拋出
+    """
+    search = args.get('search', '')
+    if conditions is None:
+        conditions = student_filter_conditions(args)
+
+    # 根據用戶權限過濾數據
+    query = filter_students_by_permission(Student.query)
+
+    # 應用搜索條件
+    if search:
+        query = query.filter(
+            Student.name.contains(search) |
+            Student.student_id.contains(search) |
+            Student.email.contains(search) |
+            Student.phone.contains(search)
+        )
+
+    # 應用篩選條件（班級、狀態、年級、入學年份、出生日期範圍等）
+    return query.filter(*STUDENT_FILTERS.compile(conditions))
+
 @bp.route('/')
 @login_required
 def list_students():
@@ -33,38 +104,38 @@ def list_students():
     search = request.args.get('search', '')
     class_filter = request.args.get('class_filter', '', type=int)
     status_filter = request.args.get('status_filter', '')
+    sort = request.args.get('sort')
+    direction = request.args.get('dir')
 
-    # 基礎查詢，包含關聯載入
-    query = Student.query.options(joinedload(Student.class_info))
-
-    # 根據用戶權限過濾數據
-    query = filter_students_by_permission(query)
-
-    # 應用搜索條件
-    if search:
-        query = query.filter(
-            Student.name.contains(search) |
-            Student.student_id.contains(search) |
-            Student.email.contains(search) |
-            Student.phone.contains(search)
-        )
-
-    # 應用班級篩選
-    if class_filter and class_filter != 0:
-        query = query.filter(Student.class_id == class_filter)
-
-    # 應用狀態篩選
-    if status_filter:
-        query = query.filter(Student.status == status_filter)
+    try:
+        conditions = student_filter_conditions(request.args)
+        query = build_student_query(request.args, conditions)
+
+        # 分面統計：不含分面欄位條件的查詢，以一次分組查詢計算各狀態、班級、性別的人數
+        facet_query = build_student_query(
+            request.args, [c for c in conditions if c[0] not in STUDENT_FACETS])
+        facets = count_facets(facet_query, STUDENT_FACETS,
+                              STUDENT_FILTERS.selections(conditions, STUDENT_FACETS))
+    except FilterError as e:
+        flash(f'篩選條件無效：{e}', 'warning')
+        query = Student.query.filter(False)
+        facets = None
+
+    # 關聯載入班級資料
+    query = query.options(joinedload(Student.class_info))
+
+    # 應用排序（僅限有索引的白名單欄位）
+    query, sort, direction = apply_sort(query, STUDENT_SORTS, Student.student_id,
+                                        sort, direction, default='student_id')
 
     students_pagination = query.paginate(page=page, per_page=per_page, error_out=False)
 
-    # 獲取班級選項用於篩選
+    # 獲取班級選項用於篩選（來自參考資料快取）
     classes = []
     if current_user.role == 'admin':
-        classes = Class.query.all()
+        classes = get_classes()
     elif current_user.role == 'teacher':
-        classes = Class.query.filter_by(teacher_id=current_user.related_id).all()
+        classes = get_classes(teacher_id=current_user.related_id)
 
     return render_template('student/student_list.html',
                          title='學生管理',
@@ -73,7 +144,58 @@ def list_students():
                          search=search,
                          class_filter=class_filter,
                          status_filter=status_filter,
-                         classes=classes)
+                         sort=sort,
+                         direction=direction,
+                         classes=classes,
+                         departments=get_departments(),
+                         facets=facets,
+                         class_names={c.class_id: c.class_name for c in classes},
+                         reassign_form=ReassignForm())
+
+@bp.route('/export')
+@login_required
+def export_students():
+    """
+    匯出學生列表路由
+    沿用列表頁的搜尋、篩選、排序條件及權限範圍，以串流方式輸出CSV或XLSX
+    """
+    if not can_view_student_list():
+        flash('您沒有權限匯出學生列表', 'danger')
+        abort(403)
+
+    file_format = request.args.get('format', 'csv')
+    if file_format not in FORMATS:
+        file_format = 'csv'
+
+    try:
+        query = build_student_query(request.args)
+    except FilterError as e:
+        flash(f'篩選條件無效：{e}', 'warning')
+        return redirect(url_for('student_management.list_students'))
+
+    query, _, _ = apply_sort(query, STUDENT_SORTS, Student.student_id,
+                             request.args.get('sort'), request.args.get('dir'),
+                             default='student_id')
+
+    # 班級名稱來自參考資料快取，不需要關聯班級表
+    class_names = {c.class_id: c.class_name for c in get_classes()}
+    columns = [
+        ('學號', lambda s: s.student_id),
+        ('姓名', lambda s: s.name),
+        ('班級', lambda s: class_names.get(s.class_id, '')),
+        ('性別', lambda s: s.gender),
+        ('出生日期', lambda s: s.birth_date),
+        ('電話', lambda s: s.phone),
+        ('郵箱', lambda s: s.email),
+        ('地址', lambda s: s.address),
+        ('入學日期', lambda s: s.enrollment_date),
+        ('學籍狀態', lambda s: s.status),
+    ]
+
+    filename = f'students_{datetime.now():%Y%m%d_%H%M%S}.{file_format}'
+    return Response(stream_with_context(stream_export(query, columns, file_format)),
+                    mimetype=FORMATS[file_format],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 @bp.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -87,7 +209,7 @@ def add_student():
             student = Student(
                 student_id=form.student_id.data,
                 name=form.name.data,
-                class_id=form.class_id.data if form.class_id.data != 0 else None,
+                class_id=form.class_id.data,
                 gender=form.gender.data,
                 birth_date=form.birth_date.data,
                 address=form.address.data,
@@ -122,9 +244,8 @@ def view_student(student_id):
         flash('您沒有權限查看此學生', 'danger')
         abort(403)
 
-    student = Student.query.options(
-        joinedload(Student.class_info)
-    ).get_or_404(student_id)
+    # 權限檢查時已載入的學生對象會直接重用
+    student = get_entity_or_404(Student, student_id)
 
     return render_template('student/detail.html',
                          title=f'學生詳情 - {student.name}',
@@ -138,14 +259,14 @@ def edit_student(student_id):
         flash('您沒有權限編輯此學生', 'danger')
         abort(403)
 
-    student = Student.query.get_or_404(student_id)
+    student = get_entity_or_404(Student, student_id)
     form = StudentForm(obj=student)
 
     if form.validate_on_submit():
         try:
             student.student_id = form.student_id.data
             student.name = form.name.data
-            student.class_id = form.class_id.data if form.class_id.data != 0 else None
+            student.class_id = form.class_id.data
             student.gender = form.gender.data
             student.birth_date = form.birth_date.data
             student.address = form.address.data
@@ -177,7 +298,7 @@ def edit_student(student_id):
 @admin_required
 def delete_student(student_id):
     """刪除學生路由 - 僅管理員可訪問"""
-    student = Student.query.get_or_404(student_id)
+    student = get_entity_or_404(Student, student_id)
 
     try:
         student_name = student.name
@@ -192,6 +313,112 @@ def delete_student(student_id):
 
     return redirect(url_for('student_management.list_students'))
 
+@bp.route('/reassign', methods=['POST'])
+@login_required
+@admin_or_teacher_required
+def reassign_students():
+    """
+    批量調班路由 - 管理員和教師可訪問
+    將選取的學生（student_ids）或來源班級的全部學生以一條UPDATE移至目標班級
+    """
+    form = ReassignForm()
+    next_url = request.form.get('next') or ''
+    if not next_url.startswith('/') or next_url.startswith('//'):
+        next_url = url_for('student_management.list_students')
+
+    if not form.validate_on_submit():
+        for errors in form.errors.values():
+            for error in errors:
+                flash(error, 'warning')
+        return redirect(next_url)
+
+    teacher_id = current_user.related_id if current_user.role == 'teacher' else None
+    try:
+        count = reassign(form.target_class_id.data,
+                         student_ids=request.form.getlist('student_ids'),
+                         source_class_id=request.form.get('source_class_id', 0, type=int) or None,
+                         teacher_id=teacher_id)
+    except ReassignError as e:
+        flash(f'調班失敗：{e}', 'warning')
+        return redirect(next_url)
+    except Exception as e:
+        db.session.rollback()
+        flash(f'調班時發生錯誤：{str(e)}', 'danger')
+        return redirect(next_url)
+
+    flash(f'已將 {count} 名學生移至新班級', 'success')
+    return redirect(next_url)
+
+@bp.route('/duplicates')
+@login_required
+@admin_required
+def list_duplicates():
+    """
+    重複學生審核佇列 - 僅管理員可訪問
+    按分數由高到低列出待審核的配對，每頁的學生資料以一次查詢載入
+    """
+    page = request.args.get('page', 1, type=int)
+    pagination = DuplicateCandidate.query.filter_by(status='pending').order_by(
+        DuplicateCandidate.score.desc(), DuplicateCandidate.candidate_id
+    ).paginate(page=page, per_page=20, error_out=False)
+
+    student_ids = {c.student_id_a for c in pagination.items} | {c.student_id_b for c in pagination.items}
+    students = {}
+    if student_ids:
+        students = {s.student_id: s for s in Student.query.options(joinedload(Student.class_info))
+                                                     .filter(Student.student_id.in_(student_ids))}
+
+    return render_template('student/duplicates.html',
+                         title='重複學生檢測',
+                         candidates=pagination.items,
+                         pagination=pagination,
+                         students=students,
+                         form=DuplicateReviewForm())
+
+@bp.route('/duplicates/scan', methods=['POST'])
+@login_required
+@admin_required
+def scan_duplicates():
+    """執行重複學生檢測 - 僅管理員可訪問"""
+    try:
+        result = find_duplicates(max_block_size=current_app.config.get('DUPLICATE_MAX_BLOCK_SIZE',
+                                                                        DEFAULT_MAX_BLOCK_SIZE))
+        flash(f'檢測完成：{result.students}名學生，比較{result.pairs}對，新增{result.added}對疑似重複', 'success')
+        if result.skipped_blocks:
+            flash(f'有{result.skipped_blocks}個分塊超過人數上限未比較，可調高DUPLICATE_MAX_BLOCK_SIZE', 'warning')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'檢測時發生錯誤：{str(e)}', 'danger')
+    return redirect(url_for('student_management.list_duplicates'))
+
+@bp.route('/duplicates/<int:candidate_id>', methods=['POST'])
+@login_required
+@admin_required
+def review_duplicate(candidate_id):
+    """審核重複配對路由 - 合併兩筆記錄或標記為非重複"""
+    candidate = db.session.get(DuplicateCandidate, candidate_id)
+    if candidate is None or candidate.status != 'pending':
+        flash('此配對已審核或不存在', 'warning')
+        return redirect(url_for('student_management.list_duplicates'))
+
+    form = DuplicateReviewForm()
+    if form.validate_on_submit():
+        try:
+            if form.dismiss.data:
+                dismiss_candidate(candidate)
+                flash('已標記為非重複', 'success')
+            else:
+                student = merge_students(candidate, form.keep.data)
+                flash(f'已合併至學生 "{student.name}"（{student.student_id}）', 'success')
+        except ValueError as e:
+            db.session.rollback()
+            flash(f'合併失敗：{e}', 'warning')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'合併時發生錯誤：{str(e)}', 'danger')
+
+    return redirect(url_for('student_management.list_duplicates'))
+
 @bp.route('/search')
 @login_required
 def search_students():
@@ -6,7 +6,8 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, DateField, TextAreaField, SubmitField, DecimalField
 from wtforms.validators import DataRequired, Email, Optional, Length, ValidationError, Regexp, NumberRange
-from app.models import Teacher, Department
+from app.models import Teacher
+from app.models.reference_data import get_departments
 
 class TeacherForm(FlaskForm):
     """
@@ -121,10 +122,10 @@ class TeacherForm(FlaskForm):
         super(TeacherForm, self).__init__(*args, **kwargs)
         self.teacher = teacher
 
-        # 載入系所選項
+        # 載入系所選項（來自參考資料快取）
         self.department_id.choices = [(0, '-- 請選擇系所 --')] + [
             (d.department_id, d.department_name)
-            for d in Department.query.order_by(Department.department_name).all()
+            for d in get_departments()
         ]
 
     def validate_teacher_id(self, field):
@@ -204,8 +205,8 @@ class TeacherSearchForm(FlaskForm):
         """
         super(TeacherSearchForm, self).__init__(*args, **kwargs)
 
-        # 載入系所篩選選項
+        # 載入系所篩選選項（來自參考資料快取）
         self.department_filter.choices = [(0, '-- 所有系所 --')] + [
             (d.department_id, d.department_name)
-            for d in Department.query.order_by(Department.department_name).all()
+            for d in get_departments()
         ]
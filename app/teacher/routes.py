@@ -3,7 +3,8 @@
 處理教師相關的CRUD操作和視圖函數
 """
 
-from flask import render_template, redirect, url_for, flash, request, abort
+from flask import (render_template, redirect, url_for, flash, request, abort, jsonify,
+                   Response, stream_with_context)
 from flask_login import login_required, current_user
 from sqlalchemy.orm import joinedload
 from app import db
@@ -12,9 +13,52 @@ from app.teacher.forms import TeacherForm, TeacherSearchForm
 from app.teacher.decorators import (admin_required, admin_or_self_required,
                         can_edit_teacher, can_view_teacher,
                         can_view_teacher_list, filter_teachers_by_permission)
-from app.models import Teacher, Department
+from app.models import Teacher
+from app.models.request_cache import get_entity_or_404
+from app.models.queries import keyset_page
+from app.models.reference_data import get_departments
+from app.models.sorting import TEACHER_SORTS, apply_sort
+from app.models.filters import TEACHER_FILTERS, FilterError
+from app.models.exporter import FORMATS, stream_export
 from datetime import datetime
 
+def build_teacher_query(args):
+    """
+    根據請求參數建立教師查詢
+    套用權限範圍、關鍵字搜尋、系所篩選和進階篩選條件，供列表和匯出共用
+
+    Args:
+        args: request.args
+
+    Returns:
+        query: 過濾後的查詢對象
+
+    Raises:
+        FilterError: 進階篩選條件無效時拋出
+    """
+    search = args.get('search', '')
+    department_filter = args.get('department_filter', 0, type=int)
+
+    # 根據用戶權限過濾數據
+    query = filter_teachers_by_permission(Teacher.query)
+
+    # 應用搜索條件
+    if search:
+        query = query.filter(
+            Teacher.name.contains(search) |
+            Teacher.teacher_id.contains(search) |
+            Teacher.email.contains(search) |
+            Teacher.phone.contains(search) |
+            Teacher.position.contains(search)
+        )
+
+    # 應用系所篩選
+    if department_filter:
+        query = query.filter(Teacher.department_id == department_filter)
+
+    # 應用進階篩選條件（入職日期範圍、性別等）
+    return query.filter(*TEACHER_FILTERS.from_request(args))
+
 @bp.route('/')
 @login_required
 def list_teachers():
@@ -32,39 +76,80 @@ def list_teachers():
     # 搜尋功能
     search = request.args.get('search', '')
     department_filter = request.args.get('department_filter', '', type=int)
+    sort = request.args.get('sort')
+    direction = request.args.get('dir')
 
-    # 基礎查詢，包含關聯載入
-    query = Teacher.query.options(joinedload(Teacher.department))
-
-    # 根據用戶權限過濾數據
-    query = filter_teachers_by_permission(query)
+    try:
+        query = build_teacher_query(request.args)
+    except FilterError as e:
+        flash(f'篩選條件無效：{e}', 'warning')
+        query = Teacher.query.filter(False)
 
-    # 應用搜索條件
-    if search:
-        query = query.filter(
-            Teacher.name.contains(search) |
-            Teacher.teacher_id.contains(search) |
-            Teacher.email.contains(search) |
-            Teacher.phone.contains(search) |
-            Teacher.position.contains(search)
-        )
+    # 關聯載入系所資料
+    query = query.options(joinedload(Teacher.department))
 
-    # 應用系所篩選
-    if department_filter and department_filter != 0:
-        query = query.filter(Teacher.department_id == department_filter)
+    # 應用排序（僅限有索引的白名單欄位）
+    query, sort, direction = apply_sort(query, TEACHER_SORTS, Teacher.teacher_id,
+                                        sort, direction, default='teacher_id')
 
     teachers = query.paginate(page=page, per_page=per_page, error_out=False)
 
-    # 獲取系所選項用於篩選
-    departments = Department.query.all()
+    # 獲取系所選項用於篩選（來自參考資料快取）
+    departments = get_departments()
 
     return render_template('teacher/teacher_list.html',
                          title='教師管理',
                          teachers=teachers,
                          search=search,
                          department_filter=department_filter,
+                         sort=sort,
+                         direction=direction,
                          departments=departments)
 
+@bp.route('/export')
+@login_required
+def export_teachers():
+    """
+    匯出教師列表路由
+    沿用列表頁的搜尋、篩選、排序條件及權限範圍，以串流方式輸出CSV或XLSX
+    """
+    if not can_view_teacher_list():
+        flash('您沒有權限匯出教師列表', 'danger')
+        abort(403)
+
+    file_format = request.args.get('format', 'csv')
+    if file_format not in FORMATS:
+        file_format = 'csv'
+
+    try:
+        query = build_teacher_query(request.args)
+    except FilterError as e:
+        flash(f'篩選條件無效：{e}', 'warning')
+        return redirect(url_for('teacher_management.list_teachers'))
+
+    query, _, _ = apply_sort(query, TEACHER_SORTS, Teacher.teacher_id,
+                             request.args.get('sort'), request.args.get('dir'),
+                             default='teacher_id')
+
+    # 系所名稱來自參考資料快取，不需要關聯系所表
+    department_names = {d.department_id: d.department_name for d in get_departments()}
+    columns = [
+        ('教師編號', lambda t: t.teacher_id),
+        ('姓名', lambda t: t.name),
+        ('性別', lambda t: t.gender),
+        ('系所', lambda t: department_names.get(t.department_id, '')),
+        ('職位', lambda t: t.position),
+        ('電話', lambda t: t.phone),
+        ('郵箱', lambda t: t.email),
+        ('出生日期', lambda t: t.birth_date),
+        ('入職日期', lambda t: t.hire_date),
+    ]
+
+    filename = f'teachers_{datetime.now():%Y%m%d_%H%M%S}.{file_format}'
+    return Response(stream_with_context(stream_export(query, columns, file_format)),
+                    mimetype=FORMATS[file_format],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 @bp.route('/add', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -111,9 +196,7 @@ def add_teacher():
 @admin_or_self_required
 def view_teacher(teacher_id):
     """查看教師詳情路由"""
-    teacher = Teacher.query.options(
-        joinedload(Teacher.department)
-    ).get_or_404(teacher_id)
+    teacher = get_entity_or_404(Teacher, teacher_id)
 
     return render_template('teacher/detail.html',
                          title=f'教師詳情 - {teacher.name}',
@@ -124,7 +207,7 @@ def view_teacher(teacher_id):
 @admin_or_self_required
 def edit_teacher(teacher_id):
     """編輯教師路由"""
-    teacher = Teacher.query.get_or_404(teacher_id)
+    teacher = get_entity_or_404(Teacher, teacher_id)
     form = TeacherForm(teacher=teacher, obj=teacher)
 
     if form.validate_on_submit():
@@ -164,7 +247,7 @@ def edit_teacher(teacher_id):
 @admin_required
 def delete_teacher(teacher_id):
     """刪除教師路由 - 僅管理員可訪問"""
-    teacher = Teacher.query.get_or_404(teacher_id)
+    teacher = get_entity_or_404(Teacher, teacher_id)
 
     try:
         teacher_name = teacher.name
@@ -214,4 +297,34 @@ def search_teachers():
             }
             for t in teachers
         ]
-    }
\ No newline at end of file
+    }
+
+@bp.route('/lookup')
+@login_required
+def lookup_teachers():
+    """
+    教師選項搜尋API - 供班導師等搜尋式下拉選單使用
+    以教師編號為游標分頁，只讀取編號和姓名欄位
+    """
+    if current_user.role not in ['admin', 'teacher']:
+        return jsonify({'results': [], 'next': None})
+
+    query_text = request.args.get('q', '').strip()
+    query = Teacher.query.with_entities(Teacher.teacher_id, Teacher.name)
+
+    if query_text:
+        query = query.filter(
+            Teacher.name.contains(query_text) |
+            Teacher.teacher_id.startswith(query_text)
+        )
+
+    teachers, next_cursor = keyset_page(query, Teacher.teacher_id,
+                                        after=request.args.get('after'))
+
+    return jsonify({
+        'results': [
+            {'id': t.teacher_id, 'text': f"{t.name} ({t.teacher_id})"}
+            for t in teachers
+        ],
+        'next': next_cursor
+    })
@@ -1,7 +1,8 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SelectField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, Length, ValidationError, EqualTo, Optional
-from app.models import User
+from app.models import User, Class
+from app.fields import LookupField
 
 class UserForm(FlaskForm):
     """使用者管理表單"""
@@ -71,3 +72,17 @@ class AdminChangePasswordForm(FlaskForm):
         EqualTo('new_password', message='兩次輸入的密碼不一致')
     ])
     submit = SubmitField('重設密碼')
+
+class ProvisionForm(FlaskForm):
+    """批量開設帳號表單"""
+    role = SelectField('名冊', choices=[
+        ('student', '學生'),
+        ('teacher', '教師')
+    ], validators=[DataRequired(message='請選擇名冊')])
+    # 選項由班級搜尋API動態載入，提交時以一次主鍵查詢驗證
+    class_id = LookupField('班級', validators=[Optional()], model=Class,
+                           endpoint='class_management.lookup_classes', coerce=int,
+                           get_label=lambda c: c.class_name, placeholder='-- 全部班級 --',
+                           description='只處理指定班級的學生，教師名冊不適用')
+    include_inactive = BooleanField('包含非在學狀態的學生')
+    submit = SubmitField('開設帳號並下載帳號清單')
@@ -1,10 +1,13 @@
-from flask import render_template, redirect, url_for, flash, request, abort
+from flask import render_template, redirect, url_for, flash, request, abort, Response
 from flask_login import login_required, current_user
 from app import db
 from . import bp
-from .forms import UserForm, ChangePasswordForm, AdminChangePasswordForm
+from .forms import UserForm, ChangePasswordForm, AdminChangePasswordForm, ProvisionForm
 from .decorators import admin_required, can_edit_user
 from app.models import User
+from app.models.sorting import USER_SORTS, apply_sort
+from app.models.user_cache import invalidate_user
+from app.models.provisioning import provision_accounts
 from datetime import datetime
 
 @bp.route('/')
@@ -17,17 +20,23 @@ def list_users():
     
     # 搜尋功能
     search = request.args.get('search', '')
+    query = User.query
     if search:
-        users = User.query.filter(
-            User.username.contains(search)
-        ).paginate(page=page, per_page=per_page, error_out=False)
-    else:
-        users = User.query.paginate(page=page, per_page=per_page, error_out=False)
+        query = query.filter(User.username.contains(search))
+
+    # 應用排序（僅限有索引的白名單欄位）
+    query, sort, direction = apply_sort(query, USER_SORTS, User.user_id,
+                                        request.args.get('sort'), request.args.get('dir'),
+                                        default='user_id')
+
+    users = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return render_template('user_management/list.html',
                          title='使用者管理',
                          users=users,
-                         search=search)
+                         search=search,
+                         sort=sort,
+                         direction=direction)
 
 @bp.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -110,6 +119,7 @@ def edit_user(user_id):
             
             user.updated_at = datetime.now()
             db.session.commit()
+            invalidate_user(user_id)
             flash('使用者資訊更新成功', 'success')
             
             if current_user.role == 'admin':
@@ -142,6 +152,7 @@ def delete_user(user_id):
         username = user.username
         db.session.delete(user)
         db.session.commit()
+        invalidate_user(user_id)
         flash(f'使用者 {username} 已成功刪除', 'success')
     except Exception as e:
         db.session.rollback()
@@ -180,6 +191,7 @@ def change_password(user_id):
             user.set_password(form.new_password.data)
             user.updated_at = datetime.now()
             db.session.commit()
+            invalidate_user(user_id)
             flash('密碼變更成功', 'success')
             
             if current_user.role == 'admin' and current_user.user_id != user_id:
@@ -195,3 +207,36 @@ def change_password(user_id):
                          title='變更密碼',
                          form=form,
                          user=user)
+
+@bp.route('/provision', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def provision_users():
+    """批量開設帳號路由 - 僅管理員可訪問，完成後直接下載帳號清單"""
+    form = ProvisionForm()
+
+    if form.validate_on_submit():
+        try:
+            result = provision_accounts(form.role.data,
+                                        class_id=form.class_id.data or None,
+                                        include_inactive=form.include_inactive.data)
+        except Exception as e:
+            db.session.rollback()
+            flash(f'開設帳號失敗: {str(e)}', 'danger')
+        else:
+            if not result.created:
+                flash(f'沒有需要開設的帳號（跳過 {len(result.skipped)} 筆已有帳號的記錄）', 'info')
+                return redirect(url_for('user_management.provision_users'))
+
+            # 初始密碼只在此清單中出現一次
+            filename = f'credentials_{form.role.data}_{datetime.now():%Y%m%d_%H%M%S}.csv'
+            return Response(result.credential_sheet(),
+                            mimetype='text/csv; charset=utf-8',
+                            headers={
+                                'Content-Disposition': f'attachment; filename={filename}',
+                                'Cache-Control': 'no-store',
+                            })
+
+    return render_template('user_management/provision.html',
+                         title='批量開設帳號',
+                         form=form)
@@ -27,9 +27,84 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'mysql+pymysql://root:@10.128.174.95/student'
 
+    # 數據庫連線池配置
+    # 常駐連線數、超出常駐連線數時最多再開啟的連線數、取用連線的最長等待秒數（超時則請求失敗）
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    # 連線使用超過此秒數後重新建立，需小於MySQL的wait_timeout，避免取用已被伺服器關閉的閒置連線
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    # 取用連線前先檢測連線是否可用，失效的連線會自動重新建立
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+
     # 禁用SQLAlchemy的事件系統以節省資源
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # 參考資料快取配置
+    # 系所、班級、教師下拉選單資料的快取存活時間（秒），提交修改時會立即失效
+    REFERENCE_DATA_CACHE_TTL = int(os.environ.get('REFERENCE_DATA_CACHE_TTL', 300))
+
+    # 登入用戶快取配置
+    # 每個請求載入當前用戶時使用的快照存活時間（秒），修改用戶時會立即失效
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+
+    # 密碼哈希配置
+    # 密碼哈希及驗證在專用進程池中執行，最大同時運算數量即進程池大小，設為0時在請求線程中直接運算
+    PASSWORD_HASH_MAX_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_MAX_CONCURRENCY',
+                                                       min(4, os.cpu_count() or 1)))
+    # 等待運算名額的秒數，超時則返回「系統忙碌」
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 5))
+
+    # 登入頻率限制配置
+    # 計數存儲位置：memory://為進程內存，多進程部署時可設為redis://主機:端口/庫號共用計數
+    THROTTLE_STORAGE_URL = os.environ.get('THROTTLE_STORAGE_URL', 'memory://')
+    # 窗口內同一用戶名允許的登入失敗次數、同一IP允許的登入嘗試次數，窗口長度（秒）
+    LOGIN_THROTTLE_USERNAME_LIMIT = int(os.environ.get('LOGIN_THROTTLE_USERNAME_LIMIT', 5))
+    LOGIN_THROTTLE_IP_LIMIT = int(os.environ.get('LOGIN_THROTTLE_IP_LIMIT', 30))
+    LOGIN_THROTTLE_WINDOW = int(os.environ.get('LOGIN_THROTTLE_WINDOW', 300))
+    # 窗口內同一IP允許的註冊次數，窗口長度（秒）
+    REGISTER_THROTTLE_IP_LIMIT = int(os.environ.get('REGISTER_THROTTLE_IP_LIMIT', 5))
+    REGISTER_THROTTLE_WINDOW = int(os.environ.get('REGISTER_THROTTLE_WINDOW', 3600))
+
+    # 最後登入時間配置
+    # 登入時間暫存在內存中，每隔指定秒數或暫存達到指定筆數時批量寫入數據庫
+    LAST_LOGIN_FLUSH_INTERVAL = int(os.environ.get('LAST_LOGIN_FLUSH_INTERVAL', 30))
+    LAST_LOGIN_FLUSH_SIZE = int(os.environ.get('LAST_LOGIN_FLUSH_SIZE', 500))
+    # 是否在每個已登入請求時也更新最後登入時間（作為最後活動時間）
+    LAST_SEEN_ON_ACTIVITY = os.environ.get('LAST_SEEN_ON_ACTIVITY', '').lower() in ('1', 'true', 'yes')
+
+    # 批量匯入配置
+    # 每批INSERT的行數，每批一個事務
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+
+    # 批量操作API配置
+    # 允許的API權杖，多個以逗號分隔；未設置時API拒絕所有請求
+    API_TOKENS = [token.strip() for token in os.environ.get('API_TOKENS', '').split(',') if token.strip()]
+    # 每個請求最多的操作數量
+    API_BATCH_MAX_OPERATIONS = int(os.environ.get('API_BATCH_MAX_OPERATIONS', 1000))
+
+    # 重複學生檢測配置
+    # 分塊人數上限：超過時姓名分塊按出生年份拆分，仍超過的分塊不比較（略過數量顯示在檢測結果中）
+    DUPLICATE_MAX_BLOCK_SIZE = int(os.environ.get('DUPLICATE_MAX_BLOCK_SIZE', 50))
+
+    # 學年升級配置
+    # 此年級及以上班級的在學學生在學年升級時改為畢業，其餘班級升一年級
+    ROLLOVER_FINAL_GRADE = int(os.environ.get('ROLLOVER_FINAL_GRADE', 4))
+    # 每批UPDATE的行數，每批一個事務
+    ROLLOVER_CHUNK_SIZE = int(os.environ.get('ROLLOVER_CHUNK_SIZE', 1000))
+
+    # 備份及還原配置
+    # 並行匯出的線程數（每個線程一個數據庫連線），每批讀取及寫入的行數
+    BACKUP_WORKERS = int(os.environ.get('BACKUP_WORKERS', 4))
+    BACKUP_BATCH_SIZE = int(os.environ.get('BACKUP_BATCH_SIZE', 5000))
+
     # 分頁配置
     # 每頁顯示的記錄數量，用於列表頁面的分頁功能
     ITEMS_PER_PAGE = 10
\ No newline at end of file
@@ -4,6 +4,7 @@ Flask應用管理腳本
 使用方法：python manage.py <command>
 """
 
+import click
 from flask.cli import FlaskGroup
 from flask_migrate import Migrate
 from app import create_app, db
@@ -60,6 +61,328 @@ def create_admin():
         db.session.rollback()
         print(f'Error creating admin user: {str(e)}')
 
+@cli.command("import")
+@click.argument('kind', type=click.Choice(['students', 'teachers', 'classes']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=None, type=int, help='每批插入的行數')
+@click.option('--dry-run', is_flag=True, help='只檢查資料，不寫入')
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False), help='錯誤報告輸出的CSV檔案')
+def import_data(kind, path, batch_size, dry_run, errors_path):
+    """
+    批量匯入命令
+    從CSV或XLSX檔案匯入學生、教師或班級資料
+    使用方法：python manage.py import students students.csv --errors errors.csv
+    """
+    import csv
+    import time
+    from app.models.importer import read_rows, import_rows
+
+    batch_size = batch_size or app.config.get('IMPORT_BATCH_SIZE', 1000)
+    started = time.perf_counter()
+    with open(path, 'rb') as stream:
+        try:
+            result = import_rows(kind, read_rows(stream, path), batch_size=batch_size, dry_run=dry_run)
+        except ValueError as e:
+            print(f'Import failed: {e}')
+            return
+    elapsed = time.perf_counter() - started
+
+    action = 'validated' if dry_run else 'inserted'
+    print(f'{result.total} rows read, {result.inserted} {action}, {result.failed} failed in {elapsed:.2f}s')
+
+    if errors_path:
+        with open(errors_path, 'w', newline='', encoding='utf-8-sig') as report:
+            writer = csv.writer(report)
+            writer.writerow(['line', 'error'])
+            writer.writerows(result.errors)
+        print(f'Error report written to {errors_path}')
+    else:
+        for line, message in result.errors[:20]:
+            print(f'  line {line}: {message}')
+        if result.failed > 20:
+            print(f'  ... {result.failed - 20} more, use --errors to write the full report')
+
+
+@cli.command("provision")
+@click.argument('role', type=click.Choice(['student', 'teacher']))
+@click.option('--class-id', type=int, help='只處理指定班級的學生')
+@click.option('--include-inactive', is_flag=True, help='包含非在學狀態的學生')
+@click.option('--output', required=True, type=click.Path(dir_okay=False), help='帳號清單輸出的CSV檔案')
+def provision(role, class_id, include_inactive, output):
+    """
+    批量開設帳號命令
+    為尚無帳號的學生或教師建立帳號，初始密碼寫入帳號清單
+    使用方法：python manage.py provision student --output credentials.csv
+    """
+    import time
+    from app.models.provisioning import provision_accounts
+
+    started = time.perf_counter()
+    result = provision_accounts(role, class_id=class_id, include_inactive=include_inactive)
+    elapsed = time.perf_counter() - started
+
+    if result.created:
+        with open(output, 'w', newline='', encoding='utf-8') as sheet:
+            sheet.write(result.credential_sheet())
+    print(f'{len(result.created)} accounts created, {len(result.skipped)} skipped in {elapsed:.2f}s')
+    if result.created:
+        print(f'Credential sheet written to {output}')
+
+
+@cli.command("seed")
+@click.option('--students', default=0, help='學生數量')
+@click.option('--teachers', default=0, help='教師數量')
+@click.option('--classes', default=0, help='班級數量')
+@click.option('--seed', 'random_seed', default=42, help='亂數種子，相同種子產生相同資料')
+@click.option('--batch-size', default=10000, help='每批插入的行數')
+def seed(students, teachers, classes, random_seed, batch_size):
+    """
+    產生測試資料命令
+    以固定種子產生教師、班級及學生資料，供效能測試使用
+    使用方法：python manage.py seed --students 1000000 --teachers 2000 --classes 500
+    """
+    import time
+    from app.models.seeding import seed_data
+
+    def report(kind, count):
+        print(f'  {kind}: {count}', end='\r')
+
+    started = time.perf_counter()
+    result = seed_data(students=students, teachers=teachers, classes=classes,
+                       seed=random_seed, batch_size=batch_size, progress=report)
+    elapsed = time.perf_counter() - started
+    print(f'{result.departments} departments, {result.teachers} teachers, {result.classes} classes, '
+          f'{result.students} students created in {elapsed:.2f}s')
+
+
+@cli.command("find_duplicates")
+@click.option('--threshold', default=None, type=float, help='列入審核佇列的分數門檻（0-1）')
+@click.option('--max-block-size', default=None, type=int,
+              help='分塊人數上限，超過時姓名分塊按出生年份拆分，仍超過的分塊不產生配對')
+def find_duplicates_command(threshold, max_block_size):
+    """
+    重複學生檢測命令
+    以分塊鍵產生候選配對並計分，達到門檻的配對加入管理員審核佇列
+    使用方法：python manage.py find_duplicates --threshold 0.6
+    """
+    import time
+    from app.models.duplicates import DEFAULT_MAX_BLOCK_SIZE, DEFAULT_THRESHOLD, find_duplicates
+
+    started = time.perf_counter()
+    result = find_duplicates(threshold=threshold or DEFAULT_THRESHOLD,
+                             max_block_size=max_block_size or app.config.get('DUPLICATE_MAX_BLOCK_SIZE',
+                                                                             DEFAULT_MAX_BLOCK_SIZE))
+    elapsed = time.perf_counter() - started
+    print(f'{result.students} students, {result.pairs} candidate pairs compared, '
+          f'{result.split_blocks} oversized name blocks split by birth year, '
+          f'{result.skipped_blocks} oversized blocks skipped, {result.added} pairs queued in {elapsed:.2f}s')
+
+
+@cli.command("rollover")
+@click.option('--school-year', default=None, help='學年標識，每個學年只能升級一次（默認為今年）')
+@click.option('--final-grade', default=None, type=int, help='畢業年級')
+@click.option('--chunk-size', default=None, type=int, help='每批更新的行數')
+@click.option('--dry-run', is_flag=True, help='只顯示將受影響的資料，不修改')
+def rollover(school_year, final_grade, chunk_size, dry_run):
+    """
+    學年升級命令
+    畢業年級班級的在學學生改為畢業，其餘班級升一年級；中斷後重新執行會從上次的進度續跑
+    使用方法：python manage.py rollover --school-year 2025 --dry-run
+    """
+    import time
+    from app.models.rollover import RolloverError, get_run, plan_rollover, run_rollover
+
+    school_year = school_year or str(datetime.now().year)
+    final_grade = final_grade or app.config.get('ROLLOVER_FINAL_GRADE', 4)
+    chunk_size = chunk_size or app.config.get('ROLLOVER_CHUNK_SIZE', 1000)
+
+    run = get_run(school_year)
+    if run is not None and run.phase == 'done':
+        print(f'Rollover {school_year} already completed at {run.finished_at:%Y-%m-%d %H:%M}: '
+              f'{run.students_graduated} students graduated, {run.classes_promoted} classes promoted')
+        return
+
+    if dry_run:
+        plan = plan_rollover(final_grade)
+        print(f'Rollover {school_year} (final grade {final_grade}) - dry run')
+        print(f'Students to graduate: {plan.students_to_graduate}')
+        for c in plan.graduating:
+            print(f'  {c.class_name} (grade {c.grade}): {c.students}')
+        print(f'Classes to promote: {plan.classes_to_promote}')
+        for grade, count in plan.promotions:
+            print(f'  grade {grade} -> {grade + 1}: {count}')
+        if run is not None:
+            print(f'Interrupted run found in phase {run.phase} (cursor {run.cursor}), '
+                  f'{run.students_graduated} students graduated and {run.classes_promoted} classes promoted so far; '
+                  f'run without --dry-run to resume')
+        return
+
+    if run is not None:
+        print(f'Resuming rollover {school_year} from phase {run.phase} (cursor {run.cursor})')
+
+    def report(run):
+        print(f'  {run.phase}: {run.students_graduated} students graduated, '
+              f'{run.classes_promoted} classes promoted', end='\r')
+
+    started = time.perf_counter()
+    try:
+        run = run_rollover(school_year, final_grade=final_grade, chunk_size=chunk_size, progress=report)
+    except RolloverError as e:
+        print(f'Error: {e}')
+        return
+    elapsed = time.perf_counter() - started
+    print(f'Rollover {school_year} completed in {elapsed:.2f}s: '
+          f'{run.students_graduated} students graduated, {run.classes_promoted} classes promoted')
+
+
+@cli.command("dump")
+@click.argument('directory', type=click.Path(file_okay=False))
+@click.option('--table', 'tables', multiple=True, help='只匯出指定的表，可重複指定')
+@click.option('--workers', default=None, type=int, help='並行匯出的線程數')
+@click.option('--batch-size', default=None, type=int, help='每批讀取的行數')
+def dump_command(directory, tables, workers, batch_size):
+    """
+    數據庫備份命令
+    並行將各表匯出為gzip壓縮的NDJSON檔案，所有表讀取同一個一致的快照
+    使用方法：python manage.py dump backups/2025-07-01
+    """
+    import time
+    from app.models.backup import BackupError, dump
+
+    def report(table, count):
+        print(f'  {table}: {count} rows')
+
+    started = time.perf_counter()
+    try:
+        result = dump(directory, tables=list(tables),
+                      workers=workers or app.config.get('BACKUP_WORKERS', 4),
+                      batch_size=batch_size or app.config.get('BACKUP_BATCH_SIZE', 5000),
+                      progress=report)
+    except BackupError as e:
+        print(f'Dump failed: {e}')
+        return
+    elapsed = time.perf_counter() - started
+    snapshot = result.snapshot
+    print(f'{len(result.tables)} tables, {result.rows} rows dumped to {directory} in {elapsed:.2f}s '
+          f'({snapshot["consistency"]} at {snapshot["taken_at"]})')
+    if 'binlog_file' in snapshot:
+        print(f'Binlog position: {snapshot["binlog_file"]}:{snapshot["binlog_position"]}')
+
+
+@cli.command("restore")
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--table', 'tables', multiple=True, help='只還原指定的表，可重複指定')
+@click.option('--batch-size', default=None, type=int, help='每批寫入的行數')
+@click.option('--replace', is_flag=True, help='先清空目標表；否則目標表必須為空')
+def restore_command(directory, tables, batch_size, replace):
+    """
+    數據庫還原命令
+    從dump產生的備份目錄分批寫入資料，二級索引在全部寫入後再建立
+    使用方法：python manage.py restore backups/2025-07-01 --replace
+    """
+    import time
+    from app.models.backup import BackupError, restore
+
+    def report(table, count):
+        print(f'  {table}: {count} rows', end='\r')
+
+    started = time.perf_counter()
+    try:
+        result = restore(directory, tables=list(tables),
+                         batch_size=batch_size or app.config.get('BACKUP_BATCH_SIZE', 5000),
+                         replace=replace, progress=report)
+    except BackupError as e:
+        print(f'Restore failed: {e}')
+        return
+    elapsed = time.perf_counter() - started
+    print(f'{len(result.tables)} tables, {result.rows} rows restored in {elapsed:.2f}s '
+          f'(snapshot taken at {result.snapshot["taken_at"]})')
+
+
+def _percentile(values, percent):
+    """取得已排序數值列表的百分位數"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+@cli.command("bench_login")
+@click.option('--username', required=True, help='用於登入的現有用戶名')
+@click.option('--password', required=True, help='該用戶的密碼')
+@click.option('--logins', default=200, help='登入請求總數')
+@click.option('--concurrency', default=16, help='同時發送登入請求的線程數')
+@click.option('--probe-path', default='/', help='登入期間持續測量延遲的頁面')
+@click.option('--inline', is_flag=True, help='在請求線程中直接運算密碼哈希（對照組）')
+def bench_login(username, password, logins, concurrency, probe_path, inline):
+    """
+    登入壓力測試命令
+    大量登入請求進行時，測量其他頁面的延遲（p50/p99），用於比較密碼進程池的效果
+    使用方法：python manage.py bench_login --username admin --password admin123
+    """
+    import threading
+    import time
+
+    # 壓力測試來自同一IP，關閉登入頻率限制
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['LOGIN_THROTTLE_USERNAME_LIMIT'] = 0
+    app.config['LOGIN_THROTTLE_IP_LIMIT'] = 0
+    if inline:
+        app.config['PASSWORD_HASH_MAX_CONCURRENCY'] = 0
+    credentials = {'username': username, 'password': password}
+
+    # 測量用的客戶端先登入一次，之後只訪問非登入頁面
+    probe_client = app.test_client()
+    if probe_client.post('/auth/login', data=credentials).status_code != 302:
+        print('Login failed, check username and password.')
+        return
+
+    remaining = iter(range(logins))
+    remaining_lock = threading.Lock()
+    login_times, login_statuses, probe_times = [], [], []
+    storm_done = threading.Event()
+
+    def storm():
+        client = app.test_client()
+        while True:
+            with remaining_lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            response = client.post('/auth/login', data=credentials)
+            login_times.append(time.perf_counter() - started)
+            login_statuses.append(response.status_code)
+            client.get('/auth/logout')
+
+    def probe():
+        while not storm_done.is_set():
+            started = time.perf_counter()
+            probe_client.get(probe_path)
+            probe_times.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=storm) for _ in range(concurrency)]
+    prober = threading.Thread(target=probe)
+    started = time.perf_counter()
+    prober.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    storm_done.set()
+    prober.join()
+    elapsed = time.perf_counter() - started
+
+    login_times.sort()
+    probe_times.sort()
+    busy = sum(1 for status in login_statuses if status == 503)
+    print(f'Password hashing: {"inline" if inline else "process pool"}, '
+          f'{logins} logins x {concurrency} threads in {elapsed:.2f}s')
+    print(f'Login     p50 {_percentile(login_times, 50) * 1000:8.1f} ms  '
+          f'p99 {_percentile(login_times, 99) * 1000:8.1f} ms  busy(503) {busy}')
+    print(f'{probe_path:<9} p50 {_percentile(probe_times, 50) * 1000:8.1f} ms  '
+          f'p99 {_percentile(probe_times, 99) * 1000:8.1f} ms  samples {len(probe_times)}')
+
+
 if __name__ == '__main__':
     # 執行命令行界面
     cli()
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+進階篩選條件編譯測試
+檢查STUDENT_FILTERS及TEACHER_FILTERS生成的SQL及綁定參數，以及不支援的欄位、運算符和值被拒絕
+"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy.dialects import mysql
+
+from app.models.filters import FilterError, STUDENT_FILTERS, TEACHER_FILTERS
+
+
+def render(expression):
+    """以MySQL方言（具名參數）編譯條件，返回(SQL, 綁定參數)"""
+    compiled = expression.compile(dialect=mysql.dialect(paramstyle='named'),
+                                  compile_kwargs={'render_postcompile': True})
+    return ' '.join(str(compiled).split()), compiled.params
+
+
+def compile_one(filter_set, name, op, value):
+    expressions = filter_set.compile([(name, op, value)])
+    assert len(expressions) == 1
+    return render(expressions[0])
+
+
+# 學生篩選
+
+def test_student_eq_int():
+    sql, params = compile_one(STUDENT_FILTERS, 'class_id', 'eq', '5')
+    assert sql == 'students.class_id = :class_id_1'
+    assert params == {'class_id_1': 5}
+
+
+def test_student_in_choices():
+    sql, params = compile_one(STUDENT_FILTERS, 'status', 'in', ['在學', '休學'])
+    assert sql == 'students.status IN (:status_1_1, :status_1_2)'
+    assert params == {'status_1_1': '在學', 'status_1_2': '休學'}
+
+
+def test_student_date_range():
+    sql, params = compile_one(STUDENT_FILTERS, 'birth_date', 'between', ['2005-12-31', '2005-01-01'])
+    assert sql == 'students.birth_date BETWEEN :birth_date_1 AND :birth_date_2'
+    assert params == {'birth_date_1': date(2005, 1, 1), 'birth_date_2': date(2005, 12, 31)}
+
+
+def test_student_year_uses_date_range():
+    sql, params = compile_one(STUDENT_FILTERS, 'enrollment_year', 'eq', '2024')
+    assert sql == 'students.enrollment_date BETWEEN :enrollment_date_1 AND :enrollment_date_2'
+    assert params == {'enrollment_date_1': date(2024, 1, 1), 'enrollment_date_2': date(2024, 12, 31)}
+
+    sql, params = compile_one(STUDENT_FILTERS, 'enrollment_year', 'gt', '2024')
+    assert sql == 'students.enrollment_date > :enrollment_date_1'
+    assert params == {'enrollment_date_1': date(2024, 12, 31)}
+
+
+def test_student_grade_range_uses_class_subquery():
+    sql, params = compile_one(STUDENT_FILTERS, 'grade', 'between', '3,1')
+    assert sql == ('students.class_id IN (SELECT classes.class_id FROM classes '
+                   'WHERE classes.grade BETWEEN :grade_1 AND :grade_2)')
+    assert params == {'grade_1': 1, 'grade_2': 3}
+
+
+def test_student_department_in_uses_class_subquery():
+    sql, params = compile_one(STUDENT_FILTERS, 'department', 'in', '1,2')
+    assert sql == ('students.class_id IN (SELECT classes.class_id FROM classes '
+                   'WHERE classes.department_id IN (:department_id_1_1, :department_id_1_2))')
+    assert params == {'department_id_1_1': 1, 'department_id_1_2': 2}
+
+
+# 教師篩選
+
+def test_teacher_eq_department():
+    sql, params = compile_one(TEACHER_FILTERS, 'department', 'eq', '3')
+    assert sql == 'teachers.department_id = :department_id_1'
+    assert params == {'department_id_1': 3}
+
+
+def test_teacher_gender_in():
+    sql, params = compile_one(TEACHER_FILTERS, 'gender', 'in', ['女'])
+    assert sql == 'teachers.gender IN (:gender_1_1)'
+    assert params == {'gender_1_1': '女'}
+
+
+def test_teacher_hire_date_range():
+    sql, params = compile_one(TEACHER_FILTERS, 'hire_date', 'gte', '2020-08-01')
+    assert sql == 'teachers.hire_date >= :hire_date_1'
+    assert params == {'hire_date_1': date(2020, 8, 1)}
+
+
+def test_teacher_hire_year_in():
+    sql, params = compile_one(TEACHER_FILTERS, 'hire_year', 'in', ['2020', '2022'])
+    assert sql == ('teachers.hire_date BETWEEN :hire_date_1 AND :hire_date_2 '
+                   'OR teachers.hire_date BETWEEN :hire_date_3 AND :hire_date_4')
+    assert params == {
+        'hire_date_1': date(2020, 1, 1), 'hire_date_2': date(2020, 12, 31),
+        'hire_date_3': date(2022, 1, 1), 'hire_date_4': date(2022, 12, 31),
+    }
+
+
+def test_request_args_and_json_combined():
+    from werkzeug.datastructures import MultiDict
+    args = MultiDict([('grade__between', '1,3'), ('page', '2'),
+                      ('filter', '[{"field": "gender", "value": "女"}]')])
+    expressions = STUDENT_FILTERS.from_request(args)
+    assert [render(e)[0] for e in expressions] == [
+        'students.class_id IN (SELECT classes.class_id FROM classes '
+        'WHERE classes.grade BETWEEN :grade_1 AND :grade_2)',
+        'students.gender = :gender_1',
+    ]
+
+
+# 拒絕的條件
+
+@pytest.mark.parametrize('filter_set, name', [
+    (STUDENT_FILTERS, 'name'),
+    (STUDENT_FILTERS, 'address'),
+    (STUDENT_FILTERS, 'phone'),
+    (TEACHER_FILTERS, 'salary'),
+    (TEACHER_FILTERS, 'name'),
+])
+def test_non_indexed_fields_rejected(filter_set, name):
+    with pytest.raises(FilterError, match='不支援按'):
+        filter_set.compile([(name, 'eq', 'x')])
+
+
+@pytest.mark.parametrize('name, op', [
+    ('gender', 'gt'),
+    ('status', 'between'),
+    ('class_id', 'like'),
+])
+def test_unsupported_ops_rejected(name, op):
+    with pytest.raises(FilterError, match='不支援運算符'):
+        STUDENT_FILTERS.compile([(name, op, '1')])
+
+
+@pytest.mark.parametrize('name, op, value', [
+    ('class_id', 'eq', 'abc'),
+    ('status', 'eq', '未知'),
+    ('enrollment_year', 'eq', '1800'),
+    ('birth_date', 'gte', '2024/01/01'),
+    ('grade', 'between', '1'),
+    ('class_id', 'eq', ['1', '2']),
+    ('status', 'in', ''),
+])
+def test_invalid_values_rejected(name, op, value):
+    with pytest.raises(FilterError):
+        STUDENT_FILTERS.compile([(name, op, value)])
+
+
+@pytest.mark.parametrize('data', [
+    '[{"field": [1], "value": 1}]',
+    '[{"field": {"a": 1}, "value": 1}]',
+    '[{"field": "gender", "op": ["eq"], "value": "女"}]',
+    '[{"field": null, "value": 1}]',
+])
+def test_non_string_json_field_or_op_rejected(data):
+    with pytest.raises(FilterError, match='必須是字串'):
+        STUDENT_FILTERS.compile(STUDENT_FILTERS.parse_json(data))
@@ -0,0 +1,67 @@
+"""
+學年升級測試
+以記憶體SQLite執行run_rollover，檢查畢業年級班級的在學學生改為畢業且班級不升級，其餘班級升一年級
+"""
+
+from datetime import date
+
+import pytest
+
+from config import Config
+from app import create_app, db
+from app.models import Class, Student
+from app.models.rollover import plan_rollover, run_rollover
+
+
+class RolloverTestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+    PASSWORD_HASH_MAX_CONCURRENCY = 0
+
+
+@pytest.fixture
+def app():
+    app = create_app(RolloverTestConfig)
+    with app.app_context():
+        db.create_all()
+        classes = {grade: Class(class_name=f'{grade}年級', grade=grade) for grade in (1, 3, 4)}
+        db.session.add_all(classes.values())
+        db.session.flush()
+        for grade, class_obj in classes.items():
+            for i, status in enumerate(('在學', '在學', '休學')):
+                db.session.add(Student(student_id=f'S{grade}{i:04d}', name=f'學生{grade}{i}',
+                                       gender='男', class_id=class_obj.class_id, status=status,
+                                       enrollment_date=date(2021, 9, 1)))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+def grades():
+    return {c.class_name: c.grade for c in Class.query}
+
+
+def statuses(grade):
+    return sorted(s.status for s in Student.query.join(Class).filter(Class.class_name == f'{grade}年級'))
+
+
+def test_final_grade_classes_graduate_and_are_not_promoted(app):
+    run = run_rollover('2025', final_grade=4, chunk_size=1)
+
+    assert run.phase == 'done'
+    assert run.students_graduated == 2
+    assert run.classes_promoted == 2
+    assert grades() == {'1年級': 2, '3年級': 4, '4年級': 4}
+    # 只有畢業年級班級的在學學生改為畢業，休學學生及剛升到畢業年級的班級不受影響
+    assert statuses(4) == ['休學', '畢業', '畢業']
+    assert statuses(3) == ['休學', '在學', '在學']
+
+
+def test_plan_matches_run(app):
+    plan = plan_rollover(final_grade=4)
+
+    assert plan.students_to_graduate == 2
+    assert [(c.class_name, c.students) for c in plan.graduating] == [('4年級', 2)]
+    assert plan.promotions == [(1, 1), (3, 1)]
+    # 預覽不做任何修改
+    assert grades() == {'1年級': 1, '3年級': 3, '4年級': 4}